@@ -11,23 +11,20 @@ from pathlib import Path
 from qlib.data.dataset.handler import DataHandlerLP
 from qlib.data.dataset import DatasetH
 import qlib
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.factors import qlib_fields
+from common.signal_backtest import threshold_sweep
 
 provider_uri = '/Users/zhangzc/.qlib/qlib_data/crypto_10m'
 qlib.init(provider_uri=provider_uri)
 
 market = "all"
 
-# Re-define features (Must match training!)
-fields = []
-names = []
-for n in [5, 10, 20, 60]:
-    fields.append(f"Ref($close, {n}) / $close - 1"); names.append(f"ROC_{n}")
-for n in [20, 60]:
-    fields.append(f"Std($close, {n}) / Mean($close, {n})"); names.append(f"VOL_{n}")
-for n in [5, 10, 20, 60]:
-    fields.append(f"$close / Mean($close, {n}) - 1"); names.append(f"MA_{n}")
-fields.append("($high - $low) / $close"); names.append("H_L_Ratio")
-fields.append("($close - $open) / $open"); names.append("C_O_Ratio")
+# Same feature set as training (common/factors.py)
+FEATURE_SET = "qlib_ai"
+fields, names = qlib_fields(FEATURE_SET)
 
 data_handler_config = {
     "start_time": "2025-12-01", # Test Period
@@ -40,12 +37,14 @@ data_handler_config = {
         {"class": "DropnaLabel"},
     ],
     "data_loader": {
-        "class": "QlibDataLoader",
+        "class": "DagDataLoader",  # QlibDataLoader with shared sub-expressions computed once
+        "module_path": "common.qlib_loader",
         "kwargs": {
             "config": {
                 "feature": (fields, names),
                 "label": (["Ref($close, -1) / $close - 1"], ["label"])
-            }
+            },
+            "cache_dir": "~/.qlib/feature_cache",  # float32 columns reused by later runs over the same data
         }
     }
 }
@@ -111,6 +110,12 @@ print(f"Win Rate:     {win_rate*100:.2f}%")
 print(f"Trades:       {n_trades:.0f}")
 print("════════════════════════════════════════════════════════════════════════")
 
+# Same predictions over a grid of thresholds / costs (common/signal_backtest.py)
+sweep = threshold_sweep(pred, label_series, np.linspace(0, 0.002, 2001), [cost, cost * 2], per_unit=False)
+print("\nThreshold sweep: best 5 per cost")
+for _, g in sweep.groupby("cost"):
+    print(g.nlargest(5, "total_return").to_string(index=False))
+
 # 5. Export to CSV for detailed analysis
 res_csv_path = Path(__file__).parent.resolve() / "ai_backtest_results.csv"
 res_df.to_csv(res_csv_path)
@@ -10,6 +10,13 @@ import numpy as np
 import lightgbm as lgb
 from pathlib import Path
 import pickle
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.factors import qlib_fields
+from common.flat_trees import export
+from common.lgb_data import lgb_dataset
+from common.model_registry import ModelRegistry
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 1. Configuration 
@@ -27,31 +34,9 @@ benchmark = "ETHUSDT"
 # Standard Alpha158 might need adjustment for crypto decimals?
 # But normalized features should work.
 
-# Custom Feature Factors
-# We define a simple set of technical indicators to avoid Alpha158 complexities
-fields = []
-names = []
-
-# 1. Momentum / ROC
-for n in [5, 10, 20, 60]:
-    fields.append(f"Ref($close, {n}) / $close - 1")
-    names.append(f"ROC_{n}")
-
-# 2. Volatility
-for n in [20, 60]:
-    fields.append(f"Std($close, {n}) / Mean($close, {n})")
-    names.append(f"VOL_{n}")
-
-# 3. MA Divergence
-for n in [5, 10, 20, 60]:
-    fields.append(f"$close / Mean($close, {n}) - 1")
-    names.append(f"MA_{n}")
-
-# 4. Range
-fields.append("($high - $low) / $close")
-names.append("H_L_Ratio")
-fields.append("($close - $open) / $open")
-names.append("C_O_Ratio")
+# Custom Feature Factors (defined once in common/factors.py, shared with backtest and live)
+FEATURE_SET = "qlib_ai"
+fields, names = qlib_fields(FEATURE_SET)
 
 data_handler_config = {
     "start_time": "2025-01-05",
@@ -59,6 +44,7 @@ data_handler_config = {
     # "fit_start_time": "2025-02-10", # Not needed for DataHandlerLP
     # "fit_end_time": "2025-09-30",
     "instruments": market,
+    "drop_raw": True,  # only DK_L is used; do not keep the raw panel next to the processed ones
     "infer_processors": [
         {"class": "Fillna", "kwargs": {"fields_group": "feature"}},
     ],
@@ -66,12 +52,15 @@ data_handler_config = {
         {"class": "DropnaLabel"},
     ],
     "data_loader": {
-        "class": "QlibDataLoader",
+        "class": "DagDataLoader",  # QlibDataLoader with shared sub-expressions computed once
+        "module_path": "common.qlib_loader",
         "kwargs": {
             "config": {
                 "feature": (fields, names),
                 "label": (["Ref($close, -1) / $close - 1"], ["label"])
-            }
+            },
+            "cache_dir": "~/.qlib/feature_cache",  # float32 columns reused by later runs over the same data
+            "float32": True,  # float32 feature matrix from load to lgb.Dataset
         }
     }
 }
@@ -119,9 +108,9 @@ print(y_train.describe())
 print(f"X_train NaNs: {X_train.isna().sum().sum()}")
 print(f"y_train NaNs: {y_train.isna().sum().sum()}")
 
-# Create LGB Dataset
-dtrain = lgb.Dataset(X_train, label=y_train)
-dvalid = lgb.Dataset(X_valid, label=y_valid, reference=dtrain)
+# Create LGB Dataset (the float32 feature block is handed over as-is, not widened and copied)
+dtrain = lgb_dataset(X_train, y_train)
+dvalid = lgb_dataset(X_valid, y_valid, reference=dtrain)
 
 # Params
 params = {
@@ -156,6 +145,13 @@ model = lgb.train(
 model_path = Path(__file__).parent.resolve() / 'lgbm_model_eth_10m.pkl'
 with open(model_path, 'wb') as f:
     pickle.dump(model, f)
+export(model, model_path)  # flat copy for live scoring (common/flat_trees.py)
+# Versioned copy with its feature schema, label, window and valid score (common/model_registry.py)
+ModelRegistry().register(
+    Path(__file__).parent.resolve().name, model, feature_names=names,
+    label=data_handler_config["data_loader"]["kwargs"]["config"]["label"][0][0],
+    train_window=ds.segments["train"], metrics=dict(model.best_score["valid_1"]), feature_set=FEATURE_SET,
+)
 
 print(f"Model saved to {model_path}")
 
@@ -11,63 +11,20 @@ from pathlib import Path
 from qlib.data.dataset.handler import DataHandlerLP
 from qlib.data.dataset import DatasetH
 import qlib
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.factors import qlib_fields
+from common.signal_backtest import threshold_sweep
 
 provider_uri = '/Users/zhangzc/.qlib/qlib_data/crypto_10m'
 qlib.init(provider_uri=provider_uri)
 
 market = "all"
 
-# Re-define features (Must match training!)
-fields = []
-names = []
-for n in [1, 5, 10, 20, 60]:
-    fields.append(f"$close / Ref($close, {n}) - 1"); names.append(f"ROC_{n}")
-for n in [10, 20, 60]:
-    fields.append(f"Std($close, {n}) / Mean($close, {n})"); names.append(f"VOL_{n}")
-for n in [5, 10, 20, 60]:
-    fields.append(f"$close / Mean($close, {n}) - 1"); names.append(f"MA_{n}")
-for n in [5, 10, 20]:
-    fields.append(f"$volume / Mean($volume, {n})"); names.append(f"V_MA_Ratio_{n}")
-fields.append("$high / $close - 1"); names.append("K_HIGH_REL")
-fields.append("$low / $close - 1"); names.append("K_LOW_REL")
-fields.append("$open / $close - 1"); names.append("K_OPEN_REL")
-fields.append("($high - $low) / $close"); names.append("H_L_Ratio")
-fields.append("($close - $open) / $open"); names.append("C_O_Ratio")
-
-# RD-Agent Gen-1 Hypotheses
-fields.append("($volume / Mean($volume, 20)) * ($close / Ref($close, 1) - 1)"); names.append("H1_Spike")
-fields.append("($close - Min($close, 30)) / (Max($close, 30) - Min($close, 30) + 1e-9)"); names.append("H2_Quantile")
-fields.append("(Mean($close, 20) / $close - 1) / (Std($close, 20) / Mean($close, 20) + 1e-9)"); names.append("H3_BiasVol")
-
-# RD-Agent Gen-2 Hypotheses
-fields.append("(($high-$low)/$close) / (Mean(($high-$low)/$close, 60) + 1e-9)"); names.append("H4_VRegime")
-fields.append("($close / Ref($close, 5) - 1) / (Std($close, 5) / Mean($close, 5) + 1e-9)"); names.append("H5_MQuality")
-fields.append("($close / Mean($close, 20) - 1) * ($close / Ref($close, 1) - 1)"); names.append("H6_Slope")
-
-# RD-Agent Gen-3 Hypotheses
-fields.append("($close / Ref($close, 5) - 1) / ($close / Ref($close, 20) - 1 + 1e-9)"); names.append("H7_TAccel")
-fields.append("Std($close, 10) / (Std($close, 60) + 1e-9)"); names.append("H8_VSqueeze")
-fields.append("($close / Ref($close, 1) - 1) * ($volume / Mean($volume, 20) + 1e-9)"); names.append("H9_VMom")
-
-# RD-Agent Gen-4 Hypotheses
-fields.append("($close / Ref($close, 1) - 1) * ($volume / Mean($volume, 10))"); names.append("H10_PVInt")
-fields.append("($close - Min($low, 20)) / (Max($high, 20) - Min($low, 20) + 1e-9)"); names.append("H11_KDJK")
-fields.append("Mean($close / Ref($close, 1) > 1, 20)"); names.append("H12_UpStreak")
-
-# RD-Agent Gen-6 Hypotheses (Fresh Approach)
-fields.append("$close / Max($high, 20) - 1"); names.append("H13_HBreak")
-fields.append("$close / Min($low, 20) - 1"); names.append("H14_LBreak")
-fields.append("(Mean($close, 5) / Mean($close, 20) - 1) + (Mean($close, 20) / Mean($close, 60) - 1)"); names.append("H15_TriMA")
-
-# RD-Agent Gen-7 Hypotheses (Targeting 100x)
-fields.append("Abs($close / Ref($close, 1) - 1)"); names.append("H16_ExtRet")
-fields.append("($volume / Mean($volume, 10)) / (Abs($close / Ref($close, 1) - 1) + 1e-9)"); names.append("H17_VPDiv")
-fields.append("($high - $low) / (Mean($high - $low, 20) + 1e-9)"); names.append("H18_RangeExp")
-
-# RD-Agent Gen-9 Hypotheses (Fresh Approach for 100x)
-fields.append("($close / Ref($close, 5) - 1) - (Ref($close, 5) / Ref($close, 10) - 1)"); names.append("H19_MomAccel")
-fields.append("Abs($close / Mean($close, 60) - 1)"); names.append("H20_ExtDev")
-fields.append("$volume / Max($volume, 20)"); names.append("H21_VolShock")
+# Same feature set as training (common/factors.py)
+FEATURE_SET = "alpha158_opt"
+fields, names = qlib_fields(FEATURE_SET)
 
 data_handler_config = {
     "start_time": "2025-12-01", # Test Period
@@ -80,12 +37,14 @@ data_handler_config = {
         {"class": "DropnaLabel"},
     ],
     "data_loader": {
-        "class": "QlibDataLoader",
+        "class": "DagDataLoader",  # QlibDataLoader with shared sub-expressions computed once
+        "module_path": "common.qlib_loader",
         "kwargs": {
             "config": {
                 "feature": (fields, names),
                 "label": (["Ref($close, -1) / $close - 1"], ["label"])
-            }
+            },
+            "cache_dir": "~/.qlib/feature_cache",  # float32 columns reused by later runs over the same data
         }
     }
 }
@@ -151,6 +110,12 @@ print(f"Win Rate:     {win_rate*100:.2f}%")
 print(f"Trades:       {n_trades:.0f}")
 print("════════════════════════════════════════════════════════════════════════")
 
+# Same predictions over a grid of thresholds / costs (common/signal_backtest.py)
+sweep = threshold_sweep(pred, label_series, np.linspace(0, 0.002, 2001), [cost, cost * 2], per_unit=False)
+print("\nThreshold sweep: best 5 per cost")
+for _, g in sweep.groupby("cost"):
+    print(g.nlargest(5, "total_return").to_string(index=False))
+
 # 5. Export to CSV for detailed analysis
 res_csv_path = Path(__file__).parent.resolve() / "ai_backtest_results.csv"
 res_df.to_csv(res_csv_path)
@@ -1,13 +1,18 @@
 
 import time
-import pandas as pd
 import numpy as np
 import lightgbm as lgb
-import pickle
-import requests
+import sys
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.binance_client import send_telegram
+from common.factors import compute_factors, factor_exprs, feature_names
+from common.feature_engine import FeatureEngine, mismatches
+from common.walk_forward import PublishedModel
+from common.kline_stream import KlineStream
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Configuration
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -15,7 +20,10 @@ SYMBOL = "ETHUSDT"
 INTERVAL = "1m" # We fetch 1m data and resample to 10m
 LOOKBACK_BARS = 200 # Need enough data for 60-period MA/ROC + Safety buffer
 RESAMPLE_FREQ = "10min"
+USE_STREAM = True # WebSocket kline stream; False falls back to REST polling
+BAR_CACHE = Path(__file__).parent / 'bar_cache' / f'{SYMBOL}_{INTERVAL}.ring' # mmap'd 1m bars, survives restarts
 MODEL_PATH = Path(__file__).parent.resolve() / 'lgbm_model_eth_10m.pkl'
+FEATURE_SET = "alpha158_opt" # common/factors.py, the set train_lgbm_eth.py trained on
 THRESHOLD = 0.001 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -28,137 +36,15 @@ def send_telegram_alert(message):
     if not TG_TOKEN or not TG_CHAT_ID:
         return
     
-    url = f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TG_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown"
-    }
-    try:
-        requests.post(url, json=payload, timeout=5)
-    except Exception as e:
-        print(f"Failed to send TG alert: {e}")
-
-def get_binance_klines(symbol, interval, limit=1500):
-    url = "https://fapi.binance.com/fapi/v1/klines"
-    params = {
-        "symbol": symbol,
-        "interval": interval,
-        "limit": limit
-    }
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        if isinstance(data, dict) and 'code' in data:
-            print(f"Error fetching data: {data}")
-            return []
-        return data # [[open_time, open, high, low, close, vol, ...], ...]
-    except Exception as e:
-        print(f"Request Error: {e}")
-        return []
-
-def fetch_and_prepare_data(symbol=SYMBOL, interval=INTERVAL):
-    # Fetch 1m data
-    raw_klines = get_binance_klines(symbol, interval, limit=1000)
-    if not raw_klines:
-        return pd.DataFrame()
-        
-    cols = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'trades', 'buyer_buy_base', 'buyer_buy_quote', 'ignore']
-    df = pd.DataFrame(raw_klines, columns=cols)
-    df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
-    df = df.set_index('datetime').sort_index()
-    
-    num_cols = ['open', 'high', 'low', 'close', 'volume']
-    for c in num_cols:
-        df[c] = df[c].astype(float)
-        
-    # Resample to 10min for Model
-    # Logic matches prepare_eth_data.py
-    df_10m = df.resample(RESAMPLE_FREQ).agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }).dropna()
-    
-    return df_10m
+    if send_telegram(TG_TOKEN, TG_CHAT_ID, message, timeout=5) is None:
+        print("Failed to send TG alert")
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 2. Feature Generation (Must match train_lgbm_eth.py)
 # ═══════════════════════════════════════════════════════════════════════════════
 def generate_features(df):
-    df = df.copy()
-    
-    # 1. Momentum / ROC
-    for n in [1, 5, 10, 20, 60]:
-        df[f'ROC_{n}'] = df['close'] / df['close'].shift(n) - 1
-        
-    # 2. Volatility
-    for n in [10, 20, 60]:
-        rolling_std = df['close'].rolling(n).std()
-        rolling_mean = df['close'].rolling(n).mean()
-        df[f'VOL_{n}'] = rolling_std / rolling_mean
-        
-    # 3. MA Divergence
-    for n in [5, 10, 20, 60]:
-        rolling_mean = df['close'].rolling(n).mean()
-        df[f'MA_{n}'] = df['close'] / rolling_mean - 1
-        
-    # 4. Volume Features
-    for n in [5, 10, 20]:
-        rolling_v_mean = df['volume'].rolling(n).mean()
-        df[f'V_MA_Ratio_{n}'] = df['volume'] / rolling_v_mean
-
-    # 5. K-Line Shapes
-    df['K_HIGH_REL'] = df['high'] / df['close'] - 1
-    df['K_LOW_REL'] = df['low'] / df['close'] - 1
-    df['K_OPEN_REL'] = df['open'] / df['close'] - 1
-    df['H_L_Ratio'] = (df['high'] - df['low']) / df['close']
-    df['C_O_Ratio'] = (df['close'] - df['open']) / df['open']
-    
-    # 6. RD-Agent Gen-1 Hypotheses
-    # H1: Energy Spike
-    df['H1_Spike'] = (df['volume'] / df['volume'].rolling(20).mean()) * (df['close'] / df['close'].shift(1) - 1)
-    # H2: Price Quantile Position
-    df['H2_Quantile'] = (df['close'] - df['close'].rolling(30).min()) / (df['close'].rolling(30).max() - df['close'].rolling(30).min() + 1e-9)
-    # H3: Bias/Volatility
-    df['H3_BiasVol'] = (df['close'].rolling(20).mean() / df['close'] - 1) / (df['close'].rolling(20).std() / df['close'].rolling(20).mean() + 1e-9)
-
-    # 7. RD-Agent Gen-2 Hypotheses (Advanced Volatility)
-    # H4: VRegime
-    vol = (df['high'] - df['low']) / df['close']
-    df['H4_VRegime'] = vol / (vol.rolling(60).mean() + 1e-9)
-    # H5: MQuality
-    df['H5_MQuality'] = (df['close'] / df['close'].shift(5) - 1) / (df['close'].rolling(5).std() / df['close'].rolling(5).mean() + 1e-9)
-    # H6: Slope
-    df['H6_Slope'] = (df['close'] / df['close'].rolling(20).mean() - 1) * (df['close'] / df['close'].shift(1) - 1)
-    
-    # 8. RD-Agent Gen-3 Hypotheses
-    # H7: Trend Acceleration
-    df['H7_TAccel'] = (df['close'] / df['close'].shift(5) - 1) / (df['close'] / df['close'].shift(20) - 1 + 1e-9)
-    # H8: Volatility Squeeze
-    df['H8_VSqueeze'] = df['close'].rolling(10).std() / (df['close'].rolling(60).std() + 1e-9)
-    # H9: Volume-Confirmed Momentum
-    df['H9_VMom'] = (df['close'] / df['close'].shift(1) - 1) * (df['volume'] / df['volume'].rolling(20).mean() + 1e-9)
-
-    # 9. RD-Agent Gen-4 Hypotheses (Ultimate Strategy)
-    # H10: Price-Volume Interaction
-    df['H10_PVInt'] = (df['close'] / df['close'].shift(1) - 1) * (df['volume'] / df['volume'].rolling(10).mean())
-    # H11: Dynamic Range Position (KDJ-Ref)
-    df['H11_KDJK'] = (df['close'] - df['low'].rolling(20).min()) / (df['high'].rolling(20).max() - df['low'].rolling(20).min() + 1e-9)
-    # H12: Trend Persistence (ROC Mean)
-    df['H12_UpStreak'] = (df['close'] / df['close'].shift(1) > 1).rolling(20).sum() / 20.0
-
-    # 10. RD-Agent Gen-6 Hypotheses (Breakthrough 1000%+)
-    # H13: High Breakout Signal
-    df['H13_HBreak'] = df['close'] / df['high'].rolling(20).max() - 1
-    # H14: Low Breakout Signal
-    df['H14_LBreak'] = df['close'] / df['low'].rolling(20).min() - 1
-    # H15: Triple MA Spread
-    df['H15_TriMA'] = (df['close'].rolling(5).mean() / df['close'].rolling(20).mean() - 1) + (df['close'].rolling(20).mean() / df['close'].rolling(60).mean() - 1)
-    
-    return df
+    # Compiled NumPy kernel of the factor set: each shared rolling statistic is computed once
+    return df.assign(**compute_factors(df, FEATURE_SET))
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 3. Main Loop
@@ -169,19 +55,27 @@ def main():
         return
         
     print(f"Loading Model from {MODEL_PATH}...")
-    with open(MODEL_PATH, 'rb') as f:
-        model = pickle.load(f)
+    # Reloaded when common.walk_forward publishes a new one; refused if its features are not FEATURE_SET's
+    model = PublishedModel(MODEL_PATH, feature_names(FEATURE_SET))
+    model.get()
         
     print(f"Starting Live Inference for {SYMBOL}...")
     print(f"Resample: {RESAMPLE_FREQ}, Threshold: {THRESHOLD}")
     print("Press Ctrl+C to stop.\n")
     
+    # Bars arrive from the kline stream the moment they close (REST fallback polls).
+    # Either way the 1m window is resumed from BAR_CACHE, so only missed bars are fetched.
+    stream = KlineStream(SYMBOL, INTERVAL, RESAMPLE_FREQ, window=LOOKBACK_BARS * 10, cache_path=BAR_CACHE)
+    if USE_STREAM:
+        stream.start()
+    engine = FeatureEngine(factor_exprs(FEATURE_SET))
+    
     last_processed_time = None
     
     try:
         while True:
             # 1. Fetch
-            df = fetch_and_prepare_data()
+            df = stream.wait_for_bar() if USE_STREAM else stream.poll()
             if df.empty:
                 time.sleep(10)
                 continue
@@ -196,65 +90,22 @@ def main():
                 
             last_processed_time = current_last_time
             
-            # 2. Generate Features
-            # We need to generate for the whole DF to handle rolling windows correctly
-            # preparing feature columns
-            df_features = generate_features(df)
-            
-            # Select feature columns in specific order (Must match training!)
-            feature_cols = []
-            # ROC
-            for n in [1, 5, 10, 20, 60]: feature_cols.append(f"ROC_{n}")
-            # VOL
-            for n in [10, 20, 60]: feature_cols.append(f"VOL_{n}")
-            # MA
-            for n in [5, 10, 20, 60]: feature_cols.append(f"MA_{n}")
-            # Volume Features
-            for n in [5, 10, 20]: feature_cols.append(f"V_MA_Ratio_{n}")
-            # K-Line Shapes
-            feature_cols.append("K_HIGH_REL")
-            feature_cols.append("K_LOW_REL")
-            feature_cols.append("K_OPEN_REL")
-            feature_cols.append("H_L_Ratio")
-            feature_cols.append("C_O_Ratio")
-            # RD-Agent Gen-1 Hypotheses
-            feature_cols.append("H1_Spike")
-            feature_cols.append("H2_Quantile")
-            feature_cols.append("H3_BiasVol")
-            # RD-Agent Gen-2 Hypotheses
-            feature_cols.append("H4_VRegime")
-            feature_cols.append("H5_MQuality")
-            feature_cols.append("H6_Slope")
-            # RD-Agent Gen-3 Hypotheses
-            feature_cols.append("H7_TAccel")
-            feature_cols.append("H8_VSqueeze")
-            feature_cols.append("H9_VMom")
-            # RD-Agent Gen-4 Hypotheses
-            feature_cols.append("H10_PVInt")
-            feature_cols.append("H11_KDJK")
-            feature_cols.append("H12_UpStreak")
-            # RD-Agent Gen-6 Hypotheses
-            feature_cols.append("H13_HBreak")
-            feature_cols.append("H14_LBreak")
-            feature_cols.append("H15_TriMA")
-            
-            # Get the very last row (Current completed bar)
-            # Actually, if we are trading "on close", we trade based on the just-closed bar.
-            # df.index[-1] is the open time of the last bar? 
-            # Binance kline open time. So if now is 10:11, the last 10m bar is 10:00-10:10.
-            # Its open_time is 10:00. 
-            # We want to predict for the NEXT bar (10:10-10:20) using data up to 10:10.
-            # So taking the last row of df is correct (it represents the most recent completed period).
-            
-            latest_features = df_features.iloc[[-1]][feature_cols]
+            first_frame = engine.last_time is None
+            # Folds in only bars the engine has not seen; features in feature_names(FEATURE_SET) order
+            latest_features = engine.update_frame(df)
+            if first_frame:
+                # One-off check of the streaming engine against the batch DAG
+                bad = mismatches(engine.frame(), generate_features(df).iloc[[-1]])
+                if bad:
+                    print(f"⚠️ Streaming features differ from generate_features: {bad}")
             
             # Check for NaNs (e.g. not enough history for rolling 60)
-            if latest_features.isna().any().any():
+            if np.isnan(latest_features).any():
                 print(f"[{current_last_time}] Not enough data for features. Waiting...")
                 continue
                 
             # 3. Predict
-            pred_score = model.predict(latest_features)[0]
+            pred_score = model.get().predict(latest_features.reshape(1, -1))[0]
             
             # 4. Signal Logic
             signal = "HOLD"
@@ -279,7 +130,8 @@ def main():
                 send_telegram_alert(tg_msg)
             
             # Sleep to avoid spam
-            time.sleep(30) 
+            if not USE_STREAM:
+                time.sleep(30)
             
     except KeyboardInterrupt:
         print("\nStopped.")
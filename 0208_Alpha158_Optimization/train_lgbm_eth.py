@@ -10,6 +10,13 @@ import numpy as np
 import lightgbm as lgb
 from pathlib import Path
 import pickle
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.factors import qlib_fields
+from common.flat_trees import export
+from common.lgb_data import lgb_dataset
+from common.model_registry import ModelRegistry
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # 1. Configuration 
@@ -27,87 +34,9 @@ benchmark = "ETHUSDT"
 # Standard Alpha158 might need adjustment for crypto decimals?
 # But normalized features should work.
 
-# Custom Feature Factors
-# We define a simple set of technical indicators to avoid Alpha158 complexities
-fields = []
-names = []
-
-# 1. Momentum / ROC
-for n in [1, 5, 10, 20, 60]:
-    fields.append(f"$close / Ref($close, {n}) - 1")
-    names.append(f"ROC_{n}")
-
-# 2. Volatility
-for n in [10, 20, 60]:
-    fields.append(f"Std($close, {n}) / Mean($close, {n})")
-    names.append(f"VOL_{n}")
-
-# 3. MA Divergence
-for n in [5, 10, 20, 60]:
-    fields.append(f"$close / Mean($close, {n}) - 1")
-    names.append(f"MA_{n}")
-
-# 4. Volume Features (Simple)
-for n in [5, 10, 20]:
-    fields.append(f"$volume / Mean($volume, {n})")
-    names.append(f"V_MA_Ratio_{n}")
-
-# 5. K-Line Shapes
-fields.append("$high / $close - 1"); names.append("K_HIGH_REL")
-fields.append("$low / $close - 1"); names.append("K_LOW_REL")
-fields.append("$open / $close - 1"); names.append("K_OPEN_REL")
-fields.append("($high - $low) / $close"); names.append("H_L_Ratio")
-fields.append("($close - $open) / $open"); names.append("C_O_Ratio")
-
-# 6. RD-Agent Gen-1 Hypotheses
-# H1: Energy Spike
-fields.append("($volume / Mean($volume, 20)) * ($close / Ref($close, 1) - 1)"); names.append("H1_Spike")
-# H2: Price Quantile Position
-fields.append("($close - Min($close, 30)) / (Max($close, 30) - Min($close, 30) + 1e-9)"); names.append("H2_Quantile")
-# H3: Bias/Volatility
-fields.append("(Mean($close, 20) / $close - 1) / (Std($close, 20) / Mean($close, 20) + 1e-9)"); names.append("H3_BiasVol")
-
-# 7. RD-Agent Gen-2 Hypotheses
-fields.append("(($high-$low)/$close) / (Mean(($high-$low)/$close, 60) + 1e-9)"); names.append("H4_VRegime")
-fields.append("($close / Ref($close, 5) - 1) / (Std($close, 5) / Mean($close, 5) + 1e-9)"); names.append("H5_MQuality")
-fields.append("($close / Mean($close, 20) - 1) * ($close / Ref($close, 1) - 1)"); names.append("H6_Slope")
-
-# 8. RD-Agent Gen-3 Hypotheses
-fields.append("($close / Ref($close, 5) - 1) / ($close / Ref($close, 20) - 1 + 1e-9)"); names.append("H7_TAccel")
-fields.append("Std($close, 10) / (Std($close, 60) + 1e-9)"); names.append("H8_VSqueeze")
-fields.append("($close / Ref($close, 1) - 1) * ($volume / Mean($volume, 20) + 1e-9)"); names.append("H9_VMom")
-
-# 9. RD-Agent Gen-4 Hypotheses (Ultimate Strategy)
-# H10: Price-Volume Interaction (Proxy for Correlation)
-fields.append("($close / Ref($close, 1) - 1) * ($volume / Mean($volume, 10))"); names.append("H10_PVInt")
-# H11: Dynamic Range Position (KDJ logic)
-fields.append("($close - Min($low, 20)) / (Max($high, 20) - Min($low, 20) + 1e-9)"); names.append("H11_KDJK")
-# H12: Trend Persistence (ROC Mean)
-fields.append("Mean($close / Ref($close, 1) > 1, 20)"); names.append("H12_UpStreak")
-
-# 10. RD-Agent Gen-6 Hypotheses (Fresh Approach)
-# H13: High Breakout Signal (Close vs Recent High)
-fields.append("$close / Max($high, 20) - 1"); names.append("H13_HBreak")
-# H14: Low Breakout Signal (Close vs Recent Low)
-fields.append("$close / Min($low, 20) - 1"); names.append("H14_LBreak")
-# H15: Triple MA Spread (Fast-Mid-Slow alignment)
-fields.append("(Mean($close, 5) / Mean($close, 20) - 1) + (Mean($close, 20) / Mean($close, 60) - 1)"); names.append("H15_TriMA")
-
-# 11. RD-Agent Gen-7 Hypotheses (Targeting 100x)
-# H16: Extreme Return Detection (Current bar return magnitude)
-fields.append("Abs($close / Ref($close, 1) - 1)"); names.append("H16_ExtRet")
-# H17: Volume-Price Divergence (Volume rising while price flat)
-fields.append("($volume / Mean($volume, 10)) / (Abs($close / Ref($close, 1) - 1) + 1e-9)"); names.append("H17_VPDiv")
-# H18: Range Expansion Ratio (Current bar range vs average)
-fields.append("($high - $low) / (Mean($high - $low, 20) + 1e-9)"); names.append("H18_RangeExp")
-
-# 12. RD-Agent Gen-9 Hypotheses (Fresh Approach for 100x)
-# H19: Momentum Acceleration (ROC of ROC)
-fields.append("($close / Ref($close, 5) - 1) - (Ref($close, 5) / Ref($close, 10) - 1)"); names.append("H19_MomAccel")
-# H20: Extreme Price Deviation (Distance from 60-bar mean)
-fields.append("Abs($close / Mean($close, 60) - 1)"); names.append("H20_ExtDev")
-# H21: Volume Shock (Sudden volume spike)
-fields.append("$volume / Max($volume, 20)"); names.append("H21_VolShock")
+# Custom Feature Factors (defined once in common/factors.py, shared with backtest and live)
+FEATURE_SET = "alpha158_opt"
+fields, names = qlib_fields(FEATURE_SET)
 
 data_handler_config = {
     "start_time": "2025-01-05",
@@ -115,6 +44,7 @@ data_handler_config = {
     # "fit_start_time": "2025-02-10", # Not needed for DataHandlerLP
     # "fit_end_time": "2025-09-30",
     "instruments": market,
+    "drop_raw": True,  # only DK_L is used; do not keep the raw panel next to the processed ones
     "infer_processors": [
         {"class": "Fillna", "kwargs": {"fields_group": "feature"}},
     ],
@@ -122,12 +52,15 @@ data_handler_config = {
         {"class": "DropnaLabel"},
     ],
     "data_loader": {
-        "class": "QlibDataLoader",
+        "class": "DagDataLoader",  # QlibDataLoader with shared sub-expressions computed once
+        "module_path": "common.qlib_loader",
         "kwargs": {
             "config": {
                 "feature": (fields, names),
                 "label": (["Ref($close, -1) / $close - 1"], ["label"])
-            }
+            },
+            "cache_dir": "~/.qlib/feature_cache",  # float32 columns reused by later runs over the same data
+            "float32": True,  # float32 feature matrix from load to lgb.Dataset
         }
     }
 }
@@ -175,9 +108,9 @@ print(y_train.describe())
 print(f"X_train NaNs: {X_train.isna().sum().sum()}")
 print(f"y_train NaNs: {y_train.isna().sum().sum()}")
 
-# Create LGB Dataset
-dtrain = lgb.Dataset(X_train, label=y_train)
-dvalid = lgb.Dataset(X_valid, label=y_valid, reference=dtrain)
+# Create LGB Dataset (the float32 feature block is handed over as-is, not widened and copied)
+dtrain = lgb_dataset(X_train, y_train)
+dvalid = lgb_dataset(X_valid, y_valid, reference=dtrain)
 
 # Params
 params = {
@@ -212,6 +145,13 @@ model = lgb.train(
 model_path = Path(__file__).parent.resolve() / 'lgbm_model_eth_10m.pkl'
 with open(model_path, 'wb') as f:
     pickle.dump(model, f)
+export(model, model_path)  # flat copy for live scoring (common/flat_trees.py)
+# Versioned copy with its feature schema, label, window and valid score (common/model_registry.py)
+ModelRegistry().register(
+    Path(__file__).parent.resolve().name, model, feature_names=names,
+    label=data_handler_config["data_loader"]["kwargs"]["config"]["label"][0][0],
+    train_window=ds.segments["train"], metrics=dict(model.best_score["valid_1"]), feature_set=FEATURE_SET,
+)
 
 print(f"Model saved to {model_path}")
 
@@ -18,7 +18,6 @@ from database import update_strategy_status, get_strategy_status, get_stats, clo
 from process_manager import ProcessManager
 
 import sys
-import os
 
 # 配置 BTC 策略引擎路径
 BTC_STRATEGY_PATH = "/Users/zhangzc/7/20260123/0208_Polymarket_BTC_15m"
@@ -27,7 +26,8 @@ if BTC_STRATEGY_PATH not in sys.path:
 
 from live_polymarket_qlib import LiveModel
 # 全局缓存模型实例
-btc_model = LiveModel(model_path=os.path.join(BTC_STRATEGY_PATH, "lgbm_btc_15m_final.pkl"))
+# Latest registered version (lazy, schema-checked); lgbm_btc_15m_final.pkl if none is registered
+btc_model = LiveModel()
 
 # 初始化
 app = FastAPI(title="AI Strategy Dashboard", version="1.0.0")
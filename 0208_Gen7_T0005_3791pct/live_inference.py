@@ -1,14 +1,19 @@
 
 import time
-import pandas as pd
 import numpy as np
 import lightgbm as lgb
-import pickle
-import requests
+import sys
 import json
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.binance_client import send_telegram
+from common.factors import compute_factors, factor_exprs, feature_names
+from common.feature_engine import FeatureEngine, mismatches
+from common.walk_forward import PublishedModel
+from common.kline_stream import KlineStream
+
 # 北京时区 (UTC+8)
 BEIJING_TZ = timezone(timedelta(hours=8))
 
@@ -19,7 +24,10 @@ SYMBOL = "ETHUSDT"
 INTERVAL = "1m" # We fetch 1m data and resample to 10m
 LOOKBACK_BARS = 200 # Need enough data for 60-period MA/ROC + Safety buffer
 RESAMPLE_FREQ = "10min"
+USE_STREAM = True # WebSocket kline stream; False falls back to REST polling
+BAR_CACHE = Path(__file__).parent / 'bar_cache' / f'{SYMBOL}_{INTERVAL}.ring' # mmap'd 1m bars, survives restarts
 MODEL_PATH = Path(__file__).parent.resolve() / 'lgbm_model_eth_10m.pkl'
+FEATURE_SET = "gen7" # common/factors.py, the set train_lgbm_eth.py trained on
 THRESHOLD = 0.00025  # Gen-7 3791% 阈值
 STRATEGY_NAME = "Gen-7-3791pct"
 
@@ -33,124 +41,12 @@ def send_telegram_alert(message):
     if not TG_TOKEN or not TG_CHAT_ID:
         return
     
-    url = f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TG_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown"
-    }
-    try:
-        requests.post(url, json=payload, timeout=15)
-    except Exception as e:
-        print(f"Failed to send TG alert: {e}")
-
-def get_binance_klines(symbol, interval, limit=1500):
-    url = "https://fapi.binance.com/fapi/v1/klines"
-    params = {
-        "symbol": symbol,
-        "interval": interval,
-        "limit": limit
-    }
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        if isinstance(data, dict) and 'code' in data:
-            print(f"Error fetching data: {data}")
-            return []
-        return data
-    except Exception as e:
-        print(f"Request Error: {e}")
-        return []
-
-def fetch_and_prepare_data(symbol=SYMBOL, interval=INTERVAL):
-    raw_klines = get_binance_klines(symbol, interval, limit=1000)
-    if not raw_klines:
-        return pd.DataFrame()
-        
-    cols = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_asset_volume', 'trades', 'buyer_buy_base', 'buyer_buy_quote', 'ignore']
-    df = pd.DataFrame(raw_klines, columns=cols)
-    df['datetime'] = pd.to_datetime(df['open_time'], unit='ms')
-    df = df.set_index('datetime').sort_index()
-    
-    num_cols = ['open', 'high', 'low', 'close', 'volume']
-    for c in num_cols:
-        df[c] = df[c].astype(float)
-        
-    df_10m = df.resample(RESAMPLE_FREQ).agg({
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }).dropna()
-    
-
-    # 11. RD-Agent Gen-7 Hypotheses (Targeting 100x)
-    # H16: Extreme Return Detection
-    df['H16_ExtRet'] = (df['close'] / df['close'].shift(1) - 1).abs()
-    # H17: Volume-Price Divergence
-    df['H17_VPDiv'] = (df['volume'] / df['volume'].rolling(10).mean()) / ((df['close'] / df['close'].shift(1) - 1).abs() + 1e-9)
-    # H18: Range Expansion Ratio
-    df['H18_RangeExp'] = (df['high'] - df['low']) / ((df['high'] - df['low']).rolling(20).mean() + 1e-9)
-
-    return df_10m
+    if send_telegram(TG_TOKEN, TG_CHAT_ID, message, timeout=15) is None:
+        print("Failed to send TG alert")
 
 def generate_features(df):
-    df = df.copy()
-    
-    for n in [1, 5, 10, 20, 60]:
-        df[f'ROC_{n}'] = df['close'] / df['close'].shift(n) - 1
-        
-    for n in [10, 20, 60]:
-        rolling_std = df['close'].rolling(n).std()
-        rolling_mean = df['close'].rolling(n).mean()
-        df[f'VOL_{n}'] = rolling_std / rolling_mean
-        
-    for n in [5, 10, 20, 60]:
-        rolling_mean = df['close'].rolling(n).mean()
-        df[f'MA_{n}'] = df['close'] / rolling_mean - 1
-        
-    for n in [5, 10, 20]:
-        rolling_v_mean = df['volume'].rolling(n).mean()
-        df[f'V_MA_Ratio_{n}'] = df['volume'] / rolling_v_mean
-
-    df['K_HIGH_REL'] = df['high'] / df['close'] - 1
-    df['K_LOW_REL'] = df['low'] / df['close'] - 1
-    df['K_OPEN_REL'] = df['open'] / df['close'] - 1
-    df['H_L_Ratio'] = (df['high'] - df['low']) / df['close']
-    df['C_O_Ratio'] = (df['close'] - df['open']) / df['open']
-    
-    df['H1_Spike'] = (df['volume'] / df['volume'].rolling(20).mean()) * (df['close'] / df['close'].shift(1) - 1)
-    df['H2_Quantile'] = (df['close'] - df['close'].rolling(30).min()) / (df['close'].rolling(30).max() - df['close'].rolling(30).min() + 1e-9)
-    df['H3_BiasVol'] = (df['close'].rolling(20).mean() / df['close'] - 1) / (df['close'].rolling(20).std() / df['close'].rolling(20).mean() + 1e-9)
-
-    vol = (df['high'] - df['low']) / df['close']
-    df['H4_VRegime'] = vol / (vol.rolling(60).mean() + 1e-9)
-    df['H5_MQuality'] = (df['close'] / df['close'].shift(5) - 1) / (df['close'].rolling(5).std() / df['close'].rolling(5).mean() + 1e-9)
-    df['H6_Slope'] = (df['close'] / df['close'].rolling(20).mean() - 1) * (df['close'] / df['close'].shift(1) - 1)
-    
-    df['H7_TAccel'] = (df['close'] / df['close'].shift(5) - 1) / (df['close'] / df['close'].shift(20) - 1 + 1e-9)
-    df['H8_VSqueeze'] = df['close'].rolling(10).std() / (df['close'].rolling(60).std() + 1e-9)
-    df['H9_VMom'] = (df['close'] / df['close'].shift(1) - 1) * (df['volume'] / df['volume'].rolling(20).mean() + 1e-9)
-
-    df['H10_PVInt'] = (df['close'] / df['close'].shift(1) - 1) * (df['volume'] / df['volume'].rolling(10).mean())
-    df['H11_KDJK'] = (df['close'] - df['low'].rolling(20).min()) / (df['high'].rolling(20).max() - df['low'].rolling(20).min() + 1e-9)
-    df['H12_UpStreak'] = (df['close'] / df['close'].shift(1) > 1).rolling(20).sum() / 20.0
-
-    df['H13_HBreak'] = df['close'] / df['high'].rolling(20).max() - 1
-    df['H14_LBreak'] = df['close'] / df['low'].rolling(20).min() - 1
-    df['H15_TriMA'] = (df['close'].rolling(5).mean() / df['close'].rolling(20).mean() - 1) + (df['close'].rolling(20).mean() / df['close'].rolling(60).mean() - 1)
-    
-
-    # 11. RD-Agent Gen-7 Hypotheses (Targeting 100x)
-    # H16: Extreme Return Detection
-    df['H16_ExtRet'] = (df['close'] / df['close'].shift(1) - 1).abs()
-    # H17: Volume-Price Divergence
-    df['H17_VPDiv'] = (df['volume'] / df['volume'].rolling(10).mean()) / ((df['close'] / df['close'].shift(1) - 1).abs() + 1e-9)
-    # H18: Range Expansion Ratio
-    df['H18_RangeExp'] = (df['high'] - df['low']) / ((df['high'] - df['low']).rolling(20).mean() + 1e-9)
-
-    return df
+    # Compiled NumPy kernel of the factor set: each shared rolling statistic is computed once
+    return df.assign(**compute_factors(df, FEATURE_SET))
 
 def main():
     if not MODEL_PATH.exists():
@@ -158,13 +54,21 @@ def main():
         return
         
     print(f"Loading Model from {MODEL_PATH}...")
-    with open(MODEL_PATH, 'rb') as f:
-        model = pickle.load(f)
+    # Reloaded when common.walk_forward publishes a new one; refused if its features are not FEATURE_SET's
+    model = PublishedModel(MODEL_PATH, feature_names(FEATURE_SET))
+    model.get()
         
     print(f"Starting Live Inference for {SYMBOL}...")
     print(f"Resample: {RESAMPLE_FREQ}, Threshold: {THRESHOLD}")
     print("Press Ctrl+C to stop.\n")
     
+    # Bars arrive from the kline stream the moment they close (REST fallback polls).
+    # Either way the 1m window is resumed from BAR_CACHE, so only missed bars are fetched.
+    stream = KlineStream(SYMBOL, INTERVAL, RESAMPLE_FREQ, window=LOOKBACK_BARS * 10, cache_path=BAR_CACHE)
+    if USE_STREAM:
+        stream.start()
+    engine = FeatureEngine(factor_exprs(FEATURE_SET))
+    
     last_processed_time = None
     last_heartbeat_time = None
     
@@ -180,7 +84,7 @@ def main():
     
     try:
         while True:
-            df = fetch_and_prepare_data()
+            df = stream.wait_for_bar() if USE_STREAM else stream.poll()
             if df.empty:
                 time.sleep(10)
                 continue
@@ -194,28 +98,20 @@ def main():
                 
             last_processed_time = current_last_time
             
-            df_features = generate_features(df)
-            
-            feature_cols = []
-            for n in [1, 5, 10, 20, 60]: feature_cols.append(f"ROC_{n}")
-            for n in [10, 20, 60]: feature_cols.append(f"VOL_{n}")
-            for n in [5, 10, 20, 60]: feature_cols.append(f"MA_{n}")
-            for n in [5, 10, 20]: feature_cols.append(f"V_MA_Ratio_{n}")
-            feature_cols.extend(["K_HIGH_REL", "K_LOW_REL", "K_OPEN_REL", "H_L_Ratio", "C_O_Ratio"])
-            feature_cols.extend(["H1_Spike", "H2_Quantile", "H3_BiasVol"])
-            feature_cols.extend(["H4_VRegime", "H5_MQuality", "H6_Slope"])
-            feature_cols.extend(["H7_TAccel", "H8_VSqueeze", "H9_VMom"])
-            feature_cols.extend(["H10_PVInt", "H11_KDJK", "H12_UpStreak"])
-            feature_cols.extend(["H13_HBreak", "H14_LBreak", "H15_TriMA"])
-            feature_cols.extend(["H16_ExtRet", "H17_VPDiv", "H18_RangeExp"])
-            
-            latest_features = df_features.iloc[[-1]][feature_cols]
+            first_frame = engine.last_time is None
+            # Folds in only bars the engine has not seen; features in feature_names(FEATURE_SET) order
+            latest_features = engine.update_frame(df)
+            if first_frame:
+                # One-off check of the streaming engine against the batch DAG
+                bad = mismatches(engine.frame(), generate_features(df).iloc[[-1]])
+                if bad:
+                    print(f"⚠️ Streaming features differ from generate_features: {bad}")
             
-            if latest_features.isna().any().any():
+            if np.isnan(latest_features).any():
                 print(f"[{current_last_time}] Not enough data for features. Waiting...")
                 continue
                 
-            pred_score = model.predict(latest_features)[0]
+            pred_score = model.get().predict(latest_features.reshape(1, -1))[0]
             current_price = df['close'].iloc[-1]
             current_high = df['high'].iloc[-1]
             current_low = df['low'].iloc[-1]
@@ -320,14 +216,11 @@ def main():
                 stop_loss = sl
                 take_profit = tp
                 
-                # Try to generate detailed reasons if columns exist
+                # Reasons from the latest bar's features (H14_LBreak is in gen7)
                 reasons = []
-                try:
-                    if 'H14_LBreak' in df_features.columns:
-                        h14 = df_features['H14_LBreak'].iloc[-1]
-                        if direction == "LONG" and h14 > 0.02: reasons.append(f"脱离低点 +{h14*100:.1f}%")
-                        if direction == "SHORT" and h14 < 0.01: reasons.append(f"接近低点 {h14*100:.1f}%")
-                except: pass
+                h14 = latest_features[engine.names.index('H14_LBreak')]
+                if direction == "LONG" and h14 > 0.02: reasons.append(f"脱离低点 +{h14*100:.1f}%")
+                if direction == "SHORT" and h14 < 0.01: reasons.append(f"接近低点 {h14*100:.1f}%")
                 
                 if not reasons: reasons.append(f"置信度 {abs(pred_score)*10000:.1f}bp")
                 reason_str = "、".join(reasons)
@@ -398,7 +291,8 @@ def main():
                  send_telegram_alert(msg)
                  last_heartbeat_time = current_last_time.hour
 
-            time.sleep(30) 
+            if not USE_STREAM:
+                time.sleep(30)
             
     except KeyboardInterrupt:
         print("\n已停止监控。")
@@ -7,6 +7,11 @@ from qlib.data.dataset import DatasetH
 from qlib.data.dataset.handler import DataHandlerLP
 import matplotlib.pyplot as plt
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.factors import qlib_fields
 
 # Configuration
 QLIB_DIR = os.path.expanduser("~/.qlib/qlib_data/my_crypto")
@@ -19,45 +24,8 @@ def backtest():
     print(f"Loading model from {MODEL_PATH}...")
     model = joblib.load(MODEL_PATH)
     
-    # ═══════════════════════════════════════════════════════════════════════════════
-    # RD-Agent Gen-10 Factor Definition (Ported from ETH Strategy)
-    # ═══════════════════════════════════════════════════════════════════════════════
-    fields = []
-    names = []
-
-    # 1. Momentum / ROC
-    for n in [1, 5, 10, 20, 60]:
-        fields.append(f"$close / Ref($close, {n}) - 1")
-        names.append(f"ROC_{n}")
-
-    # 2. Volatility
-    for n in [10, 20, 60]:
-        fields.append(f"Std($close, {n}) / Mean($close, {n})")
-        names.append(f"VOL_{n}")
-
-    # 3. MA Divergence
-    for n in [5, 10, 20, 60]:
-        fields.append(f"$close / Mean($close, {n}) - 1")
-        names.append(f"MA_{n}")
-
-    # 6. RD-Agent Gen-1 Hypotheses
-    fields.append("($volume / Mean($volume, 20)) * ($close / Ref($close, 1) - 1)"); names.append("H1_Spike")
-    fields.append("($close - Min($close, 30)) / (Max($close, 30) - Min($close, 30) + 1e-9)"); names.append("H2_Quantile")
-    fields.append("(Mean($close, 20) / $close - 1) / (Std($close, 20) / Mean($close, 20) + 1e-9)"); names.append("H3_BiasVol")
-
-    # 7. RD-Agent Gen-2 Hypotheses
-    fields.append("(($high-$low)/$close) / (Mean(($high-$low)/$close, 60) + 1e-9)"); names.append("H4_VRegime")
-    fields.append("($close / Ref($close, 5) - 1) / (Std($close, 5) / Mean($close, 5) + 1e-9)"); names.append("H5_MQuality")
-    fields.append("($close / Mean($close, 20) - 1) * ($close / Ref($close, 1) - 1)"); names.append("H6_Slope")
-
-    # 10. RD-Agent Gen-6 Hypotheses
-    fields.append("$close / Max($high, 20) - 1"); names.append("H13_HBreak")
-    fields.append("$close / Min($low, 20) - 1"); names.append("H14_LBreak")
-    fields.append("(Mean($close, 5) / Mean($close, 20) - 1) + (Mean($close, 20) / Mean($close, 60) - 1)"); names.append("H15_TriMA")
-    
-    # 11. RD-Agent Gen-7
-    fields.append("Abs($close / Ref($close, 1) - 1)"); names.append("H16_ExtRet")
-    fields.append("($volume / Mean($volume, 10)) / (Abs($close / Ref($close, 1) - 1) + 1e-9)"); names.append("H17_VPDiv")
+    # Factor definitions shared with the ETH strategies (common/factors.py)
+    fields, names = qlib_fields("btc_15m")
 
     # Define Data Handler Config (Must match training!)
     dh_config = {
@@ -76,12 +44,15 @@ def backtest():
             ],
             "process_type": "independent",
             "data_loader": {
-                "class": "QlibDataLoader",
+                "class": "DagDataLoader",  # QlibDataLoader with shared sub-expressions computed once
+                "module_path": "common.qlib_loader",
                 "kwargs": {
                     "config": {
                         "feature": (fields, names),
                         "label": (["Ref($close, -1) / $close - 1"], ["LABEL0"])
-                    }
+                    },
+                    "freq": "15min",
+                    "cache_dir": "~/.qlib/feature_cache",  # float32 columns reused by later runs over the same data
                 }
             }
         }
@@ -21,16 +21,18 @@ def check_data():
     print(f"First: {dates[0]}, Last: {dates[-1]}")
     
     # Check Feature
-    feat_path = Path(qlib_dir) / "features" / symbol / "close.bin"
+    feat_path = Path(qlib_dir) / "features" / symbol.lower() / "close.15min.bin"
     if not feat_path.exists():
-        print(f"Feature close.bin missing for {symbol}!")
+        print(f"Feature close.15min.bin missing for {symbol}!")
         return
         
-    # Read float32
+    # Read float32: start index into the calendar, then the values
     with open(feat_path, "rb") as f:
         data = np.frombuffer(f.read(), dtype=np.float32)
+    start, data = int(data[0]), data[1:]
+    dates = dates[start:]
         
-    print(f"Feature close.bin length: {len(data)}")
+    print(f"Feature close.15min.bin length: {len(data)} (starts at calendar step {start})")
     print(f"First 5: {data[:5]}")
     print(f"Last 5: {data[-5:]}")
     
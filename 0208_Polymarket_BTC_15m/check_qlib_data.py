@@ -23,7 +23,7 @@ for sym, ranges in inst_list.items():
     print(f"Symbol: {sym}, Ranges: {ranges}")
 
 # 4. Check binary files
-base_req = "features/15min/btcusdt/close.bin"
+base_req = "features/btcusdt/close.15min.bin"
 full_path = os.path.join(QLIB_DIR, base_req)
 if os.path.exists(full_path):
     size = os.path.getsize(full_path)
@@ -42,5 +42,5 @@ except Exception as e:
     print(f"Failed with indices: {e}")
 
 # 6. Check Feature Names manually
-path_check = os.path.join(QLIB_DIR, 'features', '15min', 'btcusdt')
+path_check = os.path.join(QLIB_DIR, 'features', 'btcusdt')
 print(f"Features folder list: {os.listdir(path_check) if os.path.exists(path_check) else 'N/A'}")
@@ -1,104 +1,53 @@
 
-import requests
+
 import pandas as pd
-import time
-from datetime import datetime, timedelta
+import sys
+import os
+from pathlib import Path
 
-def get_binance_data(endpoint, params):
-    url = f"https://fapi.binance.com{endpoint}"
-    for attempt in range(3):
-        try:
-            response = requests.get(url, params=params, timeout=20)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error {response.status_code}: {response.text}")
-                time.sleep(1)
-        except Exception as e:
-            print(f"Connection Error: {e}")
-            time.sleep(2)
-    return []
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.futures_data import asof_join, backfill_futures_data, load_futures_data
 
-def fetch_historical_oi(symbol, period='15m', limit=500):
-    """
-    Fetch historical Open Interest.
-    Note: Open interest history is usually limited to the last 30 days for 15m.
-    """
-    print(f"Fetching Open Interest for {symbol} ({period})...")
-    endpoint = "/futures/data/openInterestHist"
-    params = {
-        "symbol": symbol,
-        "period": period,
-        "limit": limit
-    }
-    data = get_binance_data(endpoint, params)
-    if not data: return pd.DataFrame()
-    
-    df = pd.DataFrame(data)
-    # Fields: ['symbol', 'sumOpenInterest', 'sumOpenInterestValue', 'timestamp']
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df['oi'] = df['sumOpenInterest'].astype(float)
-    df['oi_value'] = df['sumOpenInterestValue'].astype(float)
-    return df[['datetime', 'oi', 'oi_value']]
+# Persistent store of open interest / taker ratio / top-trader ratio history.
+# Binance only serves the last 30 days, so run this regularly to keep the
+# local history growing.
+STORE_DIR = Path(__file__).parent.resolve() / 'futures_data_store'
 
-def fetch_taker_ls_ratio(symbol, period='15m', limit=500):
+
+def fetch_extra_data(symbol, period='15m', store_dir=STORE_DIR):
     """
-    Taker Buy/Sell Volume Ratio.
+    Backfill Open Interest, Taker Buy/Sell Ratio and Top Trader Long/Short
+    Ratio into the store, then return the full stored history.
     """
-    print(f"Fetching Taker Buy/Sell Ratio for {symbol} ({period})...")
-    endpoint = "/futures/data/takerlongshortRatio"
-    params = {
-        "symbol": symbol,
-        "period": period,
-        "limit": limit
-    }
-    data = get_binance_data(endpoint, params)
-    if not data: return pd.DataFrame()
-    
-    df = pd.DataFrame(data)
-    # Fields: ['buySellRatio', 'buyVol', 'sellVol', 'timestamp']
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df['taker_ls_ratio'] = df['buySellRatio'].astype(float)
-    df['taker_buy_vol'] = df['buyVol'].astype(float)
-    df['taker_sell_vol'] = df['sellVol'].astype(float)
-    return df[['datetime', 'taker_ls_ratio', 'taker_buy_vol', 'taker_sell_vol']]
+    counts = backfill_futures_data(store_dir, symbol, period)
+    for name, n in counts.items():
+        print(f"{name}: {n} new rows")
+    return load_futures_data(store_dir, symbol, period)
+
 
-def fetch_top_trader_ls_ratio(symbol, period='15m', limit=500):
+def join_extra_features(df_klines, symbol="BTCUSDT", period='15m', store_dir=STORE_DIR):
     """
-    Top Trader Long/Short Ratio (Accounts).
+    As-of join the stored series onto a 15m kline table (``datetime`` = bar open).
+    Each bar gets the latest values published before it closed.
     """
-    print(f"Fetching Top Trader Long/Short Ratio for {symbol} ({period})...")
-    endpoint = "/futures/data/topLongShortAccountRatio"
-    params = {
-        "symbol": symbol,
-        "period": period,
-        "limit": limit
-    }
-    data = get_binance_data(endpoint, params)
-    if not data: return pd.DataFrame()
-    
-    df = pd.DataFrame(data)
-    # Fields: ['symbol', 'longShortRatio', 'longAccount', 'shortAccount', 'timestamp']
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df['top_trader_ls_ratio'] = df['longShortRatio'].astype(float)
-    df['top_trader_long_pct'] = df['longAccount'].astype(float)
-    return df[['datetime', 'top_trader_ls_ratio', 'top_trader_long_pct']]
+    extra = load_futures_data(store_dir, symbol, period)
+    return asof_join(df_klines, extra, bar_freq=period.replace('m', 'min'))
+
 
 if __name__ == "__main__":
     symbol = "BTCUSDT"
-    # Fetch as much as possible (limit 500)
-    df_oi = fetch_historical_oi(symbol)
-    df_taker = fetch_taker_ls_ratio(symbol)
-    df_top = fetch_top_trader_ls_ratio(symbol)
-    
-    # Merge on datetime
-    if not df_oi.empty:
-        df_final = df_oi.merge(df_taker, on='datetime', how='inner')
-        df_final = df_final.merge(df_top, on='datetime', how='inner')
-        
-        filename = "BTCUSDT_extra_data.csv"
-        df_final.to_csv(filename, index=False)
-        print(f"Saved {len(df_final)} extra data rows to {filename}")
-        print(f"Time range: {df_final['datetime'].min()} to {df_final['datetime'].max()}")
-    else:
+    df_extra = fetch_extra_data(symbol)
+
+    if df_extra.empty:
         print("Failed to fetch extra data.")
+    else:
+        print(f"Stored {len(df_extra)} extra data rows in {STORE_DIR}")
+        print(f"Time range: {df_extra['datetime'].min()} to {df_extra['datetime'].max()}")
+
+        # Join onto the 15m klines when they are present
+        kline_file = "BTCUSDT_15m.csv"
+        if os.path.exists(kline_file):
+            df = join_extra_features(pd.read_csv(kline_file), symbol)
+            filename = "BTCUSDT_15m_extra.csv"
+            df.to_csv(filename, index=False)
+            print(f"Saved {len(df)} rows with extra features to {filename}")
@@ -1,13 +1,20 @@
 import pandas as pd
-import numpy as np
 import os
+import sys
+from pathlib import Path
 
-def generate_triple_barrier_labels(csv_path, pt=0.008, sl=0.004, t1=12):
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.downloader import store_for
+from common.triple_barrier import grid_summary, path_barrier_labels, triple_barrier_grid, triple_barrier_labels
+
+def generate_triple_barrier_labels(csv_path, pt=0.008, sl=0.004, t1=12, high_low=False, symbol="BTCUSDT"):
     """
     Generate Fixed Triple Barrier Labels (Alpha-Squeezing):
     - pt: 0.8% Profit Target
     - sl: 0.4% Stop Loss
     - t1: 12 bars (3 hours)
+    - high_low: also write lb_tb_hl*, barriers checked on high/low like the
+      live SL/TP, same-bar crossings resolved from the stored 1m bars of symbol
     """
     print(f"Loading {csv_path} for Alpha-Squeezing generation...")
     df = pd.read_csv(csv_path)
@@ -19,34 +26,46 @@ def generate_triple_barrier_labels(csv_path, pt=0.008, sl=0.004, t1=12):
     df = df.sort_values('datetime').reset_index(drop=True)
     prices = df['close'].values
     n = len(prices)
-    labels = np.zeros(n)
     
     print(f"Generating labels for {n} rows (PT={pt}, SL={sl}, T1={t1})...")
     
-    for i in range(n - t1):
-        start_price = prices[i]
-        window = prices[i+1 : i+1+t1]
-        rets = window / start_price - 1
-        
-        pt_idx = np.where(rets >= pt)[0]
-        sl_idx = np.where(rets <= -sl)[0]
-        
-        first_pt = pt_idx[0] if len(pt_idx) > 0 else 999
-        first_sl = sl_idx[0] if len(sl_idx) > 0 else 999
-        
-        if first_pt < first_sl and first_pt < t1:
-            labels[i] = 1 # Profit Hit
-        else:
-            labels[i] = 0 # Loss or Time-out
-            
+    # Vectorized first-touch over a sliding window of forward returns
+    res = triple_barrier_labels(prices, pt, sl, t1)
+    labels = res['label'].astype(float) # 1 = Profit Hit, 0 = Loss or Time-out
+    
     df['lb_tb'] = labels
+    df['lb_tb_barrier'] = res['barrier'] # +1 PT, -1 SL, 0 time-out
+    df['lb_tb_touch'] = res['touch'] # Bars until the barrier was hit
+
+    if high_low:
+        bar_times = df['datetime'].values.astype('datetime64[ms]').astype('int64')
+        minutes = store_for(symbol, "1m").load(start=df['datetime'].iloc[0], end=df['datetime'].iloc[-1])
+        if minutes.empty:
+            print(f"Warning: no 1m bars stored for {symbol}, same-bar crossings count as profit target")
+        res_hl = path_barrier_labels(prices, df['high'].values, df['low'].values, pt, sl, t1,
+                                     bar_times=bar_times, minutes=minutes)
+        df['lb_tb_hl'] = res_hl['label'].astype(float)
+        df['lb_tb_hl_barrier'] = res_hl['barrier']
+        df['lb_tb_hl_touch'] = res_hl['touch']
+        print(f"High/low labels. Positive rate: {df['lb_tb_hl'].mean():.2%}")
     output_path = csv_path.replace(".csv", "_tb.csv")
     df.to_csv(output_path, index=False)
     print(f"Labels generated. Positive rate: {labels.mean():.2%}")
     print(f"Saved to {output_path}")
     return output_path
 
+def scan_barrier_grid(csv_path, pts, sls, t1s):
+    """
+    Label statistics for a whole (pt, sl, t1) grid in one pass, for picking
+    barrier settings before generating a label file.
+    """
+    df = pd.read_csv(csv_path)
+    prices = df['close'].values
+    summary = grid_summary(triple_barrier_grid(prices, pts, sls, t1s))
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+    return summary
+
 if __name__ == "__main__":
     path = "/Users/zhangzc/7/20260123/0208_Polymarket_BTC_15m/BTCUSDT_15m.csv"
     # Squeezing high-precision 1-hour alpha
-    generate_triple_barrier_labels(path, pt=0.005, sl=0.003, t1=4)
+    generate_triple_barrier_labels(path, pt=0.005, sl=0.003, t1=4, high_low=True)
@@ -0,0 +1,60 @@
+"""
+Phase 4 features of the BTC 15m model (ROC, Vol, MA, L2 proxy, hypotheses).
+
+Shared by train_qlib_model.py and LiveModel.calculate_features in
+live_polymarket_qlib.py, so training and live scoring build the same columns
+in the same order. Rolling statistics come from the ``common.rolling``
+kernels: each (mean, std) pair of a window in one pass, min/max with
+monotonic queues. Features are computed in float64 from the float64 prices
+and stored as one float32 block (``FEATURE_DTYPE``), the matrix the model
+trains on and scores.
+
+    df, feature_cols = calculate_l2_features(df)
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.rolling import rolling_max, rolling_mean, rolling_mean_std, rolling_min, shift
+
+FEATURE_PATTERNS = ['ROC_', 'VOL_', 'MA_', 'L2_', 'H1_', 'H2_', 'H21_']
+FEATURE_DTYPE = 'float32'
+# common.model_registry name of the model trained on these features (train_qlib_model.py)
+MODEL_NAME = 'btc_15m_l2'
+
+
+def calculate_l2_features(df):
+    """Adds the feature columns to a copy of ``df`` (bars in time order); returns (df, feature_cols)."""
+    close = df['close'].to_numpy(dtype='float64')
+    volume = df['volume'].to_numpy(dtype='float64')
+    buy = df['buyer_buy_base'].to_numpy(dtype='float64')
+    trades = df['trades'].to_numpy(dtype='float64')
+    stats = {n: rolling_mean_std(close, n) for n in [5, 10, 20, 60, 100]}
+
+    f = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # ROC
+        for n in [1, 5, 10, 20, 60, 100]: f[f'ROC_{n}'] = close / shift(close, n) - 1
+        # Vol
+        for n in [10, 20, 60, 100]: f[f'VOL_{n}'] = stats[n][1] / (stats[n][0] + 1e-9)
+        # MA
+        for n in [5, 10, 20, 60, 100]: f[f'MA_{n}'] = close / (stats[n][0] + 1e-9) - 1
+        # L2 Proxy
+        f['L2_TakerBuyRatio'] = buy / (volume + 1e-9)
+        f['L2_Imbalance'] = (buy - (volume - buy)) / (volume + 1e-9)
+        f['L2_VolIntensity'] = volume / (rolling_mean(volume, 20) + 1e-9)
+        f['L2_TradeIntensity'] = trades / (rolling_mean(trades, 20) + 1e-9)
+        # Hypotheses
+        f['H1_Spike'] = f['L2_VolIntensity'] * f['ROC_1']
+        lo, hi = rolling_min(close, 30), rolling_max(close, 30)
+        f['H2_Quantile'] = (close - lo) / (hi - lo + 1e-9)
+        f['H21_BBBreak'] = (close - stats[20][0]) / (stats[20][1] + 1e-9)
+
+    # One float block appended at once, not 22 column inserts
+    df = pd.concat([df.drop(columns=list(f), errors='ignore'), pd.DataFrame(f, index=df.index, dtype=FEATURE_DTYPE)], axis=1)
+    feature_cols = [c for c in df.columns if any(p in c for p in FEATURE_PATTERNS)]
+    return df, feature_cols
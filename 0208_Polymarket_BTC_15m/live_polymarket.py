@@ -4,29 +4,20 @@ import pandas as pd
 import numpy as np
 import joblib
 import json
-import requests
+import sys
+from pathlib import Path
 from datetime import datetime, timedelta
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.binance_client import get_client
+
 # Model Configuration
 MODEL_PATH = "lgbm_btc_15m.pkl"
 SYMBOL = "BTCUSDT"
 INTERVAL = "15m"
 
 def get_latest_klines(symbol, interval, limit=100):
-    url = "https://fapi.binance.com/fapi/v1/klines"
-    params = {
-        "symbol": symbol,
-        "interval": interval,
-        "limit": limit
-    }
-    try:
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        if isinstance(data, list):
-            return data
-    except Exception as e:
-        print(f"Error fetching klines: {e}")
-    return []
+    return get_client().klines(symbol, interval, limit=limit)
 
 def prepare_live_features(klines):
     cols = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'qav', 'trades', 'tbb', 'tbq', 'ignore']
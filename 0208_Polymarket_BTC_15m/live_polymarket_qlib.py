@@ -3,11 +3,15 @@ import sys
 import os
 import pandas as pd
 import numpy as np
-import requests
 import joblib
 import warnings
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.binance_client import get_client
+from common.model_registry import ModelRegistry
+from l2_features import MODEL_NAME, calculate_l2_features
+
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
@@ -17,9 +21,18 @@ MODEL_PATH = os.path.join(BASE_DIR, "lgbm_btc_15m_final.pkl")
 CSV_PATH = os.path.join(BASE_DIR, "BTCUSDT_15m.csv")
 
 class LiveModel:
-    def __init__(self, model_path=MODEL_PATH):
+    def __init__(self, model_path=None, version=None):
         self.model_path = model_path
+        registry = ModelRegistry()
+        if model_path is None and registry.versions(MODEL_NAME):
+            # Manifest only: the trees are memory-mapped on the first prediction, whose
+            # columns must match the schema the model was registered with
+            self.model = registry.load(MODEL_NAME, version)
+            self.model_path = str(self.model.path)
+            print(f"Loaded {self.model} from the model registry.")
+            return
         # Load Phase 4 Model
+        model_path = model_path or MODEL_PATH
         print(f"Loading Phase 4 model from {model_path}...")
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model {model_path} not found. Please train it first.")
@@ -29,12 +42,10 @@ class LiveModel:
     def fetch_latest_data(self):
         """Fetch latest candles from Binance."""
         print("Fetching latest BTCUSDT data from Binance...")
-        url = "https://api.binance.com/api/v3/klines"
-        params = {"symbol": "BTCUSDT", "interval": "15m", "limit": 200}
-        
         try:
-            resp = requests.get(url, params=params)
-            data = resp.json()
+            data = get_client("spot").klines("BTCUSDT", "15m", limit=200)
+            if not data:
+                return None
             
             new_rows = []
             for k in data:
@@ -65,26 +76,8 @@ class LiveModel:
 
     def calculate_features(self, df):
         """Replicate the high-precision feature engineering from train_qlib_model.py."""
-        df = df.copy()
         print("Calculating Phase 4 features (ROC, Vol, L2 Proxy)...")
-        # ROC
-        for n in [1, 5, 10, 20, 60, 100]: df[f'ROC_{n}'] = df['close'].pct_change(n)
-        # Vol
-        for n in [10, 20, 60, 100]: df[f'VOL_{n}'] = df['close'].rolling(n).std() / (df['close'].rolling(n).mean() + 1e-9)
-        # MA
-        for n in [5, 10, 20, 60, 100]: df[f'MA_{n}'] = df['close'] / (df['close'].rolling(n).mean() + 1e-9) - 1
-        # L2 Proxy
-        df['L2_TakerBuyRatio'] = df['buyer_buy_base'] / (df['volume'] + 1e-9)
-        df['L2_Imbalance'] = (df['buyer_buy_base'] - (df['volume'] - df['buyer_buy_base'])) / (df['volume'] + 1e-9)
-        df['L2_VolIntensity'] = df['volume'] / (df['volume'].rolling(20).mean() + 1e-9)
-        df['L2_TradeIntensity'] = df['trades'] / (df['trades'].rolling(20).mean() + 1e-9)
-        # Hypotheses
-        df['H1_Spike'] = df['L2_VolIntensity'] * df['ROC_1']
-        df['H2_Quantile'] = (df['close'] - df['close'].rolling(30).min()) / (df['close'].rolling(30).max() - df['close'].rolling(30).min() + 1e-9)
-        df['H21_BBBreak'] = (df['close'] - df['close'].rolling(20).mean()) / (df['close'].rolling(20).std() + 1e-9)
-        
-        feature_cols = [c for c in df.columns if any(p in c for p in ['ROC_', 'VOL_', 'MA_', 'L2_', 'H1_', 'H2_', 'H21_'])]
-        return df, feature_cols
+        return calculate_l2_features(df)
 
     def predict_next(self):
         """Inference using Phase 4 Meta-tuned thresholds."""
@@ -7,7 +7,10 @@ import os
 import sys
 import time
 import json
-import requests
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.binance_client import get_telegram_client, send_telegram
 
 # 加载 .env（若存在）
 try:
@@ -17,23 +20,18 @@ except ImportError:
     pass
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
-TELEGRAM_API = "https://api.telegram.org/bot{token}"
-
-def api_url(method):
-    return TELEGRAM_API.format(token=BOT_TOKEN) + "/" + method
 
 def send_message(chat_id, text):
-    r = requests.post(api_url("sendMessage"), json={"chat_id": chat_id, "text": text}, timeout=30)
-    return r.json() if r.ok else None
+    return send_telegram(BOT_TOKEN, chat_id, text, parse_mode=None, timeout=30)
 
 def get_updates(offset=None):
     params = {"timeout": 60}
     if offset is not None:
         params["offset"] = offset
-    r = requests.get(api_url("getUpdates"), params=params, timeout=65)
-    if not r.ok:
+    # Long poll over the shared keep-alive session
+    data = get_telegram_client().get(f"/bot{BOT_TOKEN}/getUpdates", params=params, timeout=65)
+    if not data:
         return []
-    data = r.json()
     return data.get("result") or []
 
 def run_prediction():
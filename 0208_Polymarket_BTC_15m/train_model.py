@@ -1,4 +1,7 @@
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 import lightgbm as lgb
@@ -6,6 +9,9 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, roc_auc_score, classification_report
 import joblib
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.lgb_data import as_float32, lgb_dataset
+
 def train_model(input_file="btc_15m_features.csv", model_file="lgbm_btc_15m.pkl"):
     print("Loading data...")
     try:
@@ -18,7 +24,7 @@ def train_model(input_file="btc_15m_features.csv", model_file="lgbm_btc_15m.pkl"
     drop_cols = ['datetime', 'open_time', 'open', 'high', 'low', 'close', 'volume', 'quote_asset_volume', 'close_time', 'trades', 'target_return', 'target', 'ignore', 'buyer_buy_base', 'buyer_buy_quote']
     feature_cols = [c for c in df.columns if c not in drop_cols]
     
-    X = df[feature_cols]
+    X = as_float32(df[feature_cols])  # prepare_data.py writes float32 features
     y = df['target']
     
     # Split
@@ -39,8 +45,8 @@ def train_model(input_file="btc_15m_features.csv", model_file="lgbm_btc_15m.pkl"
     
     # Train
     print("Training LightGBM...")
-    train_data = lgb.Dataset(X_train, label=y_train)
-    valid_data = lgb.Dataset(X_valid, label=y_valid, reference=train_data)
+    train_data = lgb_dataset(X_train, y_train)
+    valid_data = lgb_dataset(X_valid, y_valid, reference=train_data)
     
     params = {
         'objective': 'binary',
@@ -2,10 +2,16 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 import joblib
 import lightgbm as lgb
 from sklearn.metrics import roc_auc_score, accuracy_score
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.lgb_data import lgb_dataset
+from common.model_registry import ModelRegistry
+from l2_features import MODEL_NAME, calculate_l2_features
+
 def train_qlib_model():
     csv_path = "/Users/zhangzc/7/20260123/0208_Polymarket_BTC_15m/BTCUSDT_15m_tb.csv"
     print(f"Loading data from {csv_path}...")
@@ -18,26 +24,9 @@ def train_qlib_model():
     if 'buyer_buy_base' not in df.columns: df['buyer_buy_base'] = df['taker_buy_base_asset_volume']
         
     print("Calculating full features for 70% target...")
-    # ROC
-    for n in [1, 5, 10, 20, 60, 100]: df[f'ROC_{n}'] = df['close'].pct_change(n)
-    # Vol
-    for n in [10, 20, 60, 100]: df[f'VOL_{n}'] = df['close'].rolling(n).std() / (df['close'].rolling(n).mean() + 1e-9)
-    # MA
-    for n in [5, 10, 20, 60, 100]: df[f'MA_{n}'] = df['close'] / (df['close'].rolling(n).mean() + 1e-9) - 1
-        
-    # L2 Proxy
-    df['L2_TakerBuyRatio'] = df['buyer_buy_base'] / (df['volume'] + 1e-9)
-    df['L2_Imbalance'] = (df['buyer_buy_base'] - (df['volume'] - df['buyer_buy_base'])) / (df['volume'] + 1e-9)
-    df['L2_VolIntensity'] = df['volume'] / (df['volume'].rolling(20).mean() + 1e-9)
-    df['L2_TradeIntensity'] = df['trades'] / (df['trades'].rolling(20).mean() + 1e-9)
+    df, feature_cols = calculate_l2_features(df)
 
-    # Hypotheses
-    df['H1_Spike'] = df['L2_VolIntensity'] * df['ROC_1']
-    df['H2_Quantile'] = (df['close'] - df['close'].rolling(30).min()) / (df['close'].rolling(30).max() - df['close'].rolling(30).min() + 1e-9)
-    df['H21_BBBreak'] = (df['close'] - df['close'].rolling(20).mean()) / (df['close'].rolling(20).std() + 1e-9)
-    
     df['label'] = df['lb_tb']
-    feature_cols = [c for c in df.columns if any(p in c for p in ['ROC_', 'VOL_', 'MA_', 'L2_', 'H1_', 'H2_', 'H21_'])]
     df = df.dropna(subset=feature_cols + ['label'])
     
     # Split
@@ -49,8 +38,9 @@ def train_qlib_model():
     print(f"Final Count: Train={len(train_df)}, Valid={len(valid_df)}, Test={len(test_df)}")
 
     # Stage 1 + Stage 2 (Combined Features)
-    train_data = lgb.Dataset(train_df[feature_cols], label=train_df['label'])
-    valid_data = lgb.Dataset(valid_df[feature_cols], label=valid_df['label'], reference=train_data)
+    # float32 feature block from calculate_l2_features straight into LightGBM
+    train_data = lgb_dataset(train_df[feature_cols], train_df['label'])
+    valid_data = lgb_dataset(valid_df[feature_cols], valid_df['label'], reference=train_data)
 
     params = {
         "objective": "binary",
@@ -89,6 +79,12 @@ def train_qlib_model():
     print(f"\nTest AUC: {auc:.4f}")
     
     joblib.dump(model, "lgbm_btc_15m_final.pkl")
+    train_ts = train_df.index.get_level_values('datetime')
+    ModelRegistry().register(
+        MODEL_NAME, model, feature_names=feature_cols, label='lb_tb (triple barrier, generate_tb_labels.py)',
+        train_window=(train_ts.min(), train_ts.max()),
+        metrics={'valid_auc': model.best_score['valid_0']['auc'], 'test_auc': auc}, params=params,
+    )
     print("Final Model saved.")
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+"""
+Shared helpers for the strategy folders.
+
+Every experiment folder is a self-contained copy of the pipeline scripts; code
+that must stay identical across them (Binance access, storage, features) lives
+here instead and is imported after adding the repo root to ``sys.path``.
+"""
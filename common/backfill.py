@@ -0,0 +1,114 @@
+"""
+Concurrent sharded kline backfill.
+
+The target range is split into time shards; each shard pages forward with
+``startTime``/``endTime`` on its own worker thread through the shared pooled
+client, so all workers draw from one ``WeightRateLimiter``. Pages are
+stitched and deduplicated on ``open_time``.
+
+A page that still fails after the client's retries raises ``FetchError``
+with the rows fetched so far and the ranges that were not, so callers can
+tell a failed request from the end of the data (an empty page).
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from common.binance_client import get_client
+
+KLINE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+                 'quote_asset_volume', 'trades', 'buyer_buy_base', 'buyer_buy_quote', 'ignore']
+
+_UNIT_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+class FetchError(RuntimeError):
+    """Some pages could not be fetched: ``rows`` got through, ``missing`` [(start_ms, end_ms)] did not."""
+
+    def __init__(self, rows, missing):
+        self.rows = rows
+        self.missing = missing
+        super().__init__(f"{len(missing)} range(s) not fetched: {missing[:3]}")
+
+
+def interval_to_ms(interval):
+    """'1m' -> 60000, '15m' -> 900000, '1h' -> 3600000 ..."""
+    return int(interval[:-1]) * _UNIT_MS[interval[-1]]
+
+
+def split_range(start_ms, end_ms, shards, step_ms, page_bars=1500):
+    """Split [start_ms, end_ms] into at most ``shards`` bar-aligned ranges.
+
+    Shards are never shorter than one full page, so small gaps are fetched by
+    a single request rather than many tiny ones.
+    """
+    start_ms = start_ms - start_ms % step_ms
+    n_bars = (end_ms - start_ms) // step_ms + 1
+    if n_bars <= 0:
+        return []
+    n_shards = max(1, min(shards, -(-n_bars // page_bars)))
+    bars_per_shard = -(-n_bars // n_shards)
+
+    ranges = []
+    s = start_ms
+    while s <= end_ms:
+        e = min(s + (bars_per_shard - 1) * step_ms, end_ms)
+        ranges.append((s, e))
+        s = e + step_ms
+    return ranges
+
+
+def fetch_range(client, symbol, interval, start_ms, end_ms, step_ms, limit):
+    """Page forward through [start_ms, end_ms] on one thread; ``FetchError`` if a page fails."""
+    rows = []
+    cursor = start_ms
+    while cursor <= end_ms:
+        page = client.klines(symbol, interval, start_time=cursor, end_time=end_ms, limit=limit)
+        if page is None:
+            raise FetchError(rows, [(cursor, end_ms)])
+        if not page:
+            break
+        rows.extend(page)
+        cursor = page[-1][0] + step_ms
+        if len(page) < limit:
+            break
+    return rows
+
+
+def backfill_klines(symbol, interval, start_ms, end_ms, shards=8, limit=1500,
+                    base_url=None, client=None):
+    """Fetch all klines with open time in [start_ms, end_ms].
+
+    Returns raw Binance kline rows (lists, ``KLINE_COLUMNS`` order) sorted by
+    open time with duplicates removed. Shards share ``client`` (default: the
+    process-wide pooled futures client); ``base_url`` can point at a local
+    stand-in server instead. If any shard fails, ``FetchError`` is raised
+    after all shards finish, with every fetched row and the unfetched ranges.
+    """
+    client = client or get_client(base_url=base_url)
+    step_ms = interval_to_ms(interval)
+    ranges = split_range(start_ms, end_ms, shards, step_ms, page_bars=limit)
+    if not ranges:
+        return []
+
+    by_open_time = {}
+    missing = []
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(fetch_range, client, symbol, interval, s, e, step_ms, limit)
+            for s, e in ranges
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                rows = future.result()
+            except FetchError as e:
+                rows = e.rows
+                missing.extend(e.missing)
+            for row in rows:
+                by_open_time[row[0]] = row
+            print(f"Fetched {done}/{len(ranges)} shards, {len(by_open_time)} bars...", end='\r')
+
+    print()
+    rows = [by_open_time[t] for t in sorted(by_open_time) if start_ms <= t <= end_ms]
+    if missing:
+        raise FetchError(rows, sorted(missing))
+    return rows
@@ -0,0 +1,280 @@
+"""
+Shared pooled HTTP client for Binance and Telegram.
+
+One keep-alive ``requests.Session`` per base URL per process, jittered
+exponential backoff on errors, and Binance used-weight tracking through the
+process-wide ``WeightRateLimiter``. ``AsyncBinanceClient`` offers the same
+calls on aiohttp for asyncio code.
+
+    from common.binance_client import get_client
+    klines = get_client().klines("ETHUSDT", "1m", limit=1000)
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.rate_limit import DEFAULT_LIMITER, WeightRateLimiter, kline_weight
+
+FAPI_BASE_URL = "https://fapi.binance.com"
+SPOT_BASE_URL = "https://api.binance.com"
+TELEGRAM_BASE_URL = "https://api.telegram.org"
+
+KLINES_PATHS = {
+    "futures": "/fapi/v1/klines",
+    "spot": "/api/v3/klines",
+}
+
+# Binance spot allows 6000 weight / minute / IP (futures: 2400, see rate_limit)
+SPOT_LIMITER = WeightRateLimiter(max_weight=6000)
+# /futures/data/* statistics are limited separately: 1000 requests / 5 minutes / IP.
+# Their responses still carry the 1m IP weight header, which measures another budget.
+FUTURES_DATA_LIMITER = WeightRateLimiter(max_weight=1000, window=300.0, header=None)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _is_binance_error(data):
+    return isinstance(data, dict) and 'code' in data and 'msg' in data
+
+
+class HttpClient:
+    """Keep-alive session with retries and jittered exponential backoff."""
+
+    def __init__(self, base_url, pool_size=16, max_retries=5, timeout=20):
+        self.base_url = base_url.rstrip('/')
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _before(self, weight):
+        pass
+
+    def _after(self, response):
+        pass
+
+    def request(self, method, path, params=None, json=None, weight=1, timeout=None):
+        """Return the decoded JSON body, or ``None`` after ``max_retries`` failures."""
+        url = self.base_url + path
+        for attempt in range(self.max_retries):
+            self._before(weight)
+            try:
+                response = self.session.request(method, url, params=params, json=json,
+                                                timeout=timeout or self.timeout)
+            except requests.RequestException as e:
+                print(f"Request Error (Attempt {attempt+1}): {e}")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            self._after(response)
+            if response.status_code in (418, 429):
+                retry_after = float(response.headers.get('Retry-After', backoff_delay(attempt)))
+                print(f"Rate limited ({response.status_code}), backing off {retry_after:.1f}s")
+                self._penalize(retry_after)
+                continue
+            if response.status_code >= 500:
+                print(f"Server Error {response.status_code} (Attempt {attempt+1})")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            try:
+                data = response.json()
+            except ValueError:
+                print(f"Error {response.status_code}: {response.text[:200]}")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code >= 400 or _is_binance_error(data):
+                # Client errors (bad symbol, bad params) will not fix themselves
+                print(f"Error: {data}")
+                return None
+            return data
+        return None
+
+    def _penalize(self, seconds):
+        time.sleep(seconds)
+
+    def get(self, path, params=None, weight=1, timeout=None):
+        return self.request("GET", path, params=params, weight=weight, timeout=timeout)
+
+    def post(self, path, json=None, timeout=None):
+        return self.request("POST", path, json=json, timeout=timeout)
+
+    def close(self):
+        self.session.close()
+
+
+class BinanceClient(HttpClient):
+    """``HttpClient`` that spends request weight from a shared limiter."""
+
+    def __init__(self, base_url=FAPI_BASE_URL, market="futures", limiter=None, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self.klines_path = KLINES_PATHS[market]
+        self.limiter = limiter or (SPOT_LIMITER if market == "spot" else DEFAULT_LIMITER)
+
+    def _before(self, weight):
+        self.limiter.acquire(weight)
+
+    def _after(self, response):
+        self.limiter.update_from_headers(response.headers)
+
+    def _penalize(self, seconds):
+        self.limiter.penalize(seconds)
+
+    @property
+    def used_weight(self):
+        return self.limiter.used_weight
+
+    def klines(self, symbol, interval, start_time=None, end_time=None, limit=1500):
+        """Raw kline rows ``[[open_time, open, high, low, close, volume, ...], ...]``.
+
+        [] when the range has no bars, None when the request failed.
+        """
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        return self.get(self.klines_path, params=params, weight=kline_weight(limit))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(market="futures", base_url=None):
+    """Process-wide shared ``BinanceClient`` for a market ('futures' or 'spot')."""
+    if base_url is None:
+        base_url = SPOT_BASE_URL if market == "spot" else FAPI_BASE_URL
+    key = (market, base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = BinanceClient(base_url, market=market)
+        return _clients[key]
+
+
+def get_futures_data_client(base_url=FAPI_BASE_URL):
+    """Shared client for the /futures/data/* statistics endpoints (own request budget)."""
+    key = ("futures_data", base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = BinanceClient(base_url, limiter=FUTURES_DATA_LIMITER)
+        return _clients[key]
+
+
+def get_telegram_client(base_url=TELEGRAM_BASE_URL):
+    key = ("telegram", base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = HttpClient(base_url, pool_size=4, max_retries=3, timeout=15)
+        return _clients[key]
+
+
+def send_telegram(token, chat_id, text, parse_mode="Markdown", timeout=15):
+    """Send a Telegram message over the shared session. Returns the API response or None."""
+    payload = {
+        "chat_id": chat_id,
+        "text": text,
+    }
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    return get_telegram_client().post(f"/bot{token}/sendMessage", json=payload, timeout=timeout)
+
+
+class AsyncBinanceClient:
+    """asyncio variant of ``BinanceClient`` (requires aiohttp).
+
+    Shares the same weight limiter, so sync and async callers in one process
+    draw from one budget.
+    """
+
+    def __init__(self, base_url=FAPI_BASE_URL, market="futures", limiter=None,
+                 pool_size=16, max_retries=5, timeout=20):
+        self.base_url = base_url.rstrip('/')
+        self.klines_path = KLINES_PATHS[market]
+        self.limiter = limiter or (SPOT_LIMITER if market == "spot" else DEFAULT_LIMITER)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def _acquire(self, weight):
+        while True:
+            wait = self.limiter.try_acquire(weight)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def get(self, path, params=None, weight=1):
+        import aiohttp
+        session = await self._get_session()
+        url = self.base_url + path
+        for attempt in range(self.max_retries):
+            await self._acquire(weight)
+            try:
+                async with session.get(url, params=params) as response:
+                    self.limiter.update_from_headers(response.headers)
+                    if response.status in (418, 429):
+                        retry_after = float(response.headers.get('Retry-After', backoff_delay(attempt)))
+                        print(f"Rate limited ({response.status}), backing off {retry_after:.1f}s")
+                        self.limiter.penalize(retry_after)
+                        continue
+                    if response.status >= 500:
+                        print(f"Server Error {response.status} (Attempt {attempt+1})")
+                        await asyncio.sleep(backoff_delay(attempt))
+                        continue
+                    data = await response.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Request Error (Attempt {attempt+1}): {e}")
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status >= 400 or _is_binance_error(data):
+                print(f"Error: {data}")
+                return None
+            return data
+        return None
+
+    async def klines(self, symbol, interval, start_time=None, end_time=None, limit=1500):
+        params = {
+            "symbol": symbol,
+            "interval": interval,
+            "limit": limit
+        }
+        if start_time is not None:
+            params["startTime"] = start_time
+        if end_time is not None:
+            params["endTime"] = end_time
+        return await self.get(self.klines_path, params=params, weight=kline_weight(limit))
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,166 @@
+"""
+Download orchestrator for a universe of symbols x intervals.
+
+Every (symbol, interval) job asks its ``KlineStore`` what is missing, the
+gaps are cut into 30-day chunks and one-page shards, and all shards of all
+jobs run on one thread pool through the shared client, so the whole universe
+spends a single weight budget. Chunks are submitted round-robin across jobs
+and written to the store as soon as they complete. A chunk is sealed only
+when every page of it came back; a chunk with a failed page is written
+unsealed, so ``missing_ranges`` asks for its holes again on the next run.
+
+    python -m common.downloader ETHUSDT,BTCUSDT,SOLUSDT 1m,15m 365
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product, zip_longest
+from pathlib import Path
+
+import pandas as pd
+
+from common.backfill import FetchError, fetch_range, interval_to_ms, split_range
+from common.binance_client import get_client
+from common.kline_store import DAY_MS, KlineStore, klines_to_frame
+
+STORE_ROOT = Path(__file__).resolve().parent.parent / 'kline_store'
+CHUNK_DAYS = 30
+
+
+def store_for(symbol, interval, store_root=STORE_ROOT, market="futures"):
+    """The shared store of one job (spot data lives under ``<root>/spot``)."""
+    root = Path(store_root) if market == "futures" else Path(store_root) / market
+    return KlineStore(root, symbol, interval)
+
+
+class _Job:
+    def __init__(self, symbol, interval, store):
+        self.symbol = symbol
+        self.interval = interval
+        self.store = store
+        self.step_ms = interval_to_ms(interval)
+        self.chunks = []
+        self.shards_total = self.shards_done = 0
+        self.bars = 0
+        self.failed = False
+
+    @property
+    def name(self):
+        return f"{self.symbol} {self.interval}"
+
+
+class _Chunk:
+    def __init__(self, job, start_ms, end_ms, shards):
+        self.job = job
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.pending = len(shards)
+        self.shards = shards
+        self.rows = {}
+        self.failed = False
+
+
+def _plan(job, start_ms, end_ms, limit):
+    chunk_ms = CHUNK_DAYS * DAY_MS
+    for gap_start, gap_end in job.store.missing_ranges(start_ms, end_ms):
+        s = gap_start
+        while s <= gap_end:
+            e = min(s + chunk_ms - job.step_ms, gap_end)
+            n_pages = -(-((e - s) // job.step_ms + 1) // limit)
+            shards = split_range(s, e, n_pages, job.step_ms, page_bars=limit)
+            job.chunks.append(_Chunk(job, s, e, shards))
+            job.shards_total += len(shards)
+            s = e + job.step_ms
+
+
+def _seal_before_listing(job, start_ms):
+    # Nothing before the first stored bar after a fetch where every page came
+    # back: the contract did not exist yet, so don't ask for those days again.
+    # After a failed page the first stored bar may just follow a failed chunk.
+    if job.failed:
+        return
+    bounds = job.store.bounds()
+    if bounds is not None and bounds[0] > start_ms:
+        job.store.mark_empty(start_ms, bounds[0] - job.step_ms)
+
+
+def download_universe(symbols, intervals, days=365, store_root=STORE_ROOT, market="futures",
+                      max_workers=16, limit=1500, client=None):
+    """Bring every (symbol, interval) store up to the last closed bar.
+
+    Returns ``{(symbol, interval): bars fetched}``.
+    """
+    client = client or get_client(market)
+    now_ms = int(time.time() * 1000)
+    start_ms = now_ms - days * DAY_MS
+
+    jobs = []
+    for symbol, interval in product(symbols, intervals):
+        job = _Job(symbol, interval, store_for(symbol, interval, store_root, market))
+        end_ms = now_ms - now_ms % job.step_ms - job.step_ms  # Last closed bar
+        _plan(job, start_ms, end_ms, limit)
+        jobs.append(job)
+        print(f"[{job.name}] {len(job.chunks)} chunk(s), {job.shards_total} page(s) to fetch")
+
+    # Round-robin across jobs so every instrument makes progress from the start
+    chunks = [c for group in zip_longest(*(j.chunks for j in jobs)) for c in group if c is not None]
+    if not chunks:
+        print("Everything up to date.")
+        return {(j.symbol, j.interval): 0 for j in jobs}
+
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for chunk in chunks:
+            job = chunk.job
+            for s, e in chunk.shards:
+                f = pool.submit(fetch_range, client, job.symbol, job.interval, s, e, job.step_ms, limit)
+                futures[f] = chunk
+
+        for future in as_completed(futures):
+            chunk = futures[future]
+            job = chunk.job
+            try:
+                rows = future.result()
+            except FetchError as e:
+                rows = e.rows
+                chunk.failed = job.failed = True
+                print(f"\n[{job.name}] {e}; left unsealed for the next run")
+            for row in rows:
+                chunk.rows[row[0]] = row
+            chunk.pending -= 1
+            job.shards_done += 1
+            if chunk.pending == 0:
+                rows = [chunk.rows[t] for t in sorted(chunk.rows) if chunk.start_ms <= t <= chunk.end_ms]
+                sealed = None if chunk.failed else (chunk.start_ms, chunk.end_ms)
+                job.store.write(klines_to_frame(rows), sealed_range=sealed)
+                job.bars += len(rows)
+                chunk.rows = None
+                if job.shards_done == job.shards_total:
+                    _seal_before_listing(job, start_ms)
+                    print(f"\n[{job.name}] done: {job.bars} bars in {time.time() - t0:.0f}s")
+            done = sum(j.shards_done for j in jobs)
+            total = sum(j.shards_total for j in jobs)
+            active = sum(1 for j in jobs if 0 < j.shards_done < j.shards_total)
+            print(f"{done}/{total} pages, {active} job(s) active, "
+                  f"used weight {client.used_weight}", end='\r')
+
+    print()
+    return {(j.symbol, j.interval): j.bars for j in jobs}
+
+
+def load_klines(symbol, interval, days=None, store_root=STORE_ROOT, market="futures"):
+    """Stored bars of one job (the last ``days`` days, or everything)."""
+    start = pd.Timestamp(int(time.time() * 1000) - days * DAY_MS, unit='ms') if days else None
+    return store_for(symbol, interval, store_root, market).load(start=start)
+
+
+if __name__ == "__main__":
+    symbols = sys.argv[1].split(',') if len(sys.argv) > 1 else ["ETHUSDT", "BTCUSDT"]
+    intervals = sys.argv[2].split(',') if len(sys.argv) > 2 else ["1m"]
+    days = int(sys.argv[3]) if len(sys.argv) > 3 else 365
+
+    counts = download_universe(symbols, intervals, days=days)
+    for (symbol, interval), n in counts.items():
+        print(f"{symbol} {interval}: {n} new bars")
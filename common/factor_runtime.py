@@ -0,0 +1,399 @@
+"""
+Execution runtime for RD-Agent generated factors.
+
+An RD-Agent factor (``git_ignore_folder/RD-Agent_workspace/*/factor.py``)
+re-reads ``daily_pv_*.h5`` on every execution and computes its rolling
+statistics with ``groupby(level='instrument').apply(lambda x: ...)``, one
+Python call per instrument. With hundreds of candidates per loop, load and
+apply cost dominate. The runtime reads the panel once and runs every
+candidate against it:
+
+    rt = FactorRuntime.from_hdf('daily_pv_all.h5', cache_dir='~/.qlib/factor_cache')
+    values = rt.run('git_ignore_folder/RD-Agent_workspace/0eea.../factor.py')  # pd.Series
+
+Factors come in two forms:
+
+* vectorized: ``calculate_<Name>(panel)`` returning one value per panel row,
+  written with the ``Panel`` primitives, which run over all instruments in
+  one kernel call and never let a window reach into the previous instrument:
+
+      def calculate_VolAdjMomentum(panel):
+          momentum = panel.close / panel.shift(panel.close, 20) - 1
+          return momentum / (panel.std(panel.volume, 5) + 1e-6)
+
+* RD-Agent as generated: ``calculate_<Name>()`` reading the panel with
+  ``pd.read_hdf`` and writing ``result.h5``. It runs unchanged, with the read
+  served from the loaded panel and the write captured, so only the load cost
+  is saved.
+
+Results are cached by the hash of the factor source and the panel
+fingerprint, so re-evaluating an unchanged candidate is one ``np.load``.
+
+With ``store`` the HDF5 panel is converted once into a columnar store (one
+``.npy`` per column plus the row index, keyed by the file's fingerprint) and
+opened memory-mapped from then on. Any number of processes attach to it
+zero-copy, so candidates can be evaluated on all cores with the panel in
+RAM once:
+
+    rt = FactorRuntime.from_hdf('daily_pv_all.h5', store='~/.qlib/panel_store',
+                                cache_dir='~/.qlib/factor_cache')
+    values, errors = rt.run_many(glob('git_ignore_folder/RD-Agent_workspace/*/factor.py'))
+
+    python -m common.factor_runtime     # legacy vs vectorized on a synthetic panel
+"""
+
+import inspect
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.feature_cache import _atomic_save, digest
+from common.rolling import rolling_max, rolling_mean_std, rolling_min, rolling_sum, shift
+
+RUNTIME_VERSION = 1
+PANEL_VERSION = 1
+
+
+def _readonly(x):
+    x = np.ascontiguousarray(x, dtype='float64')
+    x.setflags(write=False)
+    return x
+
+
+def _frame_fingerprint(frame):
+    sums = [float(np.nansum(frame[c].to_numpy(dtype='float64'))) for c in frame.columns
+            if pd.api.types.is_numeric_dtype(frame[c])]
+    return digest(frame.shape, list(frame.columns), str(frame.index[0]), str(frame.index[-1]), *sums)
+
+
+class Panel:
+    """A (datetime, instrument) price/volume panel as float64 columns grouped by instrument.
+
+    Rows are stored instrument by instrument in time order; primitives take
+    and return arrays in this row order, ``series()`` maps them back to the
+    panel's original index. A panel is built from a frame, or opened from a
+    store written by ``save()``, in which case every array is a read-only
+    memmap of the store and processes opening it share one copy.
+    """
+
+    def __init__(self, arrays, columns, instruments, fingerprint, path=None):
+        self.order, self.group, self.pos, self.remaining = (arrays[k] for k in ('order', 'group', 'pos', 'remaining'))
+        self._time, self._code = arrays['time'], arrays['code']
+        self.columns = columns
+        self.instruments = instruments
+        self.n_groups = len(instruments)
+        self.fingerprint = fingerprint
+        self.path = path
+        self._index = self._frame = None
+
+    @classmethod
+    def from_frame(cls, frame, fingerprint=None):
+        code, instruments = pd.factorize(frame.index.get_level_values('instrument'), sort=True)
+        time = frame.index.get_level_values('datetime').to_numpy(dtype='datetime64[ns]')
+        order = np.lexsort((time, code))
+        group = code[order]
+        starts = np.r_[0, np.flatnonzero(np.diff(group)) + 1]
+        sizes = np.diff(np.r_[starts, len(group)])
+        pos = np.arange(len(group)) - np.repeat(starts, sizes)  # bar number within the instrument
+        arrays = {'order': order, 'group': group, 'pos': pos, 'remaining': np.repeat(sizes, sizes) - pos - 1,
+                  'time': time, 'code': code.astype('int32')}
+        columns = {c: _readonly(frame[c].to_numpy(dtype='float64')[order])
+                   for c in frame.columns if pd.api.types.is_numeric_dtype(frame[c])}
+        panel = cls(arrays, columns, np.asarray(instruments, dtype=str), fingerprint or _frame_fingerprint(frame))
+        panel._frame = frame
+        return panel
+
+    @classmethod
+    def from_hdf(cls, path, key=None, store=None):
+        """The panel of an HDF5 file; with ``store`` (a directory) it is converted once and then opened mmap'd."""
+        path = Path(path).expanduser()
+        st = path.stat()
+        fingerprint = digest(PANEL_VERSION, str(path.resolve()), key, st.st_size, st.st_mtime_ns)
+        if store is None:
+            return cls.from_frame(pd.read_hdf(path, key=key), fingerprint)
+        target = Path(store).expanduser() / fingerprint
+        if not (target / '_meta.json').exists():
+            print(f"Converting {path} into {target} ...")
+            cls.from_frame(pd.read_hdf(path, key=key), fingerprint).save(target)
+        return cls.open(target)
+
+    # ── columnar store ──
+    def save(self, path):
+        """Write the panel as one ``.npy`` per column plus the row index; atomic, a finished store is never rewritten."""
+        path = Path(path).expanduser()
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.mkdir(parents=True, exist_ok=True)
+        arrays = {'order': self.order, 'group': self.group, 'pos': self.pos, 'remaining': self.remaining,
+                  'time': self._time, 'code': self._code, 'instruments': self.instruments}
+        for name, values in arrays.items():
+            np.save(tmp / f"_{name}.npy", np.asarray(values))
+        names = list(self.columns)
+        for i, c in enumerate(names):
+            np.save(tmp / f"col_{i}.npy", self.columns[c])
+        (tmp / '_meta.json').write_text(json.dumps({'fingerprint': self.fingerprint, 'columns': names}))
+        try:
+            os.replace(tmp, path)
+        except OSError:  # another process stored the same panel first
+            shutil.rmtree(tmp, ignore_errors=True)
+        return path
+
+    @classmethod
+    def open(cls, path):
+        """Attach to a stored panel: every array is a read-only memmap, nothing is copied."""
+        path = Path(path).expanduser()
+        meta = json.loads((path / '_meta.json').read_text())
+        arrays = {k: np.load(path / f"_{k}.npy", mmap_mode='r')
+                  for k in ('order', 'group', 'pos', 'remaining', 'time', 'code')}
+        columns = {c: np.load(path / f"col_{i}.npy", mmap_mode='r') for i, c in enumerate(meta['columns'])}
+        instruments = np.load(path / '_instruments.npy')
+        return cls(arrays, columns, instruments, meta['fingerprint'], path)
+
+    def __len__(self):
+        return len(self.group)
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __getattr__(self, name):
+        # panel.close for the '$close' column
+        columns = self.__dict__.get('columns', {})
+        for key in (name, f'${name}'):
+            if key in columns:
+                return columns[key]
+        raise AttributeError(name)
+
+    @property
+    def index(self):
+        """The original (datetime, instrument) index, in the row order of the source frame."""
+        if self._index is None:
+            self._index = pd.MultiIndex.from_arrays(
+                [pd.DatetimeIndex(np.asarray(self._time)), self.instruments.astype(object)[self._code]],
+                names=['datetime', 'instrument'])
+        return self._index
+
+    def frame(self):
+        """The panel as the DataFrame RD-Agent factors read (a shallow copy, safe to add columns to)."""
+        if self._frame is None:
+            self._frame = pd.DataFrame({c: self.series(v).to_numpy() for c, v in self.columns.items()},
+                                       index=self.index)
+        return self._frame.copy(deep=False)
+
+    def series(self, values, name=None):
+        """Panel-order values as a Series on the panel's original (datetime, instrument) index."""
+        out = np.empty(len(self))
+        out[self.order] = values
+        return pd.Series(out, index=self.index, name=name)
+
+    # ── group-aware primitives ──
+    def _values(self, x):
+        return self.columns[x] if isinstance(x, str) else np.asarray(x, dtype='float64')
+
+    def _rolling(self, kernel, x, window, min_periods=None, **kwargs):
+        x = self._values(x)
+        minp = window if min_periods is None else max(min(int(min_periods), window), 1)
+        if minp < window and self.n_groups > 1:
+            # Partial windows are allowed: separate the instruments by window - 1 NaNs
+            slots = np.arange(len(x)) + self.group * (window - 1)
+            padded = np.full(len(x) + self.n_groups * (window - 1), np.nan)
+            padded[slots] = x
+            out = kernel(padded, window, minp, **kwargs)
+            return tuple(o[slots] for o in out) if isinstance(out, tuple) else out[slots]
+        out = kernel(x, window, minp, **kwargs)
+        head = self.pos < window - 1  # full windows only: these would reach into the previous instrument
+        for o in (out if isinstance(out, tuple) else (out,)):
+            o[head] = np.nan
+        return out
+
+    def shift(self, x, n=1):
+        """``x`` of ``n`` bars earlier within each instrument (negative: later)."""
+        out = shift(self._values(x), n)
+        out[(self.pos < n) if n >= 0 else (self.remaining < -n)] = np.nan
+        return out
+
+    def pct_change(self, x, n=1):
+        return self._values(x) / self.shift(x, n) - 1
+
+    def mean_std(self, x, window, min_periods=None, ddof=1):
+        return self._rolling(rolling_mean_std, x, window, min_periods, ddof=ddof)
+
+    def mean(self, x, window, min_periods=None):
+        return self.mean_std(x, window, min_periods)[0]
+
+    def std(self, x, window, min_periods=None, ddof=1):
+        return self.mean_std(x, window, min_periods, ddof)[1]
+
+    def sum(self, x, window, min_periods=None):
+        return self._rolling(rolling_sum, x, window, min_periods)
+
+    def min(self, x, window, min_periods=None):
+        return self._rolling(rolling_min, x, window, min_periods)
+
+    def max(self, x, window, min_periods=None):
+        return self._rolling(rolling_max, x, window, min_periods)
+
+
+@contextmanager
+def _served_io(panel, captured):
+    """``pd.read_hdf`` returns the loaded panel and ``DataFrame.to_hdf`` is captured instead of written."""
+    saved = pd.read_hdf, pd.DataFrame.to_hdf, pd.Series.to_hdf
+    pd.read_hdf = lambda *args, **kwargs: panel.frame()
+    pd.DataFrame.to_hdf = pd.Series.to_hdf = lambda self, *args, **kwargs: captured.append(self)
+    try:
+        yield
+    finally:
+        pd.read_hdf, pd.DataFrame.to_hdf, pd.Series.to_hdf = saved
+
+
+class FactorRuntime:
+    def __init__(self, panel, cache_dir=None):
+        self.panel = panel
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+
+    @classmethod
+    def from_hdf(cls, path, key=None, cache_dir=None, store=None):
+        return cls(Panel.from_hdf(path, key, store), cache_dir)
+
+    def _execute(self, source):
+        namespace = {'__name__': 'factor'}
+        exec(compile(source, '<factor>', 'exec'), namespace)
+        funcs = [f for n, f in namespace.items() if n.startswith('calculate_') and callable(f)]
+        if len(funcs) != 1:
+            raise ValueError(f"Expected one calculate_* function in the factor source, found {len(funcs)}")
+        func = funcs[0]
+        name = func.__name__[len('calculate_'):]
+        if inspect.signature(func).parameters:
+            values = func(self.panel)
+            if isinstance(values, pd.Series):
+                return values.reindex(self.panel.index).to_numpy(dtype='float64'), name
+            return self.panel.series(values).to_numpy(), name
+
+        captured = []
+        with _served_io(self.panel, captured):
+            func()
+        if not captured:
+            raise ValueError(f"{func.__name__}() wrote no result")
+        result = captured[-1]
+        if isinstance(result, pd.DataFrame):
+            result = result.iloc[:, 0]
+        extra = result.index.nlevels - self.panel.index.nlevels
+        if extra > 0:
+            # groupby(...).apply prepends the group key to the (datetime, instrument) index
+            result = result.droplevel(list(range(extra)))
+        if list(result.index.names) != list(self.panel.index.names):
+            result = result.reorder_levels(self.panel.index.names)
+        return result.reindex(self.panel.index).to_numpy(dtype='float64'), str(result.name)
+
+    def run(self, factor):
+        """Values of one factor (a ``factor.py`` path or its source text) as a Series on the panel index."""
+        source = Path(factor).read_text(encoding='utf-8') if os.path.exists(str(factor)) else str(factor)
+        key = digest(RUNTIME_VERSION, self.panel.fingerprint, source)
+        path = self.cache_dir / f"{key}.npy" if self.cache_dir else None
+        name_path = path.with_suffix('.name') if path else None
+        if path and path.exists() and name_path.exists():
+            return pd.Series(np.load(path), index=self.panel.index, name=name_path.read_text())
+
+        values, name = self._execute(source)
+        if path:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            name_path.write_text(name)
+            _atomic_save(path, values)
+        return pd.Series(values, index=self.panel.index, name=name)
+
+    def run_many(self, factors, workers=None):
+        """Evaluate many candidates on a process pool attached to the stored panel.
+
+        Returns (DataFrame with one column per factor that ran, in input order,
+        repeated names suffixed ``_2``, ...; {factor: error} for the ones that
+        raised). Workers open the panel with ``Panel.open``, so its columns are
+        in memory once however many workers run (factors in the RD-Agent form
+        still build their own DataFrame of it in each worker).
+        """
+        if self.panel.path is None:
+            raise ValueError("run_many needs a stored panel: Panel.from_hdf(..., store=dir) or Panel.open(dir)")
+        workers = workers or os.cpu_count()
+        results, errors = {}, {}
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(str(self.panel.path), self.cache_dir)) as pool:
+            futures = {pool.submit(_run_in_worker, str(f)): f for f in factors}
+            for future in as_completed(futures):
+                factor = futures[future]
+                try:
+                    name, values = future.result()
+                except Exception as e:
+                    errors[factor] = f"{type(e).__name__}: {e}"
+                    continue
+                results[factor] = (name, values)
+        done = [f for f in factors if f in results]
+        columns = {}
+        for f in done:
+            name, values = results[f]
+            # Candidates often reuse a name (two takes on Price_Momentum_5D): keep both
+            key, k = name, 2
+            while key in columns:
+                key, k = f"{name}_{k}", k + 1
+            columns[key] = values
+        frame = pd.DataFrame(columns, index=self.panel.index)
+        print(f"Evaluated {len(done)}/{len(factors)} factors on {workers} workers ({len(errors)} failed)")
+        return frame, errors
+
+
+# ── pool workers ──
+_worker_runtime = None
+
+
+def _init_worker(panel_path, cache_dir):
+    global _worker_runtime
+    _worker_runtime = FactorRuntime(Panel.open(panel_path), cache_dir)
+
+
+def _run_in_worker(factor):
+    out = _worker_runtime.run(factor)
+    return out.name, out.to_numpy()
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    times = pd.date_range('2018-01-01', periods=2000, freq='D')
+    insts = [f'SH{600000 + i}' for i in range(200)]
+    idx = pd.MultiIndex.from_product([times, insts], names=['datetime', 'instrument'])
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(times), len(insts))), axis=0)).ravel()
+    frame = pd.DataFrame({'$close': close, '$volume': rng.gamma(2, 1e5, len(idx))}, index=idx)
+
+    legacy = '''
+import pandas as pd
+def calculate_VolAdjMomentum():
+    data = pd.read_hdf('daily_pv_debug.h5')
+    data = data.sort_index(level=['instrument', 'datetime'])
+    close = data['$close']
+    price_momentum = close.groupby(level='instrument').apply(lambda x: x / x.shift(20) - 1)
+    volume = data['$volume']
+    vol_volatility = volume.groupby(level='instrument').apply(lambda x: x.rolling(window=5).std())
+    result = (price_momentum / (vol_volatility + 1e-6)).to_frame(name='VolAdjMomentum')
+    result.to_hdf('result.h5', key='df')
+'''
+    vectorized = '''
+def calculate_VolAdjMomentum(panel):
+    momentum = panel.close / panel.shift(panel.close, 20) - 1
+    return momentum / (panel.std(panel.volume, 5) + 1e-6)
+'''
+    with tempfile.TemporaryDirectory() as cache:
+        rt = FactorRuntime(Panel.from_frame(frame), cache_dir=cache)
+        # The first vectorized run includes loading / compiling the rolling kernels
+        runs = [('legacy', legacy), ('vectorized', vectorized), ('again', vectorized + '# changed'),
+                ('cached', vectorized)]
+        for label, src in runs:
+            t = time.perf_counter()
+            out = rt.run(src)
+            print(f"{label:>10}: {(time.perf_counter() - t) * 1e3:8.1f} ms  {out.name}")
+            if label == 'legacy':
+                expected = out
+        print("vectorized == legacy:", np.allclose(out, expected, rtol=1e-9, equal_nan=True))
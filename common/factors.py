@@ -0,0 +1,161 @@
+"""
+Single registry of the strategy factors.
+
+Every factor is written once, as an expression over the raw bar fields, and
+every consumer is generated from that definition:
+
+    fields, names = qlib_fields('gen10')     # Qlib expression strings for train / backtest
+    engine = FeatureEngine(factor_exprs('gen10'))  # streaming, O(1) per bar
+    X = compute_factors(bars, 'gen10')       # compiled NumPy kernel over a window
+
+``FEATURE_SETS`` lists the columns each generation's model was trained on,
+in training order, so live scoring feeds the model exactly the features (and
+the column order) of its training run. A set entry is a factor name, or a
+``(column, factor)`` pair when a model names a factor differently (0207
+trained its reversed ROC as ``ROC_n``).
+
+    python -m common.factors          # print the sets and their DAG sizes
+"""
+
+from functools import lru_cache
+
+import pandas as pd
+
+from common.feature_dag import FeatureDAG
+from common.feature_engine import Abs, Feature, Max, Mean, Min, Ref, Std
+
+
+def _definitions():
+    """Fresh expression trees for every factor (streaming nodes hold state, so never share them)."""
+    close, open_, high, low, volume = (Feature(f) for f in ['close', 'open', 'high', 'low', 'volume'])
+    f = {}
+    # Momentum / volatility / MA divergence / volume
+    for n in [1, 3, 5, 10, 20, 60]:
+        f[f'ROC_{n}'] = close / Ref(close, n) - 1
+        f[f'ROC_REV_{n}'] = Ref(close, n) / close - 1
+    for n in [5, 10, 20, 60]:
+        f[f'VOL_{n}'] = Std(close, n) / Mean(close, n)
+        f[f'MA_{n}'] = close / Mean(close, n) - 1
+        f[f'V_MA_Ratio_{n}'] = volume / Mean(volume, n)
+
+    # K-line shapes
+    f['K_HIGH_REL'] = high / close - 1
+    f['K_LOW_REL'] = low / close - 1
+    f['K_OPEN_REL'] = open_ / close - 1
+    f['H_L_Ratio'] = (high - low) / close
+    f['C_O_Ratio'] = (close - open_) / open_
+
+    # RD-Agent Gen-1 .. Gen-4 hypotheses
+    ret = close / Ref(close, 1) - 1
+    f['H1_Spike'] = (volume / Mean(volume, 20)) * ret  # energy spike
+    f['H2_Quantile'] = (close - Min(close, 30)) / (Max(close, 30) - Min(close, 30) + 1e-9)
+    f['H3_BiasVol'] = (Mean(close, 20) / close - 1) / (Std(close, 20) / Mean(close, 20) + 1e-9)
+    f['H4_VRegime'] = ((high - low) / close) / (Mean((high - low) / close, 60) + 1e-9)
+    f['H5_MQuality'] = (close / Ref(close, 5) - 1) / (Std(close, 5) / Mean(close, 5) + 1e-9)
+    f['H6_Slope'] = (close / Mean(close, 20) - 1) * ret
+    f['H7_TAccel'] = (close / Ref(close, 5) - 1) / (close / Ref(close, 20) - 1 + 1e-9)
+    f['H8_VSqueeze'] = Std(close, 10) / (Std(close, 60) + 1e-9)
+    f['H9_VMom'] = ret * (volume / Mean(volume, 20) + 1e-9)
+    f['H10_PVInt'] = ret * (volume / Mean(volume, 10))  # proxy for price-volume correlation
+    f['H11_KDJK'] = (close - Min(low, 20)) / (Max(high, 20) - Min(low, 20) + 1e-9)
+    f['H12_UpStreak'] = Mean(close / Ref(close, 1) > 1, 20)  # trend persistence
+
+    # Gen-5 (used by Gen4_827pct): gap, position within the bar, Sharpe-like ROC
+    f['H13_Gap'] = open_ / Ref(close, 1) - 1
+    f['H14_BarPos'] = (close - low) / (high - low + 1e-9)
+    f['H15_SharpeROC'] = Mean(ret, 10) / (Std(close / Ref(close, 1), 10) + 1e-9)
+
+    # Gen-6: breakouts and MA alignment; Gen-7: return magnitude, volume-price divergence, range expansion
+    f['H13_HBreak'] = close / Max(high, 20) - 1
+    f['H14_LBreak'] = close / Min(low, 20) - 1
+    f['H15_TriMA'] = (Mean(close, 5) / Mean(close, 20) - 1) + (Mean(close, 20) / Mean(close, 60) - 1)
+    f['H16_ExtRet'] = Abs(ret)
+    f['H17_VPDiv'] = (volume / Mean(volume, 10)) / (Abs(ret) + 1e-9)
+    f['H18_RangeExp'] = (high - low) / (Mean(high - low, 20) + 1e-9)
+
+    # Gen-9 (used by Alpha158_Optimization): ROC of ROC, deviation from the 60-bar mean, volume shock
+    f['H19_MomAccel'] = (close / Ref(close, 5) - 1) - (Ref(close, 5) / Ref(close, 10) - 1)
+    f['H20_ExtDev'] = Abs(close / Mean(close, 60) - 1)
+    f['H21_VolShock'] = volume / Max(volume, 20)
+
+    # Gen-10: momentum fusion, volatility explosion, Bollinger z-score, volume acceleration, price velocity
+    f['H19_MomFusion'] = (close / Ref(close, 3) - 1) + (close / Ref(close, 5) - 1) + (close / Ref(close, 10) - 1)
+    f['H20_VolExplo'] = (high - low) / (Min(high - low, 20) + 1e-9)
+    f['H21_BBBreak'] = (close - Mean(close, 20)) / (Std(close, 20) + 1e-9)
+    f['H22_VolMomAcc'] = volume / Ref(volume, 1) - 1
+    f['H23_PriceVel'] = (close - Ref(close, 3)) / 3
+    return f
+
+
+FACTORS = sorted(_definitions())
+
+_BASE = ([f'ROC_{n}' for n in [1, 5, 10, 20, 60]]
+         + [f'VOL_{n}' for n in [10, 20, 60]]
+         + [f'MA_{n}' for n in [5, 10, 20, 60]]
+         + [f'V_MA_Ratio_{n}' for n in [5, 10, 20]]
+         + ['K_HIGH_REL', 'K_LOW_REL', 'K_OPEN_REL', 'H_L_Ratio', 'C_O_Ratio',
+            'H1_Spike', 'H2_Quantile', 'H3_BiasVol', 'H4_VRegime', 'H5_MQuality', 'H6_Slope',
+            'H7_TAccel', 'H8_VSqueeze', 'H9_VMom', 'H10_PVInt', 'H11_KDJK', 'H12_UpStreak'])
+_GEN6 = _BASE + ['H13_HBreak', 'H14_LBreak', 'H15_TriMA']
+_GEN7 = _GEN6 + ['H16_ExtRet', 'H17_VPDiv', 'H18_RangeExp']
+
+FEATURE_SETS = {
+    # 0207_Qlib_AI
+    'qlib_ai': ([(f'ROC_{n}', f'ROC_REV_{n}') for n in [5, 10, 20, 60]]
+                + ['VOL_20', 'VOL_60', 'MA_5', 'MA_10', 'MA_20', 'MA_60', 'H_L_Ratio', 'C_O_Ratio']),
+    'gen4': _BASE + ['H13_Gap', 'H14_BarPos', 'H15_SharpeROC'],
+    'gen6': _GEN6,
+    # Gen7_1195pct / Gen7_T0001_117x / Gen7_T0005_3791pct
+    'gen7': _GEN7,
+    'alpha158_opt': _GEN7 + ['H19_MomAccel', 'H20_ExtDev', 'H21_VolShock'],
+    # Gen10_15171x_EPIC / Gen10_200x_target
+    'gen10': _GEN7 + ['H19_MomFusion', 'H20_VolExplo', 'H21_BBBreak', 'H22_VolMomAcc', 'H23_PriceVel'],
+    # 0208_Polymarket_BTC_15m
+    'btc_15m': ([f'ROC_{n}' for n in [1, 5, 10, 20, 60]]
+                + [f'VOL_{n}' for n in [10, 20, 60]]
+                + [f'MA_{n}' for n in [5, 10, 20, 60]]
+                + ['H1_Spike', 'H2_Quantile', 'H3_BiasVol', 'H4_VRegime', 'H5_MQuality', 'H6_Slope',
+                   'H13_HBreak', 'H14_LBreak', 'H15_TriMA', 'H16_ExtRet', 'H17_VPDiv']),
+}
+
+
+def _columns(feature_set):
+    entries = FEATURE_SETS[feature_set] if isinstance(feature_set, str) else feature_set
+    return [e if isinstance(e, tuple) else (e, e) for e in entries]
+
+
+def feature_names(feature_set):
+    """Model input columns of a set, in training order."""
+    return [col for col, _ in _columns(feature_set)]
+
+
+def factor_exprs(feature_set):
+    """{column: expression} with fresh nodes, for ``FeatureEngine`` / ``FeatureDAG``."""
+    defs = _definitions()
+    unknown = [factor for _, factor in _columns(feature_set) if factor not in defs]
+    if unknown:
+        raise KeyError(f"Unknown factors: {unknown}")
+    return {col: defs[factor] for col, factor in _columns(feature_set)}
+
+
+def qlib_fields(feature_set):
+    """(fields, names) for a Qlib data loader config."""
+    exprs = factor_exprs(feature_set)
+    return [repr(e) for e in exprs.values()], list(exprs)
+
+
+@lru_cache(maxsize=None)
+def _kernel(columns):
+    return FeatureDAG(factor_exprs(list(columns))).compile()
+
+
+def compute_factors(bars, feature_set):
+    """Factors over every bar of ``bars`` (DataFrame with the raw fields) as a DataFrame."""
+    columns = tuple(_columns(feature_set))
+    values = _kernel(columns)(bars)
+    return pd.DataFrame(values, index=bars.index, columns=[col for col, _ in columns])
+
+
+if __name__ == "__main__":
+    for name in FEATURE_SETS:
+        print(f"{name:>13}: {FeatureDAG(factor_exprs(name)).report()}")
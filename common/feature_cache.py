@@ -0,0 +1,96 @@
+"""
+Content-addressed on-disk cache of computed feature columns.
+
+A frame (one loader group over a set of instruments and a time range) lives
+in ``<root>/<frame key>/``, where the key hashes the provider data
+fingerprint, the instruments, the range and the frequency, so appending bars
+to the Qlib store or asking for another range simply addresses a different
+directory. Inside it every column is a float32 ``.npy`` named by the hash of
+its canonical expression, next to the shared row index:
+
+    cache = FeatureCache('~/.qlib/feature_cache')
+    frame = cache.frame(fingerprint, instruments, start, end, freq)
+    cols = frame.load(exprs)            # {expr: memmap} for the columns on disk
+    frame.save(index, {expr: values})   # the rest, once computed
+
+Columns are written to a temp file and renamed into place, so concurrent
+runs never read half-written arrays; loads are ``np.load(mmap_mode='r')``.
+Bump ``CACHE_VERSION`` when the evaluation semantics change.
+"""
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(repr(p).encode())
+        h.update(b'\0')
+    return h.hexdigest()[:24]
+
+
+def _atomic_save(path, array):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+class CachedFrame:
+    """One cached frame: a (datetime, instrument) index and float32 columns keyed by expression."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _column_path(self, expr):
+        return self.path / f"{digest(expr)}.npy"
+
+    def index(self):
+        times, codes, names = (self.path / f"_index_{p}.npy" for p in ['time', 'code', 'names'])
+        if not (times.exists() and codes.exists() and names.exists()):
+            return None
+        instruments = np.load(names).astype(object)[np.load(codes)]
+        return pd.MultiIndex.from_arrays([pd.DatetimeIndex(np.load(times)), instruments],
+                                         names=['datetime', 'instrument'])
+
+    def load(self, exprs):
+        """{expr: read-only float32 memmap} for the expressions already on disk."""
+        out = {}
+        for expr in exprs:
+            path = self._column_path(expr)
+            if path.exists():
+                out[expr] = np.load(path, mmap_mode='r')
+        return out
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def save(self, index, columns):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self.index() is None:
+            inst = pd.Categorical(index.get_level_values('instrument'))
+            _atomic_save(self.path / '_index_names.npy', np.asarray(inst.categories, dtype=str))
+            _atomic_save(self.path / '_index_code.npy', inst.codes.astype('int32'))
+            _atomic_save(self.path / '_index_time.npy',
+                         index.get_level_values('datetime').values.astype('datetime64[ns]'))
+        for expr, values in columns.items():
+            _atomic_save(self._column_path(expr), np.asarray(values, dtype='float32'))
+
+
+class FeatureCache:
+    def __init__(self, root):
+        self.root = Path(root).expanduser()
+
+    def frame(self, fingerprint, instruments, start, end, freq):
+        start = str(pd.Timestamp(start)) if start is not None else None
+        end = str(pd.Timestamp(end)) if end is not None else None
+        key = digest(CACHE_VERSION, fingerprint, sorted(instruments), start, end, freq)
+        return CachedFrame(self.root / key)
@@ -0,0 +1,171 @@
+"""
+Feature definitions compiled into a DAG and evaluated over whole frames.
+
+The feature sets repeat the same building blocks over and over
+(``Mean($close, 20)`` in MA_20 / H3 / H6 / H15 / H21, ``$close / Ref($close, 1) - 1``
+in ROC_1 / H1 / H6 / H9 / H10 / H16 / H17, ...). ``FeatureDAG`` merges
+structurally identical sub-expressions (``feature_engine.intern``) and
+computes every unique node once with the ``common.rolling`` kernels, so each
+shared rolling statistic costs one kernel call however many features use it
+(a ``Mean`` and ``Std`` of the same input and window share one call too).
+
+Features come either as expression objects (``factors.factor_exprs``)
+or as Qlib expression strings (the ``fields`` lists of train / backtest):
+
+    dag = FeatureDAG(dict(zip(names, fields)), min_periods=1)
+    print(dag.report())
+    features = dag.evaluate(bars)
+
+``min_periods=None`` (default) gives pandas' full-window semantics used by
+``generate_features``; ``min_periods=1`` gives Qlib's rolling operators,
+which emit values from the first bar on.
+
+Evaluation runs a kernel generated from the DAG (``kernel_source`` shows
+it): straight-line Python over float64 arrays, one statement per unique
+node. ``compile()`` returns it for callers that want arrays, not frames.
+"""
+
+import ast
+import re
+
+import numpy as np
+import pandas as pd
+
+from common.feature_engine import (Abs, BinOp, Const, Expr, Feature, Gt, Max, Mean, Min, Ref, Std, Sum,
+                                   _Rolling, intern, tree_size)
+from common.rolling import rolling_max, rolling_mean_std, rolling_min, rolling_sum, shift
+
+OPERATORS = {'Ref': Ref, 'Mean': Mean, 'Std': Std, 'Sum': Sum, 'Min': Min, 'Max': Max,
+             'Abs': Abs, 'Gt': Gt, 'Lt': lambda a, b: Gt(b, a)}
+ROLLING_FUNCS = {Sum: 'sum', Mean: 'mean', Std: 'std', Min: 'min', Max: 'max'}
+_BINOPS = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+_FIELD_PREFIX = '__field_'
+
+
+def parse_expr(text):
+    """Qlib expression string -> expression tree (``$close`` becomes ``Feature('close')``)."""
+
+    def build(node):
+        if isinstance(node, ast.Name) and node.id.startswith(_FIELD_PREFIX):
+            return Feature(node.id[len(_FIELD_PREFIX):])
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -build(node.operand)
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINOPS:
+            a, b = build(node.left), build(node.right)
+            if not isinstance(a, Expr):
+                a = Const(a)
+            return BinOp(_BINOPS[type(node.op)], a, b if isinstance(b, Expr) else Const(b))
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], (ast.Gt, ast.Lt)):
+            a, b = build(node.left), build(node.comparators[0])
+            a, b = (x if isinstance(x, Expr) else Const(x) for x in (a, b))
+            return Gt(a, b) if isinstance(node.ops[0], ast.Gt) else Gt(b, a)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in OPERATORS:
+            args = [build(a) for a in node.args]
+            if node.func.id not in ('Ref', 'Mean', 'Std', 'Sum', 'Min', 'Max'):
+                # Element-wise operators take constants as operands, e.g. Gt(x, 1)
+                args = [a if isinstance(a, Expr) else Const(a) for a in args]
+            return OPERATORS[node.func.id](*args)
+        raise ValueError(f"Unsupported expression in {text!r}: {ast.dump(node)}")
+
+    src = re.sub(r'\$(\w+)', _FIELD_PREFIX + r'\1', text)
+    expr = build(ast.parse(src, mode='eval').body)
+    return expr if isinstance(expr, Expr) else Const(expr)
+
+
+KERNELS = {'_shift': shift, '_mean_std': rolling_mean_std, '_sum': rolling_sum,
+           '_min': rolling_min, '_max': rolling_max}
+
+
+class FeatureDAG:
+    """Named features with shared sub-expressions computed once."""
+
+    def __init__(self, features, min_periods=None):
+        self.names = list(features)
+        exprs = [parse_expr(f) if isinstance(f, str) else f for f in features.values()]
+        self.written = sum(tree_size(e) for e in exprs)
+        self.rolling_written = sum(_count_rolling(e) for e in exprs)
+        self.outputs, self.nodes = intern(exprs)
+        self.min_periods = min_periods
+        self._kernel = None
+
+    @property
+    def computed(self):
+        return sum(1 for n in self.nodes if not isinstance(n, (Feature, Const)))
+
+    @property
+    def saved(self):
+        """Intermediate results reused instead of recomputed."""
+        return self.written - self.computed
+
+    @property
+    def fields(self):
+        return sorted(n.name for n in self.nodes if isinstance(n, Feature))
+
+    def report(self):
+        rolling = sum(1 for n in self.nodes if isinstance(n, (_Rolling, Ref)))
+        return (f"{len(self.names)} features: {self.written} operator nodes as written, "
+                f"{self.computed} after merging ({self.saved} intermediates saved); "
+                f"{rolling} rolling/Ref windows instead of {self.rolling_written}")
+
+    def evaluate(self, df):
+        """Features over the bars of ``df`` (one column per field name) as a DataFrame."""
+        values = self.compile()(df, self.min_periods)
+        return pd.DataFrame(values, index=df.index, columns=self.names)
+
+    # ── generated kernel ──
+    @property
+    def kernel_source(self):
+        var = {id(n): f"v{i}" for i, n in enumerate(self.nodes)}
+        # Mean / Std of the same input and window come out of one rolling_mean_std call
+        stats = {}
+        for node in self.nodes:
+            if isinstance(node, (Mean, Std)):
+                stats.setdefault((id(node.children[0]), node.n), {})[type(node)] = var[id(node)]
+
+        body = []
+        for node in self.nodes:
+            v = var[id(node)]
+            args = [var[id(c)] for c in node.children]
+            if isinstance(node, Feature):
+                expr = f"np.asarray(bars[{node.name!r}], dtype='float64')"
+            elif isinstance(node, Const):
+                expr = repr(node.value)
+            elif isinstance(node, BinOp):
+                expr = f"{args[0]} {node.op} {args[1]}"
+            elif isinstance(node, Gt):
+                expr = f"np.greater({args[0]}, {args[1]}).astype('float64')"
+            elif isinstance(node, Abs):
+                expr = f"np.abs({args[0]})"
+            elif isinstance(node, Ref):
+                expr = f"_shift({args[0]}, {node.n})"
+            elif isinstance(node, (Mean, Std)):
+                pair = stats.pop((id(node.children[0]), node.n), None)
+                if pair is None:
+                    continue  # assigned together with its Mean / Std above
+                v = f"{pair.get(Mean, '_')}, {pair.get(Std, '_')}"
+                expr = f"_mean_std({args[0]}, {node.n}, min_periods)"
+            else:
+                expr = f"_{ROLLING_FUNCS[type(node)]}({args[0]}, {node.n}, min_periods)"
+            body.append(f"        {v} = {expr}  # {node!r}"[:160])
+        outputs = ', '.join(var[id(n)] for n in self.outputs)
+        return '\n'.join([
+            "def kernel(bars, min_periods=None):",
+            "    with np.errstate(divide='ignore', invalid='ignore'):",
+            *body,
+            f"    return np.column_stack(np.broadcast_arrays({outputs}))",
+        ]) + '\n'
+
+    def compile(self):
+        """``kernel(bars, min_periods=None)`` -> (n_bars, n_features) float64; ``bars`` maps field -> array."""
+        if self._kernel is None:
+            namespace = {'np': np, **KERNELS}
+            exec(compile(self.kernel_source, f"<FeatureDAG {len(self.names)} features>", 'exec'), namespace)
+            self._kernel = namespace['kernel']
+        return self._kernel
+
+
+def _count_rolling(node):
+    own = 1 if isinstance(node, (_Rolling, Ref)) else 0
+    return own + sum(_count_rolling(c) for c in node.children)
@@ -0,0 +1,272 @@
+"""
+LightGBM boosters flattened into contiguous arrays for single-row scoring.
+
+A live poll scores one row, and for one row ``Booster.predict`` is mostly
+overhead (pandas conversion, input checks, thread setup), while every live
+process unpickles its own copy of the model. ``FlatModel`` holds the same
+trees as plain arrays, one entry per split node:
+
+    feature, threshold, left, right, default_left, missing     (children < 0 are leaves: ~leaf)
+    leaf_value, roots                                          (one root per tree)
+
+and walks them directly, with LightGBM's rules for missing values (NaN
+goes to ``default_left`` on NaN splits and counts as 0 elsewhere, inputs
+within ±1e-35 are 0, zero goes to ``default_left`` on zero splits), its tree-by-tree summation order and
+its output transform (sigmoid, exp, or the ``reg_sqrt`` back-transform
+sign(x)·x²), so the scores are those of ``Booster.predict``:
+
+    flat = FlatModel.from_booster(model)       # model.best_iteration, like predict()
+    flat.predict(latest_features)              # DataFrame, 2-D or 1-D array
+    flat.save('model.flat'); FlatModel.open('model.flat')   # .npy files, memory-mapped
+
+With numba the walk is one compiled loop (a few microseconds per row).
+Without it a few rows are scored one by one (every split decided at once,
+then one gather per level for all trees); larger batches descend all
+(row, tree) pairs one level per NumPy step. Raw scores are bit-identical to LightGBM's; the
+transformed ones can differ in the last bit. Linear trees and categorical
+splits are refused by ``from_booster``.
+
+``export(model, model_path)`` stores the flat copy next to a pickled model
+and points ``<model>.flat`` at it with an atomic symlink swap;
+``PublishedModel`` (common/walk_forward.py) loads that instead of the pickle
+when it exists. Existing pickles: ``python -m common.flat_trees model.pkl``.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # NumPy walk only
+    HAVE_NUMBA = False
+
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+# LightGBM's kZeroThreshold (a float 1e-35): inputs with |x| at or below it are read as 0
+ZERO_THRESHOLD = float(np.float32(1e-35))
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'default_left', 'missing', 'leaf_value', 'roots']
+IDENTITY = {'regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape'}
+EXP = {'poisson', 'gamma', 'tweedie'}
+SIGMOID = {'binary', 'cross_entropy'}
+# Without numba, batches up to this many rows are scored row by row
+ROW_BY_ROW = 8
+
+
+# ── walk ──
+def _nb_predict(X, roots, feature, threshold, left, right, default_left, missing, leaf_value, out):
+    for i in range(X.shape[0]):
+        acc = 0.0
+        for t in range(roots.shape[0]):
+            node = roots[t]
+            while node >= 0:
+                v = X[i, feature[node]]
+                m = missing[node]
+                if (np.isnan(v) and m != MISSING_NAN) or -ZERO_THRESHOLD <= v <= ZERO_THRESHOLD:
+                    v = 0.0
+                if (m == MISSING_ZERO and -ZERO_THRESHOLD <= v <= ZERO_THRESHOLD) or (m == MISSING_NAN and np.isnan(v)):
+                    node = left[node] if default_left[node] else right[node]
+                elif v <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            acc += leaf_value[~node]
+        out[i] = acc
+    return out
+
+
+if HAVE_NUMBA:
+    _nb_predict = njit(cache=True)(_nb_predict)
+
+
+def _go_left(v, m, default_left, threshold):
+    nan = np.isnan(v)
+    v = np.where((nan & (m != MISSING_NAN)) | (np.abs(v) <= ZERO_THRESHOLD), 0.0, v)
+    default = ((m == MISSING_ZERO) & (np.abs(v) <= ZERO_THRESHOLD)) | ((m == MISSING_NAN) & nan)
+    return np.where(default, default_left, v <= threshold)
+
+
+def _np_predict(X, roots, feature, threshold, left, right, default_left, missing, leaf_value, out):
+    """All (row, tree) pairs descend one level per step."""
+    rows = np.arange(X.shape[0])[:, None]
+    node = np.broadcast_to(roots, (X.shape[0], len(roots))).copy()
+    active = node >= 0
+    while active.any():
+        at = np.where(active, node, 0)
+        go_left = _go_left(X[rows, feature[at]], missing[at], default_left[at], threshold[at])
+        node = np.where(active, np.where(go_left, left[at], right[at]), node)
+        active = node >= 0
+    # cumsum adds tree by tree, the order LightGBM sums in (np.sum would pair them up)
+    out[:] = np.cumsum(leaf_value[~node], axis=1)[:, -1] if len(roots) else 0.0
+    return out
+
+
+def _np_predict_rows(X, roots, feature, threshold, left, right, default_left, missing, leaf_value, out):
+    """Row by row: every split decided at once, then each descent step is one gather for all trees."""
+    n_leaves = len(leaf_value)
+    for i, x in enumerate(X):
+        # Leaves (~leaf + n_leaves) point at themselves, split nodes at the child this row goes to
+        step = np.concatenate([np.arange(-n_leaves, 0, dtype='int32'),
+                               np.where(_go_left(x[feature], missing, default_left, threshold), left, right)])
+        node = roots
+        while (node >= 0).any():
+            node = step[node + n_leaves]
+        # cumsum adds tree by tree, the order LightGBM sums in
+        out[i] = np.cumsum(leaf_value[~node])[-1] if len(roots) else 0.0
+    return out
+
+
+# ── model ──
+class FlatModel:
+    """A booster's trees as flat arrays; ``predict`` matches ``Booster.predict``."""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.feature_names = meta['feature_names']
+        self.num_features = len(self.feature_names)
+
+    @classmethod
+    def from_booster(cls, booster, num_iteration=None):
+        """Flatten ``booster`` (its best iteration by default, as ``predict`` does)."""
+        if num_iteration is None:
+            num_iteration = booster.best_iteration or -1
+        dump = booster.dump_model(num_iteration=num_iteration)
+        objective, *opts = dump['objective'].split()
+        if dump['num_tree_per_iteration'] != 1 or dump['average_output']:
+            raise ValueError("Only single-output gbdt boosters can be flattened")
+        if objective not in IDENTITY | EXP | SIGMOID:
+            raise ValueError(f"Unsupported objective for a flat model: {objective}")
+        sigmoid = next((float(o.split(':')[1]) for o in opts if o.startswith('sigmoid:')), 1.0)
+        # reg_sqrt: trained on sign(y)·sqrt(|y|), predictions are squared back
+        sqrt = 'sqrt' in opts
+        if sqrt and objective not in IDENTITY:
+            raise ValueError(f"Unsupported objective for a flat model: {dump['objective']}")
+
+        nodes = {k: [] for k in ['feature', 'threshold', 'left', 'right', 'default_left', 'missing']}
+        leaf_value, roots = [], []
+
+        def add(tree):
+            if 'leaf_value' in tree or 'split_feature' not in tree:
+                # Linear trees (linear_tree=True) fit a model per leaf; only constants can be flattened
+                if 'leaf_coeff' in tree:
+                    raise ValueError("Linear trees are not supported by FlatModel")
+                leaf_value.append(tree.get('leaf_value', 0.0))
+                return ~(len(leaf_value) - 1)
+            if tree['decision_type'] != '<=':
+                raise ValueError("Categorical splits are not supported by FlatModel")
+            i = len(nodes['feature'])
+            nodes['feature'].append(tree['split_feature'])
+            nodes['threshold'].append(tree['threshold'])
+            nodes['default_left'].append(tree['default_left'])
+            nodes['missing'].append({'None': MISSING_NONE, 'Zero': MISSING_ZERO, 'NaN': MISSING_NAN}[tree['missing_type']])
+            nodes['left'].append(0)
+            nodes['right'].append(0)
+            nodes['left'][i] = add(tree['left_child'])
+            nodes['right'][i] = add(tree['right_child'])
+            return i
+
+        for info in dump['tree_info']:
+            roots.append(add(info['tree_structure']))
+        arrays = {
+            'feature': np.array(nodes['feature'], dtype='int32'),
+            'threshold': np.array(nodes['threshold'], dtype='float64'),
+            'left': np.array(nodes['left'], dtype='int32'),
+            'right': np.array(nodes['right'], dtype='int32'),
+            'default_left': np.array(nodes['default_left'], dtype='bool'),
+            'missing': np.array(nodes['missing'], dtype='uint8'),
+            'leaf_value': np.array(leaf_value, dtype='float64'),
+            'roots': np.array(roots, dtype='int32'),
+        }
+        meta = {'objective': objective, 'sigmoid': sigmoid, 'sqrt': sqrt, 'feature_names': dump['feature_names']}
+        return cls(arrays, meta)
+
+    def num_trees(self):
+        return len(self.roots)
+
+    def predict(self, X, raw_score=False):
+        """Scores of the rows of ``X`` (columns in training order), transformed like ``Booster.predict``."""
+        X = X.to_numpy(dtype='float64') if hasattr(X, 'to_numpy') else np.asarray(X, dtype='float64')
+        X = np.ascontiguousarray(X.reshape(1, -1) if X.ndim == 1 else X)
+        if X.shape[1] != self.num_features:
+            raise ValueError(f"Expected {self.num_features} features, got {X.shape[1]}")
+        out = np.empty(X.shape[0])
+        if HAVE_NUMBA:
+            _nb_predict(X, self.roots, self.feature, self.threshold, self.left, self.right,
+                        self.default_left, self.missing, self.leaf_value, out)
+        elif X.shape[0] <= ROW_BY_ROW:
+            _np_predict_rows(X, self.roots, self.feature, self.threshold, self.left, self.right,
+                             self.default_left, self.missing, self.leaf_value, out)
+        else:
+            _np_predict(X, self.roots, self.feature, self.threshold, self.left, self.right,
+                        self.default_left, self.missing, self.leaf_value, out)
+        if raw_score:
+            return out
+        objective = self.meta['objective']
+        if objective in SIGMOID:
+            return 1.0 / (1.0 + np.exp(-self.meta['sigmoid'] * out))
+        if objective in EXP:
+            return np.exp(out)
+        if self.meta.get('sqrt'):
+            return np.sign(out) * out * out
+        return out
+
+    # ── storage ──
+    def save(self, path):
+        """One ``.npy`` per array plus ``_meta.json`` in directory ``path``, written atomically."""
+        path = Path(path).expanduser()
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.mkdir(parents=True, exist_ok=True)
+        for name in ARRAYS:
+            np.save(tmp / f"{name}.npy", getattr(self, name))
+        (tmp / '_meta.json').write_text(json.dumps(self.meta))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Load a saved model, its arrays memory-mapped (shared between processes) unless ``mmap=False``."""
+        path = Path(path).expanduser()
+        meta = json.loads((path / '_meta.json').read_text())
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode='r' if mmap else None) for name in ARRAYS}
+        return cls(arrays, meta)
+
+
+# ── published copies ──
+def flat_path(model_path):
+    """``<model>.flat``: the symlink to the current flat copy of a pickled model."""
+    return Path(model_path).with_name(Path(model_path).name + '.flat')
+
+
+def export(booster, model_path, keep=2):
+    """Save ``booster`` flat next to ``model_path`` and swap ``<model>.flat`` to it atomically."""
+    link = flat_path(model_path)
+    store = link.with_name(link.name + '.d')
+    store.mkdir(exist_ok=True)
+    target = FlatModel.from_booster(booster).save(store / f"{time.time_ns()}")
+    tmp = link.with_name(f".{link.name}.{os.getpid()}.tmp")
+    os.symlink(os.path.relpath(target, link.parent), tmp)
+    os.replace(tmp, link)  # readers resolve either the old copy or the new one
+    # Older copies are removed, but the previous one stays for readers still opening it
+    for old in sorted(p for p in store.iterdir() if not p.name.startswith('.'))[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+    return link
+
+
+def main():
+    for model_path in sys.argv[1:] or ['lgbm_model_eth_10m.pkl']:
+        with open(model_path, 'rb') as f:
+            booster = pickle.load(f)
+        link = export(booster, model_path)
+        print(f"{model_path} -> {link} ({booster.num_trees()} trees, numba={HAVE_NUMBA})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Historical Binance futures statistics: open interest, taker buy/sell ratio
+and top-trader long/short ratio.
+
+``backfill_futures_data`` pages every series by ``startTime``/``endTime`` on a
+thread pool and appends to a day-partitioned store (one ``FuturesDataStore``
+per series, same layout as ``KlineStore``), so each run only fetches the
+periods the store's manifest still reports missing. Days covered by pages
+that came back are sealed (or recorded empty), so holes the exchange itself
+has are not refetched, while a failed page leaves its days open for the next
+run. Binance keeps just
+the last 30 days of these series, which is why the store matters: history
+accumulates locally across runs.
+
+    backfill_futures_data(STORE_DIR, "BTCUSDT", "15m")
+    extra = load_futures_data(STORE_DIR, "BTCUSDT", "15m")
+    df = asof_join(df_15m, extra, bar_freq="15min")
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from common.backfill import interval_to_ms, split_range
+from common.binance_client import get_futures_data_client
+from common.kline_store import PartitionedStore, _merge_ranges
+
+RETENTION_DAYS = 30
+PAGE_LIMIT = 500
+
+# series -> (endpoint, {api field: column})
+FUTURES_DATA_SERIES = {
+    'open_interest': ('/futures/data/openInterestHist',
+                      {'sumOpenInterest': 'oi', 'sumOpenInterestValue': 'oi_value'}),
+    'taker_ls_ratio': ('/futures/data/takerlongshortRatio',
+                       {'buySellRatio': 'taker_ls_ratio', 'buyVol': 'taker_buy_vol',
+                        'sellVol': 'taker_sell_vol'}),
+    'top_trader_ls_ratio': ('/futures/data/topLongShortAccountRatio',
+                            {'longShortRatio': 'top_trader_ls_ratio',
+                             'longAccount': 'top_trader_long_pct'}),
+}
+
+
+class FuturesDataStore(PartitionedStore):
+    """``<root>/<series>/<SYMBOL>/<period>/YYYY-MM-DD.parquet``"""
+
+    TIME_COLUMN = 'timestamp'
+
+    def __init__(self, root, symbol, period, series):
+        self.series = series
+        self.endpoint, self.fields = FUTURES_DATA_SERIES[series]
+        self.COLUMNS = [self.TIME_COLUMN] + list(self.fields.values())
+        super().__init__(Path(root) / series, symbol, period)
+
+    def normalize(self, df):
+        df = df.rename(columns=self.fields)
+        df = df[self.COLUMNS].copy()
+        df[self.TIME_COLUMN] = df[self.TIME_COLUMN].astype('int64')
+        cols = self.COLUMNS[1:]
+        df[cols] = df[cols].astype('float64')
+        return df
+
+
+def _fetch_page(client, endpoint, symbol, period, start_ms, end_ms):
+    """One page of points; [] when the range has none, None when the request failed."""
+    params = {
+        "symbol": symbol,
+        "period": period,
+        "startTime": start_ms,
+        "endTime": end_ms,
+        "limit": PAGE_LIMIT
+    }
+    return client.get(endpoint, params=params)
+
+
+def backfill_futures_data(store_dir, symbol, period='15m', series=None, days=RETENTION_DAYS,
+                          workers=8, client=None):
+    """Fetch every missing point of ``series`` (default: all) into the store.
+
+    Each request covers at most ``PAGE_LIMIT`` periods, so pages are
+    independent and run concurrently across all series. Returns
+    ``{series: rows fetched}``; failed pages are reported and retried on
+    the next run.
+    """
+    client = client or get_futures_data_client()
+    series = list(series or FUTURES_DATA_SERIES)
+    step_ms = interval_to_ms(period)
+
+    now_ms = int(time.time() * 1000)
+    end_ms = now_ms - now_ms % step_ms - step_ms  # last completed period
+    # Older points are gone from the exchange; start one period inside retention
+    start_ms = max(now_ms - min(days, RETENTION_DAYS) * 86_400_000 + step_ms, 0)
+
+    stores = {name: FuturesDataStore(store_dir, symbol, period, name) for name in series}
+    jobs = []
+    for name, store in stores.items():
+        # Unsealed days include interior holes from a failed page of an earlier run
+        for gap_start, gap_end in store.missing_ranges(start_ms, end_ms):
+            n_pages = -(-((gap_end - gap_start) // step_ms + 1) // PAGE_LIMIT)
+            for s, e in split_range(gap_start, gap_end, n_pages, step_ms, page_bars=PAGE_LIMIT):
+                jobs.append((name, s, e))
+
+    fetched = {name: [] for name in series}
+    covered = {name: [] for name in series}  # page ranges the exchange answered
+    failed = 0
+    if jobs:
+        print(f"Fetching {len(jobs)} pages of {', '.join(series)} for {symbol} ({period})...")
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {
+                pool.submit(_fetch_page, client, stores[name].endpoint, symbol, period, s, e): (name, s, e)
+                for name, s, e in jobs
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                name, s, e = futures[future]
+                rows = future.result()
+                if rows is None:
+                    failed += 1
+                else:
+                    fetched[name].extend(rows)
+                    covered[name].append((s, e))
+                print(f"Fetched {done}/{len(jobs)} pages...", end='\r')
+        print()
+        if failed:
+            print(f"{failed}/{len(jobs)} pages failed; their days stay open for the next run")
+
+    counts = {}
+    for name, rows in fetched.items():
+        store = stores[name]
+        df = pd.DataFrame(rows)
+        if len(df):
+            df = df[(df['timestamp'] >= start_ms) & (df['timestamp'] <= end_ms)]
+        store.write(df)
+        # Days the exchange answered for are complete, including the ones it had nothing for
+        for s, e in _merge_ranges(covered[name], step_ms):
+            store.mark_empty(s, e)
+            store.write(None, sealed_range=(s, e))
+        counts[name] = len(df)
+    return counts
+
+
+def load_futures_data(store_dir, symbol, period='15m', series=None, start=None, end=None):
+    """All stored ``series`` outer-joined on ``datetime``, sorted, one column per field."""
+    frames = []
+    for name in series or FUTURES_DATA_SERIES:
+        df = FuturesDataStore(store_dir, symbol, period, name).load(start, end)
+        frames.append(df.drop(columns='timestamp').set_index('datetime'))
+    out = pd.concat(frames, axis=1, join='outer').sort_index()
+    out.index.name = 'datetime'
+    return out.reset_index()
+
+
+def asof_join(bars, extra, bar_freq='15min', on='datetime', tolerance=None):
+    """Attach the latest ``extra`` values known by each bar's close.
+
+    ``bars[on]`` is the bar open time. A statistic stamped ``t`` is matched to
+    a bar only if ``t`` is strictly before the bar closes, so a feature can
+    never peek into the next bar. ``tolerance`` (e.g. ``'1h'``) leaves stale
+    values as NaN instead of carrying them across outages.
+    """
+    bars = bars.copy()
+    bars[on] = pd.to_datetime(bars[on])
+    order = bars[on].argsort(kind='stable')
+    left = bars.iloc[order]
+    left = left.assign(_close=left[on] + pd.Timedelta(bar_freq))
+
+    right = extra.rename(columns={'datetime': '_stat_time'}).sort_values('_stat_time')
+    right['_stat_time'] = pd.to_datetime(right['_stat_time']).astype(left['_close'].dtype)
+    joined = pd.merge_asof(left, right, left_on='_close', right_on='_stat_time',
+                           direction='backward', allow_exact_matches=False,
+                           tolerance=pd.Timedelta(tolerance) if tolerance else None)
+    joined = joined.drop(columns=['_close', '_stat_time'])
+    joined.index = bars.index[order]
+    return joined.sort_index()
@@ -0,0 +1,231 @@
+"""
+Append-only kline store, partitioned as one Parquet file per UTC day.
+
+Layout::
+
+    <root>/<SYMBOL>/<interval>/2025-01-05.parquet
+    <root>/<SYMBOL>/<interval>/_manifest.json
+
+The manifest keeps per-day row counts and open-time bounds, so gap detection
+never has to open the partitions. Writes only rewrite the days they touch,
+each via a temp file + ``os.replace``.
+
+``PartitionedStore`` is the schema-agnostic part; ``KlineStore`` binds it to
+the kline columns, and other fixed-period series (see ``common.futures_data``)
+subclass it the same way.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.backfill import KLINE_COLUMNS, interval_to_ms
+
+DAY_MS = 86_400_000
+
+STORE_COLUMNS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'quote_volume',
+                 'trades', 'buyer_buy_base', 'buyer_buy_quote']
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'quote_volume',
+                 'buyer_buy_base', 'buyer_buy_quote']
+
+
+def klines_to_frame(rows):
+    """Raw Binance kline rows -> store-schema DataFrame."""
+    df = pd.DataFrame(rows, columns=KLINE_COLUMNS)
+    df = df.rename(columns={'quote_asset_volume': 'quote_volume'})
+    return _normalize(df)
+
+
+def _normalize(df):
+    df = df.copy()
+    if 'open_time' not in df.columns or not np.issubdtype(df['open_time'].dtype, np.integer):
+        src = df['datetime'] if 'datetime' in df.columns else df['open_time']
+        df['open_time'] = pd.to_datetime(src).astype('datetime64[ms]').astype('int64')
+    if 'quote_volume' not in df.columns and 'amount' in df.columns:
+        df['quote_volume'] = df['amount']
+    for c in STORE_COLUMNS:
+        if c not in df.columns:
+            df[c] = np.nan
+    df = df[STORE_COLUMNS]
+    df[FLOAT_COLUMNS] = df[FLOAT_COLUMNS].astype('float64')
+    df['trades'] = pd.to_numeric(df['trades'], errors='coerce').fillna(0).astype('int64')
+    df['open_time'] = df['open_time'].astype('int64')
+    return df
+
+
+def _merge_ranges(ranges, step_ms):
+    merged = []
+    for s, e in sorted(ranges):
+        if merged and s <= merged[-1][1] + step_ms:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+class PartitionedStore:
+    """Day-partitioned store of one fixed-period series keyed on ``TIME_COLUMN`` (ms)."""
+
+    TIME_COLUMN = 'open_time'
+    COLUMNS = [TIME_COLUMN]
+
+    def __init__(self, root, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.step_ms = interval_to_ms(interval)
+        self.path = Path(root) / symbol / interval
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self.path / '_manifest.json'
+        self.manifest = self._read_manifest()
+
+    # ── manifest ────────────────────────────────────────────────────────────
+    def _read_manifest(self):
+        if self._manifest_path.exists():
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        # Rebuild from partitions (first run or lost manifest)
+        manifest = {}
+        for p in sorted(self.path.glob('*.parquet')):
+            ts = pd.read_parquet(p, columns=[self.TIME_COLUMN])[self.TIME_COLUMN]
+            manifest[p.stem] = {"rows": len(ts), "first": int(ts.min()), "last": int(ts.max()), "sealed": False}
+        return manifest
+
+    def _write_manifest(self):
+        tmp = self._manifest_path.with_suffix('.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._manifest_path)
+
+    # ── queries ─────────────────────────────────────────────────────────────
+    def _days(self):
+        """Days that have a partition (``mark_empty`` days are manifest-only)."""
+        return sorted(d for d, entry in self.manifest.items() if entry['rows'])
+
+    def is_empty(self):
+        return not self._days()
+
+    def bounds(self):
+        """(first_open_ms, last_open_ms) or None when empty."""
+        days = self._days()
+        if not days:
+            return None
+        return self.manifest[days[0]]['first'], self.manifest[days[-1]]['last']
+
+    def _partition(self, day):
+        return self.path / f"{day}.parquet"
+
+    def missing_ranges(self, start_ms, end_ms):
+        """Open-time ranges in [start_ms, end_ms] with no stored bars.
+
+        Covers the backward gap (before the first stored bar), the forward gap
+        (up to ``end_ms``) and holes inside unsealed days.
+        """
+        step = self.step_ms
+        start_ms = start_ms + (-start_ms) % step
+        end_ms = end_ms - end_ms % step
+        if end_ms < start_ms:
+            return []
+
+        gaps = []
+        day_start = start_ms - start_ms % DAY_MS
+        while day_start <= end_ms:
+            lo = max(day_start, start_ms)
+            hi = min(day_start + DAY_MS - step, end_ms)
+            day = pd.Timestamp(day_start, unit='ms').strftime('%Y-%m-%d')
+            entry = self.manifest.get(day)
+            if entry is None:
+                gaps.append((lo, hi))
+            elif not entry['sealed'] and entry['rows'] < DAY_MS // step:
+                have = pd.read_parquet(self._partition(day), columns=[self.TIME_COLUMN])[self.TIME_COLUMN].to_numpy()
+                want = np.arange(lo, hi + step, step, dtype='int64')
+                for t in want[~np.isin(want, have)]:
+                    gaps.append((int(t), int(t)))
+            day_start += DAY_MS
+        return _merge_ranges(gaps, step)
+
+    def load(self, start=None, end=None):
+        """Bars in [start, end] (anything ``pd.Timestamp`` accepts) with a ``datetime`` column."""
+        days = self._days()
+        if start is not None:
+            days = [d for d in days if d >= pd.Timestamp(start).strftime('%Y-%m-%d')]
+        if end is not None:
+            days = [d for d in days if d <= pd.Timestamp(end).strftime('%Y-%m-%d')]
+        if not days:
+            return pd.DataFrame(columns=['datetime'] + self.COLUMNS)
+
+        df = pd.concat([pd.read_parquet(self._partition(d)) for d in days], ignore_index=True)
+        df.insert(0, 'datetime', pd.to_datetime(df[self.TIME_COLUMN], unit='ms'))
+        if start is not None:
+            df = df[df['datetime'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['datetime'] <= pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+    # ── writes ──────────────────────────────────────────────────────────────
+    def normalize(self, df):
+        """Coerce an incoming frame to ``COLUMNS`` (subclasses define the schema)."""
+        return df[self.COLUMNS]
+
+    def write(self, df, sealed_range=None):
+        """Merge ``df`` into the store, rewriting only the days it touches.
+
+        ``sealed_range=(start_ms, end_ms)`` marks days fully inside a range
+        that was just fetched from the exchange as complete, so holes the
+        exchange itself has (maintenance windows) are not refetched forever.
+        Returns the list of days written.
+        """
+        key = self.TIME_COLUMN
+        written = []
+        if df is not None and len(df):
+            df = self.normalize(df)
+            day_key = pd.to_datetime(df[key], unit='ms').dt.strftime('%Y-%m-%d')
+            for day, part in df.groupby(day_key):
+                path = self._partition(day)
+                if path.exists():
+                    part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                part = (part.drop_duplicates(key, keep='last')
+                            .sort_values(key)
+                            .reset_index(drop=True))
+                tmp = path.with_suffix('.parquet.tmp')
+                part.to_parquet(tmp, index=False)
+                os.replace(tmp, path)
+
+                prev = self.manifest.get(day, {})
+                self.manifest[day] = {
+                    "rows": len(part),
+                    "first": int(part[key].iloc[0]),
+                    "last": int(part[key].iloc[-1]),
+                    "sealed": prev.get('sealed', False),
+                }
+                written.append(day)
+
+        if sealed_range is not None:
+            s, e = sealed_range
+            for day, entry in self.manifest.items():
+                day_start = int(pd.Timestamp(day).value // 10**6)
+                if s <= day_start and day_start + DAY_MS - self.step_ms <= e:
+                    entry['sealed'] = True
+
+        self._write_manifest()
+        return written
+
+    def mark_empty(self, start_ms, end_ms):
+        """Record days fully inside [start_ms, end_ms] that the exchange has no data for
+        (e.g. before a listing), so ``missing_ranges`` stops reporting them."""
+        day_start = start_ms + (-start_ms) % DAY_MS
+        while day_start + DAY_MS - self.step_ms <= end_ms:
+            day = pd.Timestamp(day_start, unit='ms').strftime('%Y-%m-%d')
+            if day not in self.manifest:
+                self.manifest[day] = {"rows": 0, "first": None, "last": None, "sealed": True}
+            day_start += DAY_MS
+        self._write_manifest()
+
+
+class KlineStore(PartitionedStore):
+    COLUMNS = STORE_COLUMNS
+
+    def normalize(self, df):
+        return _normalize(df)
@@ -0,0 +1,226 @@
+"""
+WebSocket kline streaming source for the live strategies.
+
+Keeps a rolling in-memory window of closed 1m bars current from the Binance
+``<symbol>@kline_1m`` stream and fires the moment a resampled bar (10min by
+default) closes, instead of re-downloading 1000 bars every poll. Gaps (start
+up, reconnects, dropped messages) are reconciled over REST. Each 1m bar is
+folded into every requested bar size by ``IncrementalResampler``, so one
+feed can drive strategies at 5m/10m/15m/1h at once. With ``cache_path`` the
+1m window is mirrored into a memory-mapped ``BarRingBuffer``, so a restart
+resumes from disk and only fetches the bars it missed.
+
+    stream = KlineStream("ETHUSDT", bar_freq="10min", window=2000)
+    stream.start()
+    while True:
+        df_10m = stream.wait_for_bar()   # completed 10m bars, oldest first
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pandas as pd
+
+from common.backfill import FetchError, backfill_klines, interval_to_ms
+from common.resample import IncrementalResampler, bars_to_frame, freq_to_ms
+from common.ring_buffer import BarRingBuffer
+
+FSTREAM_URL = "wss://fstream.binance.com/ws"
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'quote_volume']
+
+
+class KlineStream:
+    def __init__(self, symbol, interval="1m", bar_freq="10min", window=2000,
+                 on_bar_close=None, ws_url=FSTREAM_URL, client=None, cache_path=None):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.bar_freqs = [bar_freq] if isinstance(bar_freq, str) else list(bar_freq)
+        self.bar_freq = self.bar_freqs[0]
+        self.window = window
+        self.on_bar_close = on_bar_close
+        self.ws_url = ws_url.rstrip('/')
+        self.client = client
+        self.step_ms = interval_to_ms(interval)
+
+        self._bars = OrderedDict()  # open_time ms -> [open, high, low, close, volume, quote_volume]
+        self._lock = threading.Lock()
+        self._resampler = IncrementalResampler(self.bar_freqs, step_ms=self.step_ms)
+        self._completed = {
+            f: deque(maxlen=max(1, window * self.step_ms // freq_to_ms(f))) for f in self.bar_freqs
+        }
+        self._events = {f: queue.Queue() for f in self.bar_freqs}
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.cache = None
+        if cache_path is not None:
+            self.cache = BarRingBuffer(cache_path, capacity=window, step_ms=self.step_ms)
+            self._load_cache()
+
+    # ── window maintenance ──────────────────────────────────────────────────
+    @property
+    def last_open_time(self):
+        with self._lock:
+            return next(reversed(self._bars)) if self._bars else None
+
+    def _load_cache(self):
+        now_ms = int(time.time() * 1000)
+        cutoff = now_ms - now_ms % self.step_ms - self.window * self.step_ms
+        bars = self.cache.snapshot()
+        bars = bars[bars['open_time'] >= cutoff]  # Too old to be contiguous with what comes next
+        for row in bars.tolist():
+            self._insert(int(row[0]), list(row[1:]))
+        if len(bars):
+            print(f"Loaded {len(bars)} cached bars from {self.cache.path}")
+
+    def _insert(self, open_time, values):
+        with self._lock:
+            if self._bars and open_time <= next(reversed(self._bars)):
+                return  # Already have it (stream and REST overlap)
+            self._bars[open_time] = values
+            if self.cache is not None:
+                self.cache.append(open_time, *values)
+            while len(self._bars) > self.window:
+                self._bars.popitem(last=False)
+            closed = self._resampler.update(open_time, *values)
+            for freq, bars in closed.items():
+                self._completed[freq].extend(bars)
+        return closed
+
+    def reconcile(self, end_ms=None):
+        """Fill the window over REST from the last stored bar up to ``end_ms``.
+
+        With an empty window this is the warm start: the last ``window`` bars.
+        """
+        if end_ms is None:
+            now_ms = int(time.time() * 1000)
+            end_ms = now_ms - now_ms % self.step_ms - self.step_ms  # last closed bar
+        last = self.last_open_time
+        # Never fetch more than the window can hold (e.g. after a long disconnect)
+        start_ms = end_ms - (self.window - 1) * self.step_ms
+        if last is not None:
+            start_ms = max(start_ms, last + self.step_ms)
+        if start_ms > end_ms:
+            return 0
+
+        try:
+            rows = backfill_klines(self.symbol, self.interval, start_ms, end_ms,
+                                   shards=4, client=self.client)
+        except FetchError as e:
+            # Keep the bars before the first failed page so the window stays contiguous;
+            # the next reconcile starts from there
+            first_missing = e.missing[0][0]
+            rows = [k for k in e.rows if int(k[0]) < first_missing]
+            print(f"Reconcile incomplete ({e}), kept {len(rows)} bars")
+        closed = {}
+        for k in rows:
+            for freq in self._insert(int(k[0]), [float(k[1]), float(k[2]), float(k[3]), float(k[4]),
+                                                 float(k[5]), float(k[7])]) or ():
+                closed[freq] = True
+        self._emit(closed)
+        return len(rows)
+
+    def handle_message(self, msg):
+        """Process one kline stream message (already JSON-decoded)."""
+        k = msg.get('k') if isinstance(msg, dict) else None
+        if not k or not k.get('x'):
+            return  # Only closed 1m bars enter the window
+        open_time = int(k['t'])
+        last = self.last_open_time
+        if last is not None and open_time > last + self.step_ms:
+            # Missed messages: fetch the hole before accepting this bar
+            self.reconcile(end_ms=open_time - self.step_ms)
+        closed = self._insert(open_time, [float(k['o']), float(k['h']), float(k['l']), float(k['c']),
+                                          float(k['v']), float(k['q'])])
+        self._emit(closed or {})
+
+    def _emit(self, closed):
+        # Only the newest state matters when several buckets closed at once
+        for freq in closed:
+            bars = self.bars_frame(freq)
+            self._events[freq].put(bars)
+            if self.on_bar_close is not None:
+                if len(self.bar_freqs) > 1:
+                    self.on_bar_close(freq, bars)
+                else:
+                    self.on_bar_close(bars)
+
+    # ── views ───────────────────────────────────────────────────────────────
+    def frame(self):
+        """Closed 1m bars in the window, indexed by open ``datetime``."""
+        with self._lock:
+            items = list(self._bars.items())
+        df = pd.DataFrame([v for _, v in items], columns=BAR_FIELDS,
+                          index=pd.to_datetime([t for t, _ in items], unit='ms'))
+        df.index.name = 'datetime'
+        return df
+
+    def bars_frame(self, freq=None):
+        """Completed bars of ``freq`` (default: the first bar_freq), oldest first."""
+        with self._lock:
+            bars = list(self._completed[freq or self.bar_freq])
+        return bars_to_frame(bars)
+
+    def poll(self, freq=None):
+        """REST-only mode: catch the window up and return the completed ``freq`` bars."""
+        self.reconcile()
+        return self.bars_frame(freq)
+
+    def wait_for_bar(self, timeout=None, freq=None):
+        """Block until a ``freq`` bar closes; returns the latest completed-bars frame (or None on timeout)."""
+        events = self._events[freq or self.bar_freq]
+        try:
+            bars = events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        # Only the newest frame matters if the consumer fell behind
+        while True:
+            try:
+                bars = events.get_nowait()
+            except queue.Empty:
+                return bars
+
+    # ── websocket loop ──────────────────────────────────────────────────────
+    async def run(self):
+        import websockets
+
+        url = f"{self.ws_url}/{self.symbol.lower()}@kline_{self.interval}"
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20) as ws:
+                    print(f"Kline stream connected: {url}")
+                    backoff = 1.0
+                    # Catch up on anything missed while disconnected
+                    await asyncio.to_thread(self.reconcile)
+                    async for raw in ws:
+                        if self._stop.is_set():
+                            break
+                        msg = json.loads(raw)
+                        await asyncio.to_thread(self.handle_message, msg.get('data', msg))
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                print(f"Kline stream error: {e}, reconnecting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def start(self):
+        """Warm up over REST, then run the stream on a daemon thread."""
+        self.reconcile()
+        for freq, events in self._events.items():
+            if events.empty():
+                events.put(self.bars_frame(freq))  # Score the current state right away
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self.cache is not None:
+            self.cache.flush()
@@ -0,0 +1,48 @@
+"""
+float32 feature matrices from load to ``lgb.Dataset``.
+
+The Qlib bins are ``<f4`` and ``DagDataLoader`` / the feature cache hand out
+float32 columns, but pandas widens a frame to float64 at the first mixed
+``astype`` or CSV read, and every float64 copy along the way costs twice the
+memory. LightGBM itself bins float32 input as-is, so the matrix can stay
+float32 the whole way:
+
+    X = as_float32(df[feature_cols])               # one float32 block, no-op if it already is
+    dtrain = lgb_dataset(X_train, y_train)         # values passed to LightGBM without a copy
+    dvalid = lgb_dataset(X_valid, y_valid, reference=dtrain)
+
+``lgb_dataset`` passes the frame's block straight to LightGBM (row- or
+column-major, whichever pandas holds) together with the column names, and
+frees it once the bins are built.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def as_float32(df, columns=None):
+    """``df`` with its float columns (or just ``columns``) as float32; returns ``df`` itself when nothing changes."""
+    cols = [c for c in (df.columns if columns is None else columns)
+            if pd.api.types.is_float_dtype(df[c]) and df[c].dtype != np.float32]
+    if not cols:
+        return df
+    return df.astype({c: 'float32' for c in cols})
+
+
+def float32_values(X):
+    """(float32 2-D array, column names) of a frame or array, a view when ``X`` is already one float32 block."""
+    if isinstance(X, pd.DataFrame):
+        names = [str(c) for c in X.columns]
+        return X.to_numpy(dtype='float32', copy=False), names
+    return np.asarray(X, dtype='float32'), 'auto'
+
+
+def lgb_dataset(X, label=None, reference=None, **kwargs):
+    """``lgb.Dataset`` over the float32 values of ``X``; ``label`` may be a Series, frame column or array."""
+    import lightgbm as lgb
+
+    values, names = float32_values(X)
+    if label is not None:
+        label = np.asarray(label, dtype='float32').ravel()
+    kwargs.setdefault('free_raw_data', True)
+    return lgb.Dataset(values, label=label, reference=reference, feature_name=names, **kwargs)
@@ -0,0 +1,238 @@
+"""
+Versioned model registry with feature-schema fingerprints.
+
+The models are loose pickles (``lgbm_model_eth_10m.pkl`` per folder,
+``lgbm_btc_15m*.pkl`` ...) and nothing records which feature list, label or
+data range produced them, so a model scored with the wrong columns silently
+gives garbage. The registry stores every trained model as a numbered version
+with a manifest:
+
+    model_registry/<name>/v<N>/
+        flat/            FlatModel arrays (common/flat_trees.py), memory-mapped on load
+        model.txt        LightGBM text model, for a full Booster when one is needed
+        manifest.json    feature names + schema hash, label, training window, metrics, params
+
+    reg = ModelRegistry()
+    version = reg.register('0208_Gen7_1195pct', model, label=LABEL_EXPR,
+                           train_window=('2025-01-05', '2025-09-30'), metrics={'valid_mse': 1.2e-5})
+    model = reg.load('0208_Gen7_1195pct', feature_names=feature_names('gen7'))   # latest version
+    model.predict(latest_features)
+
+``register`` scores a few probe rows (split thresholds, values just past
+them, zeros, NaNs) with both the flat copy and the booster and refuses the
+model unless they agree. ``load`` reads only the manifest and refuses a model whose schema (the
+ordered feature names) differs from ``feature_names``; the arrays are
+opened, memory-mapped, on the first ``predict``. ``predict`` on a DataFrame
+checks its columns against the schema as well.
+
+    python -m common.model_registry list [name]
+    python -m common.model_registry import 0208_Gen7_1195pct 0208_Gen7_1195pct/lgbm_model_eth_10m.pkl --label "..."
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from common.feature_cache import digest
+from common.flat_trees import FlatModel
+
+REGISTRY_ROOT = Path(__file__).resolve().parent.parent / 'model_registry'
+
+
+class SchemaMismatch(ValueError):
+    """A model was asked to score features other than the ones it was trained on."""
+
+
+def schema_hash(feature_names):
+    """Fingerprint of the ordered feature names a model takes."""
+    return digest([str(c) for c in feature_names])
+
+
+def check_schema(expected, actual, what='model'):
+    """Raise ``SchemaMismatch`` unless ``actual`` are the feature names ``expected``, in order."""
+    expected, actual = [str(c) for c in expected], [str(c) for c in actual]
+    if expected == actual:
+        return
+    missing = [c for c in expected if c not in actual]
+    extra = [c for c in actual if c not in expected]
+    detail = f"missing {missing[:5]}, unexpected {extra[:5]}" if missing or extra else "same names, different order"
+    raise SchemaMismatch(f"{what}: feature schema {schema_hash(actual)} != {schema_hash(expected)} ({detail})")
+
+
+def check_flat(flat, booster, rows=64, seed=0):
+    """Raise ``ValueError`` unless ``flat`` scores probe rows exactly as ``booster.predict`` does."""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((rows, flat.num_features))
+    for j in range(flat.num_features):
+        cuts = np.asarray(flat.threshold)[np.asarray(flat.feature) == j]
+        # Each split's threshold (goes left), the next float up (goes right), zeros and NaNs
+        pool = np.concatenate([cuts, np.nextafter(cuts, np.inf), [0.0, np.nan]])
+        X[:, j] = rng.choice(pool, size=rows)
+    raw, expected = flat.predict(X, raw_score=True), booster.predict(X, raw_score=True)
+    if not np.array_equal(raw, expected):
+        raise ValueError(f"Flat model disagrees with the booster on {int((raw != expected).sum())}/{rows} probe rows "
+                         f"(max |diff| {np.abs(raw - expected).max():.3g})")
+    if not np.allclose(flat.predict(X), booster.predict(X), rtol=1e-12, atol=0.0):
+        raise ValueError("Flat model's output transform disagrees with the booster's")
+
+
+class RegisteredModel:
+    """One registry version: the manifest now, the memory-mapped trees on first use."""
+
+    def __init__(self, path, manifest):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.name, self.version = manifest['name'], manifest['version']
+        self.feature_names = manifest['feature_names']
+        self._flat = None
+
+    @property
+    def flat(self):
+        if self._flat is None:
+            self._flat = FlatModel.open(self.path / 'flat')
+        return self._flat
+
+    def num_trees(self):
+        return self.manifest['num_trees']
+
+    def predict(self, X, raw_score=False):
+        """``FlatModel.predict``; a DataFrame's columns must match the schema."""
+        if isinstance(X, pd.DataFrame):
+            check_schema(self.feature_names, X.columns, f"{self.name} {self.version}")
+        return self.flat.predict(X, raw_score=raw_score)
+
+    def booster(self):
+        """The full ``lgb.Booster`` (parsed from model.txt), e.g. to continue training."""
+        import lightgbm as lgb
+
+        return lgb.Booster(model_file=str(self.path / 'model.txt'))
+
+    def __repr__(self):
+        return f"RegisteredModel({self.name} {self.version}, schema {self.manifest['schema']})"
+
+
+class ModelRegistry:
+    """Numbered, immutable model versions under ``root/<name>/v<N>``."""
+
+    def __init__(self, root=REGISTRY_ROOT):
+        self.root = Path(root).expanduser()
+
+    def names(self):
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+
+    def versions(self, name):
+        """Versions of ``name``, oldest first."""
+        base = self.root / name
+        found = [p.name for p in base.iterdir() if p.name.startswith('v') and p.name[1:].isdigit()] if base.exists() else []
+        return sorted(found, key=lambda v: int(v[1:]))
+
+    def manifest(self, name, version=None):
+        version = version or self._latest(name)
+        return json.loads((self.root / name / version / 'manifest.json').read_text())
+
+    def _latest(self, name):
+        versions = self.versions(name)
+        if not versions:
+            raise FileNotFoundError(f"No model '{name}' in {self.root}")
+        return versions[-1]
+
+    def register(self, name, model, feature_names=None, label=None, train_window=None, metrics=None,
+                 params=None, **info):
+        """Store ``model`` (a Booster or LightGBM sklearn model) as the next version of ``name``; returns it."""
+        booster = getattr(model, 'booster_', model)
+        names = list(feature_names) if feature_names is not None else booster.feature_name()
+        check_schema(names, booster.feature_name(), f"{name}: feature_names vs the booster's")
+        flat = FlatModel.from_booster(booster)
+        check_flat(flat, booster)
+        manifest = {
+            'name': name,
+            'created_at': str(pd.Timestamp.now()),
+            'feature_names': names,
+            'schema': schema_hash(names),
+            'label': label,
+            'train_window': [str(t) if t is not None else None for t in train_window] if train_window else None,
+            'metrics': metrics or {},
+            'params': params if params is not None else booster.params,
+            'objective': flat.meta['objective'],
+            'num_trees': flat.num_trees(),
+            'best_iteration': booster.best_iteration,
+            **info,
+        }
+        base = self.root / name
+        base.mkdir(parents=True, exist_ok=True)
+        tmp = base / f".new.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+        flat.save(tmp / 'flat')
+        booster.save_model(str(tmp / 'model.txt'), num_iteration=booster.best_iteration or -1)
+        while True:
+            versions = self.versions(name)
+            version = f"v{int(versions[-1][1:]) + 1 if versions else 1}"
+            manifest['version'] = version
+            (tmp / 'manifest.json').write_text(json.dumps(manifest, indent=2, default=str))
+            try:
+                os.rename(tmp, base / version)  # fails if another process took this number
+                break
+            except OSError:
+                if not (base / version).exists():
+                    raise
+        print(f"Registered {name} {version} ({flat.num_trees()} trees, schema {manifest['schema']})")
+        return version
+
+    def load(self, name, version=None, feature_names=None):
+        """``name`` at ``version`` (default: latest), refused if its schema is not ``feature_names``."""
+        version = version or self._latest(name)
+        path = self.root / name / version
+        manifest = json.loads((path / 'manifest.json').read_text())
+        if feature_names is not None:
+            check_schema(feature_names, manifest['feature_names'], f"{name} {version}")
+        return RegisteredModel(path, manifest)
+
+
+def _load_pickle(path):
+    try:
+        import joblib  # the BTC scripts save with joblib.dump
+        return joblib.load(path)
+    except ImportError:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Versioned model registry")
+    parser.add_argument('--root', default=str(REGISTRY_ROOT))
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    ls = sub.add_parser('list', help="models and versions")
+    ls.add_argument('name', nargs='?')
+    imp = sub.add_parser('import', help="register an existing pickled model")
+    imp.add_argument('name')
+    imp.add_argument('pickle')
+    imp.add_argument('--label')
+    imp.add_argument('--train-start')
+    imp.add_argument('--train-end')
+    args = parser.parse_args()
+
+    reg = ModelRegistry(args.root)
+    if args.cmd == 'import':
+        window = (args.train_start, args.train_end) if args.train_start or args.train_end else None
+        reg.register(args.name, _load_pickle(args.pickle), label=args.label, train_window=window,
+                     source=str(Path(args.pickle).resolve()))
+        return
+    rows = []
+    for name in [args.name] if args.name else reg.names():
+        for version in reg.versions(name):
+            m = reg.manifest(name, version)
+            rows.append({'name': name, 'version': version, 'created_at': m['created_at'][:19], 'schema': m['schema'],
+                         'features': len(m['feature_names']), 'trees': m['num_trees'],
+                         'train_window': m['train_window'], 'metrics': m['metrics']})
+    print(pd.DataFrame(rows).to_string(index=False) if rows else f"No models in {reg.root}")
+
+
+if __name__ == "__main__":
+    main()
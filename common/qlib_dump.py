@@ -0,0 +1,300 @@
+"""
+Qlib binary data directory writer.
+
+``dump_qlib`` builds a whole provider directory in one pass: every source
+frame (1m bars, or bars already at the target size) is resampled to each
+requested frequency, each frequency gets one calendar shared by all
+instruments, and every ``features/<inst>/<field>.<freq>.bin`` is written on a
+thread pool in Qlib's own format: a little-endian float32 start index into
+the calendar, followed by the values.
+
+``append_qlib`` extends an existing directory with only the bars after the
+last calendar entry (plus ``overlap`` trailing bars, which are rewritten in
+case they were still forming at the previous dump) and bumps the instrument
+end date, so a refresh costs O(new bars) instead of a full rewrite.
+
+Crash safety: ``dump_qlib`` builds into a sibling directory and swaps it in.
+Before ``append_qlib`` touches anything, the original size and the bytes
+about to be overwritten of every file are saved to ``.append_journal.json``;
+the journal is removed only after all files are updated and synced, and a
+run that dies in between is rolled back by the next one.
+
+    python -m common.qlib_dump ~/.qlib/qlib_data/crypto_multi ETHUSDT,BTCUSDT 5min,10min,15min,60min
+"""
+
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CALENDAR_FMT = '%Y-%m-%d %H:%M:%S'
+JOURNAL = '.append_journal.json'
+
+# Fields required by Alpha158
+DUMP_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'amount', 'vwap', 'factor']
+OHLCV_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+             'volume': 'sum', 'amount': 'sum'}
+
+
+def prepare_bars(df, freq=None):
+    """Bars with the Qlib field names; resampled to ``freq`` unless it is None.
+
+    ``quote_volume`` becomes ``amount``; ``vwap`` (amount / volume, falling back
+    to close) and ``factor`` are added when missing. Columns other than OHLCV
+    only survive when no resampling is done (e.g. labels at the source freq).
+    """
+    df = df.rename(columns={'quote_volume': 'amount'})
+    if freq is not None:
+        df = df.resample(freq).agg({c: a for c, a in OHLCV_AGG.items() if c in df.columns}).dropna()
+    else:
+        df = df.copy()
+    if 'vwap' not in df.columns and 'amount' in df.columns:
+        # Avoid division by zero
+        df['vwap'] = (df['amount'] / df['volume'].replace(0, np.nan)).fillna(df['close'])
+    if 'factor' not in df.columns:
+        df['factor'] = 1.0
+    return df
+
+
+def _bar_size(index):
+    return pd.Series(index).diff().median()
+
+
+def _write_bin(task):
+    path, start, values = task
+    np.hstack([[start], values]).astype('<f4').tofile(path)
+
+
+def dump_qlib(qlib_dir, frames, freqs=('10min',), fields=DUMP_FIELDS, freq_names=None, workers=8):
+    """Write a fresh Qlib directory from ``{instrument: bars DataFrame}``.
+
+    Each frame (DatetimeIndex) is resampled once per entry of ``freqs``, or
+    used as-is when it already has that bar size. ``freq_names`` maps a freq
+    to the name used on disk, e.g. ``{'10min': 'day'}`` for the 10m store the
+    ETH strategies read with ``freq='day'``. Feature directories are
+    lower-cased (as Qlib looks them up); ``instruments/all.txt`` keeps the
+    given names with each instrument's first and last bar.
+    """
+    freq_names = freq_names or {}
+    qlib_dir = Path(qlib_dir).expanduser()
+    tmp = qlib_dir.with_name(qlib_dir.name + '.tmp')
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    for sub in ['calendars', 'features', 'instruments']:
+        (tmp / sub).mkdir(parents=True)
+
+    tasks = []
+    spans = {}
+    for freq in freqs:
+        name = freq_names.get(freq, freq)
+        bars = {}
+        for inst, df in frames.items():
+            same = _bar_size(df.index) == pd.Timedelta(freq)
+            b = prepare_bars(df, None if same else freq)
+            if len(b):
+                bars[inst] = b
+
+        calendar = pd.DatetimeIndex(sorted(set().union(*(b.index for b in bars.values()))))
+        with open(tmp / 'calendars' / f"{name}.txt", 'w') as f:
+            f.writelines(f"{d}\n" for d in calendar.strftime(CALENDAR_FMT))
+
+        for inst, b in bars.items():
+            start = calendar.get_loc(b.index[0])
+            end = calendar.get_loc(b.index[-1])
+            aligned = b.reindex(calendar[start:end + 1])
+            feat_dir = tmp / 'features' / inst.lower()
+            feat_dir.mkdir(exist_ok=True)
+            for field in fields:
+                if field in aligned.columns:
+                    tasks.append((feat_dir / f"{field.lower()}.{name}.bin", start,
+                                  aligned[field].to_numpy(dtype='float32')))
+            first, last = spans.get(inst, (b.index[0], b.index[-1]))
+            spans[inst] = (min(first, b.index[0]), max(last, b.index[-1]))
+        print(f"{name}: {len(calendar)} calendar steps, {len(bars)} instrument(s)")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(_write_bin, tasks))
+
+    with open(tmp / 'instruments' / 'all.txt', 'w') as f:
+        for inst, (first, last) in spans.items():
+            f.write(f"{inst}\t{first.strftime(CALENDAR_FMT)}\t{last.strftime(CALENDAR_FMT)}\n")
+
+    # Swap the finished directory in
+    old = qlib_dir.with_name(qlib_dir.name + '.old')
+    if qlib_dir.exists():
+        qlib_dir.rename(old)
+    tmp.rename(qlib_dir)
+    if old.exists():
+        shutil.rmtree(old)
+    print(f"Wrote {len(tasks)} feature bins to {qlib_dir}")
+
+
+def _tail_lines(path, n, block=4096):
+    """Last ``n`` lines of a text file as ``[(byte_offset, line)]``, reading from the end."""
+    with open(path, 'rb') as f:
+        size = pos = f.seek(0, os.SEEK_END)
+        data = b''
+        # n + 1 newlines guarantee n complete lines
+        while pos > 0 and data.count(b'\n') <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.splitlines(keepends=True)
+    if pos > 0:
+        lines = lines[1:]  # May start mid-line
+    lines = lines[-n:]
+    offset = size - sum(len(line) for line in lines)
+    out = []
+    for line in lines:
+        out.append((offset, line.decode().strip()))
+        offset += len(line)
+    return out
+
+
+def recover(qlib_dir):
+    """Roll back an interrupted ``append_qlib`` run, if any. Returns True when it did."""
+    journal = os.path.join(qlib_dir, JOURNAL)
+    if not os.path.exists(journal):
+        return False
+    with open(journal) as f:
+        entries = json.load(f)
+    for entry in entries:
+        with open(entry['path'], 'r+b') as f:
+            f.truncate(entry['size'])
+            f.seek(entry['offset'])
+            f.write(bytes.fromhex(entry['tail']))
+            f.flush()
+            os.fsync(f.fileno())
+    os.remove(journal)
+    print(f"Rolled back an interrupted append in {qlib_dir}")
+    return True
+
+
+def _write_journal(qlib_dir, edits):
+    """``edits``: [(path, offset)] -> journal of original size and bytes from offset on."""
+    entries = []
+    for path, offset in edits:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        entries.append({'path': str(path), 'size': offset + len(tail), 'offset': offset,
+                        'tail': tail.hex()})
+    journal = os.path.join(qlib_dir, JOURNAL)
+    tmp = journal + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(entries, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, journal)
+
+
+def _overwrite(path, offset, payload):
+    with open(path, 'r+b') as f:
+        f.seek(offset)
+        f.write(payload)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_qlib(qlib_dir, symbol, df, fields, freq='day', overlap=1):
+    """Append the rows of ``df`` (DatetimeIndex) newer than the stored ``freq`` calendar.
+
+    The instrument must end on the last calendar entry (always true for a
+    single-instrument directory). Returns the number of bars written (0 when
+    already up to date), or ``None`` when the directory cannot be appended to
+    (missing, written without start-index headers, or files out of step with
+    each other) and needs a full dump instead.
+    """
+    qlib_dir = os.path.expanduser(str(qlib_dir))
+    calendar = os.path.join(qlib_dir, 'calendars', f"{freq}.txt")
+    instruments = os.path.join(qlib_dir, 'instruments', 'all.txt')
+    feat_dir = os.path.join(qlib_dir, 'features', symbol.lower())
+    bins = {col: os.path.join(feat_dir, f"{col.lower()}.{freq}.bin") for col in fields}
+    if not all(os.path.exists(p) for p in [calendar, instruments, *bins.values()]):
+        return None
+
+    recover(qlib_dir)
+
+    n_bars = {os.path.getsize(p) // 4 - 1 for p in bins.values()}
+    tail = _tail_lines(calendar, overlap)
+    if len(n_bars) != 1 or not tail or min(n_bars) < len(tail):
+        print("Qlib fields out of step with each other, full dump needed")
+        return None
+    n_bars = n_bars.pop()
+    overlap = len(tail)
+
+    starts = {float(np.fromfile(p, dtype='<f4', count=1)[0]) for p in bins.values()}
+    if len(starts) != 1 or not starts.pop().is_integer():
+        print("Qlib bins have no start-index header, full dump needed")
+        return None
+
+    with open(instruments) as f:
+        lines = f.read().splitlines()
+    ends = [line.split('\t')[-1] for line in lines if line.split('\t')[0].upper() == symbol.upper()]
+    if ends != [tail[-1][1]]:
+        print(f"{symbol} does not end on the last calendar entry, full dump needed")
+        return None
+
+    first_dt = pd.Timestamp(tail[0][1])
+    if first_dt not in df.index:
+        print(f"Source no longer contains {first_dt}, full dump needed")
+        return None
+    new = df[df.index >= first_dt]
+    bin_offset = 4 + (n_bars - overlap) * 4
+    if len(new) == overlap and pd.Timestamp(tail[-1][1]) == new.index[-1]:
+        stored = {}
+        for col in fields:
+            with open(bins[col], 'rb') as f:
+                f.seek(bin_offset)
+                stored[col] = f.read()
+        if all(stored[col] == new[col].values.astype('<f4').tobytes() for col in fields):
+            print("Qlib data already up to date.")
+            return 0
+
+    # Instrument line with the new end date
+    end_dt = new.index[-1].strftime(CALENDAR_FMT)
+    out = []
+    for line in lines:
+        parts = line.split('\t')
+        if parts[0].upper() == symbol.upper():
+            parts[-1] = end_dt
+        out.append('\t'.join(parts))
+
+    cal_offset = tail[0][0]
+    _write_journal(qlib_dir, [(p, bin_offset) for p in bins.values()]
+                   + [(calendar, cal_offset), (instruments, 0)])
+
+    for col in fields:
+        _overwrite(bins[col], bin_offset, new[col].values.astype('<f4').tobytes())
+    _overwrite(calendar, cal_offset,
+               ''.join(f"{d.strftime(CALENDAR_FMT)}\n" for d in new.index).encode())
+    _overwrite(instruments, 0, ('\n'.join(out) + '\n').encode())
+
+    os.remove(os.path.join(qlib_dir, JOURNAL))
+    print(f"Appended {len(new) - overlap} new bars (rewrote last {overlap}) up to {end_dt}")
+    return len(new) - overlap
+
+
+if __name__ == "__main__":
+    # Build a multi-frequency store from the shared 1m kline store
+    from common.downloader import load_klines
+
+    qlib_dir = sys.argv[1] if len(sys.argv) > 1 else "~/.qlib/qlib_data/crypto_multi"
+    symbols = sys.argv[2].split(',') if len(sys.argv) > 2 else ["ETHUSDT", "BTCUSDT"]
+    freqs = sys.argv[3].split(',') if len(sys.argv) > 3 else ["5min", "10min", "15min", "60min"]
+
+    frames = {}
+    for symbol in symbols:
+        df = load_klines(symbol, "1m")
+        if df.empty:
+            print(f"No 1m bars stored for {symbol}, run common.downloader first")
+            continue
+        frames[symbol] = df.set_index('datetime')
+    dump_qlib(qlib_dir, frames, freqs)
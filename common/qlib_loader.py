@@ -0,0 +1,111 @@
+"""
+Qlib data loader that evaluates the feature expressions as one DAG.
+
+Drop-in for ``QlibDataLoader`` in a ``DataHandlerLP`` config:
+
+    "data_loader": {
+        "class": "DagDataLoader",
+        "module_path": "common.qlib_loader",
+        "kwargs": {"config": {"feature": (fields, names), "label": (label_fields, label_names)},
+                   "cache_dir": "~/.qlib/feature_cache"},
+    }
+
+Only the raw ``$field`` series are read through Qlib (once per load, whole
+history, so rolling windows and negative ``Ref`` labels see the bars outside
+the requested range like Qlib's own extended windows). Every group's
+expressions are then computed per instrument by ``FeatureDAG`` with Qlib's
+rolling semantics (``min_periods=1``), each shared sub-expression once.
+
+With ``cache_dir`` the computed columns are kept as float32 arrays in a
+``FeatureCache`` keyed by the provider data fingerprint (size and mtime of
+the calendar and of the instruments' ``.bin`` files), the instruments
+and the time range. A later load of the same range, e.g. the backtest after
+training, only computes the expressions not on disk yet, usually none.
+Cached loads return float32 columns (the first, computing load too, so
+every run sees the same values). ``float32=True`` gives float32 columns
+without a cache as well; each instrument is computed in float64 and cast
+before the panel is assembled, so no float64 copy of the panel exists.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from qlib.config import C
+from qlib.data import D
+from qlib.data.dataset.loader import DLWParser
+
+from common.feature_cache import FeatureCache, digest
+from common.feature_dag import FeatureDAG
+
+
+def data_fingerprint(instruments, freq):
+    """Hash of the stat of the calendar and every instrument's bins; changes whenever bars are dumped or appended."""
+    root = Path(C.dpm.get_data_uri(freq))
+    paths = [root / 'calendars' / f"{freq}.txt"]
+    for inst in sorted(instruments):
+        paths += sorted((root / 'features' / inst.lower()).glob(f"*.{freq}.bin"))
+    stats = []
+    for p in paths:
+        st = p.stat() if p.exists() else None
+        stats.append((str(p), st and st.st_size, st and st.st_mtime_ns))
+    return digest(stats)
+
+
+class DagDataLoader(DLWParser):
+    def __init__(self, config, filter_pipe=None, freq='day', cache_dir=None, float32=False):
+        self.filter_pipe = filter_pipe
+        self.freq = freq
+        self.cache = FeatureCache(cache_dir) if cache_dir else None
+        self.dtype = 'float32' if float32 or self.cache else 'float64'
+        super().__init__(config)
+
+    def _compute(self, instruments, names, exprs, start_time, end_time, gp_name):
+        dag = FeatureDAG(dict(zip(names, exprs)), min_periods=1)
+        print(f"[{gp_name}] {dag.report()}")
+
+        raw = D.features(instruments, [f"${f}" for f in dag.fields], freq=self.freq)
+        raw.columns = dag.fields
+        parts = []
+        for inst, bars in raw.groupby(level='instrument', group_keys=False):
+            out = dag.evaluate(bars.droplevel('instrument'))
+            out = out.loc[pd.Timestamp(start_time) if start_time else None:
+                          pd.Timestamp(end_time) if end_time else None].astype(self.dtype, copy=False)
+            out['instrument'] = inst
+            parts.append(out.set_index('instrument', append=True))
+        df = pd.concat(parts)
+        df.index.names = ['datetime', 'instrument']
+        return df.sort_index()
+
+    def load_group_df(self, instruments, exprs, names, start_time=None, end_time=None, gp_name=None):
+        if isinstance(instruments, str):
+            instruments = D.instruments(instruments, filter_pipe=self.filter_pipe)
+        if self.cache is None:
+            return self._compute(instruments, names, exprs, start_time, end_time, gp_name)
+
+        # Columns are addressed by the canonical expression, so formatting differences still hit
+        dag = FeatureDAG(dict(zip(names, exprs)))
+        keys = [repr(e) for e in dag.outputs]
+        insts = D.list_instruments(instruments, start_time, end_time, freq=self.freq, as_list=True) \
+            if isinstance(instruments, dict) else list(instruments)
+        frame = self.cache.frame(data_fingerprint(insts, self.freq), insts, start_time, end_time, self.freq)
+
+        index = frame.index()
+        cached = frame.load(keys) if index is not None else {}
+        todo = [i for i, k in enumerate(keys) if k not in cached]
+        if todo:
+            computed = self._compute(instruments, [names[i] for i in todo], [exprs[i] for i in todo],
+                                     start_time, end_time, gp_name)
+            if index is not None and not computed.index.equals(index):
+                # Rows changed under an unchanged fingerprint: start the frame over rather than mix them
+                frame.clear()
+                return self.load_group_df(instruments, exprs, names, start_time, end_time, gp_name)
+            index = computed.index
+            new = {keys[i]: computed[names[i]].to_numpy() for i in todo}
+            frame.save(index, new)
+            cached.update(new)
+            print(f"[{gp_name}] cached {len(todo)} columns in {frame.path}")
+        else:
+            print(f"[{gp_name}] {len(keys)} columns from {frame.path}")
+        values = np.column_stack([cached[k] for k in keys]) if keys else np.empty((len(index), 0), 'float32')
+        return pd.DataFrame(values, index=index, columns=names)
@@ -0,0 +1,124 @@
+"""
+Weight-aware rate limiting for Binance REST calls.
+
+Binance USD-M futures allow 2400 request weight per minute per IP. Every
+caller in this repo shares one IP, so concurrent jobs draw from one budget
+instead of each sleeping a fixed amount between pages.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Binance USD-M futures: 2400 weight / minute / IP
+FAPI_WEIGHT_PER_MINUTE = 2400
+
+
+def kline_weight(limit):
+    """Request weight of a /fapi/v1/klines call for a given page size."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightRateLimiter:
+    """Thread-safe sliding-window budget of request weight.
+
+    ``acquire`` blocks until ``weight`` fits in the last ``window`` seconds.
+    ``update_from_headers`` folds in the server-side ``X-MBX-USED-WEIGHT-1M``
+    counter, which also covers weight spent by other processes on this IP.
+    ``header=None`` is for budgets that counter does not measure (e.g. the
+    /futures/data request limit): the limiter then counts its own calls only.
+    """
+
+    def __init__(self, max_weight=FAPI_WEIGHT_PER_MINUTE, window=60.0, safety=0.8,
+                 header='X-MBX-USED-WEIGHT-1M'):
+        self.capacity = max(1, int(max_weight * safety))
+        self.window = window
+        self.header = header
+        self._events = deque()  # (monotonic_ts, weight)
+        self._used = 0
+        self._server_used = 0
+        self._server_minute = None
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] >= self.window:
+            _, w = self._events.popleft()
+            self._used -= w
+
+    def _server_usage(self):
+        # The server counter is a fixed window that resets each wall-clock minute
+        if self._server_minute == int(time.time() // 60):
+            return self._server_used
+        return 0
+
+    def try_acquire(self, weight=1):
+        """Take ``weight`` if it fits now; otherwise return seconds to wait."""
+        with self._cond:
+            now = time.monotonic()
+            self._expire(now)
+            if now < self._blocked_until:
+                return self._blocked_until - now
+
+            used = max(self._used, self._server_usage())
+            if used + weight <= self.capacity:
+                self._events.append((now, weight))
+                self._used += weight
+                return 0.0
+
+            if self._server_usage() >= self.capacity - weight:
+                wait = 60.0 - time.time() % 60.0
+            elif self._events:
+                wait = self._events[0][0] + self.window - now
+            else:
+                wait = 0.05
+            return max(wait, 0.01)
+
+    def acquire(self, weight=1):
+        while True:
+            wait = self.try_acquire(weight)
+            if not wait:
+                return
+            with self._cond:
+                self._cond.wait(timeout=wait)
+
+    def update_from_headers(self, headers):
+        if self.header is None:
+            return
+        used = headers.get(self.header) or headers.get(self.header.lower())
+        if used is None:
+            return
+        try:
+            used = int(used)
+        except (TypeError, ValueError):
+            return
+        with self._cond:
+            minute = int(time.time() // 60)
+            if self._server_minute != minute:
+                self._server_minute = minute
+                self._server_used = used
+            else:
+                self._server_used = max(self._server_used, used)
+            self._cond.notify_all()
+
+    def penalize(self, seconds):
+        """Block all callers for ``seconds`` (HTTP 429/418 ``Retry-After``)."""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    @property
+    def used_weight(self):
+        with self._cond:
+            self._expire(time.monotonic())
+            return max(self._used, self._server_usage())
+
+
+# One budget per process; every Binance caller should share it
+DEFAULT_LIMITER = WeightRateLimiter()
@@ -0,0 +1,176 @@
+"""
+Incremental 1m -> N-minute OHLCV resampler.
+
+Folds each new 1m bar into the open bucket of every target frequency and
+emits buckets as they complete, so the live path never re-runs
+``df.resample(...).agg(...)`` over its whole window. Results are identical
+to the pandas path used by download_binance_swap / prepare_eth_data:
+
+    df.resample(freq).agg({'open': 'first', 'high': 'max', 'low': 'min',
+                           'close': 'last', 'volume': 'sum', ...}).dropna()
+
+including pandas' Kahan-compensated summation for the ``sum`` columns.
+
+Check against pandas on a stored 1m CSV:
+
+    python -m common.resample ETHUSDT_Swap_1m_1y.csv
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+OHLC_FIELDS = ['open', 'high', 'low', 'close']
+SUM_FIELDS = ['volume', 'quote_volume']
+
+
+def freq_to_ms(freq):
+    return int(pd.Timedelta(freq).total_seconds() * 1000)
+
+
+class OHLCVAggregator:
+    """One open bucket of a single frequency."""
+
+    def __init__(self, freq, step_ms=60_000, sum_fields=SUM_FIELDS):
+        self.freq = freq
+        self.bar_ms = freq_to_ms(freq)
+        self.step_ms = step_ms
+        self.sum_fields = list(sum_fields)
+        self.bucket = None
+        self._last_time = None
+        self._reset()
+
+    def _reset(self):
+        self.open = self.high = self.low = self.close = np.nan
+        n = len(self.sum_fields)
+        self._sums = [0.0] * n
+        self._comp = [0.0] * n  # Kahan compensation, as in pandas group_sum
+        self.count = 0
+
+    def _bar(self):
+        row = {'datetime': pd.Timestamp(self.bucket, unit='ms'),
+               'open': self.open, 'high': self.high, 'low': self.low, 'close': self.close}
+        for name, total in zip(self.sum_fields, self._sums):
+            row[name] = total
+        return row
+
+    def update(self, open_time, o, h, l, c, sums):
+        """Fold one bar in. Returns the list of buckets it completed (0, 1 or 2)."""
+        if self._last_time is not None and open_time <= self._last_time:
+            return []  # Duplicate / out-of-order bar
+        self._last_time = open_time
+
+        done = []
+        bucket = open_time - open_time % self.bar_ms
+        if self.bucket is not None and bucket != self.bucket and self.count:
+            done.append(self._bar())  # Last minute of the previous bucket never came
+            self._reset()
+        self.bucket = bucket
+
+        if self.count == 0:
+            self.open, self.high, self.low = o, h, l
+        else:
+            # max/min skip NaN like pandas
+            if h > self.high or self.high != self.high:
+                self.high = h
+            if l < self.low or self.low != self.low:
+                self.low = l
+        self.close = c
+        for i, val in enumerate(sums):
+            y = val - self._comp[i]
+            t = self._sums[i] + y
+            comp = t - self._sums[i] - y
+            self._comp[i] = 0.0 if comp != comp else comp
+            self._sums[i] = t
+        self.count += 1
+
+        if open_time + self.step_ms == bucket + self.bar_ms:
+            done.append(self._bar())  # Bucket closed on its final minute
+            self._reset()
+            self.bucket = None
+        return done
+
+    def flush(self):
+        """Emit the open (incomplete) bucket, if any."""
+        if self.count == 0:
+            return []
+        bar = self._bar()
+        self._reset()
+        self.bucket = None
+        return [bar]
+
+
+class IncrementalResampler:
+    """Drive several bar sizes (e.g. 5m/10m/15m/1h) from one 1m feed.
+
+    ``update`` returns ``{freq: [completed bar dicts]}`` for the freqs that
+    closed a bucket on this bar. With ``drop_partial_first`` (the default) a
+    bucket that started before the first bar seen is discarded rather than
+    emitted short.
+    """
+
+    def __init__(self, freqs=('10min',), step_ms=60_000, sum_fields=SUM_FIELDS,
+                 drop_partial_first=True):
+        if isinstance(freqs, str):
+            freqs = [freqs]
+        self.aggregators = {f: OHLCVAggregator(f, step_ms, sum_fields) for f in freqs}
+        self.sum_fields = list(sum_fields)
+        self.drop_partial_first = drop_partial_first
+        self._partial = {}  # freq -> bucket to discard
+
+    def update(self, open_time, o, h, l, c, *sums):
+        out = {}
+        for freq, agg in self.aggregators.items():
+            if self.drop_partial_first and agg._last_time is None and open_time % agg.bar_ms:
+                self._partial[freq] = open_time - open_time % agg.bar_ms
+            bars = agg.update(open_time, o, h, l, c, sums)
+            skip = self._partial.get(freq)
+            if skip is not None:
+                bars = [b for b in bars if b['datetime'].value // 10**6 != skip]
+            if bars:
+                out[freq] = bars
+        return out
+
+    def flush(self):
+        return {f: agg.flush() for f, agg in self.aggregators.items() if agg.count}
+
+
+def bars_to_frame(bars, sum_fields=SUM_FIELDS):
+    cols = OHLC_FIELDS + list(sum_fields)
+    if not bars:
+        return pd.DataFrame(columns=cols, index=pd.DatetimeIndex([], name='datetime'))
+    df = pd.DataFrame(bars).set_index('datetime')
+    return df[cols]
+
+
+def resample_frame(df, freq, sum_fields=SUM_FIELDS, include_partial_last=True):
+    """Incremental equivalent of the pandas resample/agg/dropna path on a 1m frame."""
+    sum_fields = [c for c in sum_fields if c in df.columns]
+    agg = OHLCVAggregator(freq, sum_fields=sum_fields)
+    times = (df.index.values.astype('datetime64[ms]').astype('int64'))
+    cols = [df[c].to_numpy(dtype='float64') for c in OHLC_FIELDS + sum_fields]
+    bars = []
+    for i, t in enumerate(times):
+        bars += agg.update(int(t), cols[0][i], cols[1][i], cols[2][i], cols[3][i],
+                           [col[i] for col in cols[4:]])
+    if include_partial_last:
+        bars += agg.flush()
+    return bars_to_frame(bars, sum_fields)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "ETHUSDT_Swap_1m_1y.csv"
+    df = pd.read_csv(path)
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    df = df.set_index('datetime').sort_index()
+    sum_fields = [c for c in SUM_FIELDS if c in df.columns]
+
+    for freq in ['5min', '10min', '15min', '1h']:
+        expected = df.resample(freq).agg(
+            {**{'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'},
+             **{c: 'sum' for c in sum_fields}}).dropna()
+        got = resample_frame(df, freq, sum_fields)
+        same = (expected.index.equals(got.index)
+                and all(np.array_equal(expected[c].to_numpy(), got[c].to_numpy()) for c in expected.columns))
+        print(f"{freq}: {len(got)} bars, bit-identical: {same}")
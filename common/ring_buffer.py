@@ -0,0 +1,156 @@
+"""
+Fixed-size OHLCV ring buffer in a memory-mapped file.
+
+One writer (the live process that owns the feed) appends closed bars; any
+number of readers attach read-only to the same file and take consistent
+snapshots without copying through a socket or re-downloading. Because the
+bars live in a file, a restarted process resumes from where it stopped and
+only has to fetch the bars it missed.
+
+File layout: a 64-byte header (``HEADER_DTYPE``) followed by ``capacity``
+``BAR_DTYPE`` records. ``count`` is the total number of bars ever written;
+the newest bar sits at ``(count - 1) % capacity``. The writer bumps ``seq``
+to odd before touching a slot and back to even after, so readers can detect
+and retry a torn read (seqlock).
+
+    ring = BarRingBuffer("bar_cache/ETHUSDT_1m.ring", capacity=2000)
+    ring.append(open_time, o, h, l, c, v, qv)
+    df = BarRingBuffer("bar_cache/ETHUSDT_1m.ring", readonly=True).frame()
+"""
+
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b'OHLCVRB1'
+HEADER_SIZE = 64
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('capacity', '<i8'),
+    ('step_ms', '<i8'),
+    ('count', '<i8'),
+    ('seq', '<i8'),
+    ('reserved', 'S24'),
+])
+
+BAR_FIELDS = ['open', 'high', 'low', 'close', 'volume', 'quote_volume']
+BAR_DTYPE = np.dtype([('open_time', '<i8')] + [(f, '<f8') for f in BAR_FIELDS])
+
+
+class BarRingBuffer:
+    def __init__(self, path, capacity=2000, step_ms=60_000, readonly=False):
+        self.path = Path(path)
+        self.readonly = readonly
+        if readonly:
+            self._open('r')
+            return
+
+        if self.path.exists():
+            self._open('r+')
+            if self.capacity != capacity or self.step_ms != step_ms:
+                self._resize(capacity, step_ms)
+            elif self._header['seq'][0] % 2:
+                # Writer died mid-append: the slot past ``count`` is garbage, count is not
+                self._header['seq'] += 1
+        else:
+            self._create(capacity, step_ms)
+
+    # ── file management ─────────────────────────────────────────────────────
+    def _create(self, capacity, step_ms, bars=None):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = MAGIC
+        header['capacity'] = capacity
+        header['step_ms'] = step_ms
+        data = np.zeros(capacity, dtype=BAR_DTYPE)
+        if bars is not None and len(bars):
+            bars = bars[-capacity:]
+            data[:len(bars)] = bars
+            header['count'] = len(bars)
+
+        # Build the whole file aside, then swap it in atomically
+        tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp, 'wb') as f:
+            f.write(header.tobytes().ljust(HEADER_SIZE, b'\0'))
+            f.write(data.tobytes())
+        os.replace(tmp, self.path)
+        self._open('r+')
+
+    def _open(self, mode):
+        self._header = np.memmap(self.path, dtype=HEADER_DTYPE, mode=mode, shape=(1,))
+        if self._header['magic'][0] != MAGIC:
+            raise ValueError(f"{self.path} is not a bar ring buffer")
+        self.capacity = int(self._header['capacity'][0])
+        self.step_ms = int(self._header['step_ms'][0])
+        self._data = np.memmap(self.path, dtype=BAR_DTYPE, mode=mode,
+                               offset=HEADER_SIZE, shape=(self.capacity,))
+
+    def _resize(self, capacity, step_ms):
+        bars = self.snapshot() if step_ms == self.step_ms else None
+        self.close()
+        self._create(capacity, step_ms, bars)
+
+    def flush(self):
+        if not self.readonly:
+            self._data.flush()
+            self._header.flush()
+
+    def close(self):
+        self.flush()
+        self._header = self._data = None
+
+    # ── writes ──────────────────────────────────────────────────────────────
+    def append(self, open_time, o, h, l, c, v, qv=0.0):
+        """Append one closed bar. Returns False (no-op) unless it is newer than the last bar."""
+        count = int(self._header['count'][0])
+        if count and open_time <= self._data[(count - 1) % self.capacity]['open_time']:
+            return False
+        self._header['seq'] += 1
+        self._data[count % self.capacity] = (open_time, o, h, l, c, v, qv)
+        self._header['count'] = count + 1
+        self._header['seq'] += 1
+        return True
+
+    # ── reads ───────────────────────────────────────────────────────────────
+    def __len__(self):
+        return min(int(self._header['count'][0]), self.capacity)
+
+    @property
+    def last_open_time(self):
+        count = int(self._header['count'][0])
+        if not count:
+            return None
+        return int(self._data[(count - 1) % self.capacity]['open_time'])
+
+    def snapshot(self):
+        """Copy of the stored bars as a ``BAR_DTYPE`` array, oldest first."""
+        for _ in range(1000):
+            seq = int(self._header['seq'][0])
+            if seq % 2:
+                time.sleep(0)  # Writer mid-append
+                continue
+            count = int(self._header['count'][0])
+            data = np.array(self._data)
+            if int(self._header['seq'][0]) == seq:
+                break
+        else:
+            raise RuntimeError(f"Could not get a consistent read of {self.path}")
+
+        if count <= self.capacity:
+            return data[:count]
+        head = count % self.capacity
+        return np.concatenate([data[head:], data[:head]])
+
+    def frame(self, since_ms=None):
+        """Stored bars as a DataFrame indexed by open ``datetime``."""
+        bars = self.snapshot()
+        if since_ms is not None:
+            bars = bars[bars['open_time'] >= since_ms]
+        df = pd.DataFrame({f: bars[f] for f in BAR_FIELDS},
+                          index=pd.to_datetime(bars['open_time'], unit='ms'))
+        df.index.name = 'datetime'
+        return df
@@ -0,0 +1,253 @@
+"""
+Rolling-window kernels on contiguous float arrays.
+
+Every kernel takes a 1-D array and a window and returns float64 arrays the
+length of the input, with pandas' conventions: a window of ``window`` bars
+ending at each bar, NaNs skipped, and a value only where at least
+``min_periods`` (default: the full window) observations are present.
+
+    mean, std = rolling_mean_std(close, 20)     # both from one pass
+    lo = rolling_min(high - low, 20)
+
+The NumPy path is O(n) whatever the window: the series is cut into blocks
+of ``window`` bars, running prefix and suffix reductions are taken inside
+every block with one ``ufunc.accumulate``, and each window is the suffix of
+one block combined with the prefix of the next (van Herk / Gil-Werman for
+min/max; the same split gives sums whose error does not grow with the
+series length). Count, sum and sum of squares for mean/std are reduced
+together as one stacked array.
+
+When numba is installed the same functions run as compiled single-pass
+loops instead: running sums about an anchor that is re-summed exactly
+every ``window`` bars for sum / mean / std, monotonic deques for min / max.
+``HAVE_NUMBA`` says which one is in use.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # NumPy kernels only
+    HAVE_NUMBA = False
+
+
+def _prepare(x, window, min_periods):
+    x = np.ascontiguousarray(x, dtype='float64')
+    window = int(window)
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+    minp = window if min_periods is None else max(min(int(min_periods), window), 1)
+    return x, window, minp
+
+
+def shift(x, n):
+    """``x`` moved ``n`` bars later (negative: earlier), NaN-filled; ``Ref($x, n)``."""
+    x = np.asarray(x, dtype='float64')
+    out = np.full(len(x), np.nan)
+    if n == 0:
+        out[:] = x
+    elif 0 < n < len(x):
+        out[n:] = x[:-n]
+    elif 0 < -n < len(x):
+        out[:n] = x[-n:]
+    return out
+
+
+# ── NumPy: block prefix / suffix reductions ──
+def window_reduce(values, window, op, identity):
+    """``op`` over the trailing ``window`` entries of every column, for each row of ``values`` (k, n)."""
+    k, n = values.shape
+    pad = window - 1
+    tail = -(n + pad) % window
+    y = np.concatenate([np.full((k, pad), identity), values, np.full((k, tail), identity)], axis=1)
+    blocks = y.reshape(k, -1, window)
+    prefix = op.accumulate(blocks, axis=2).reshape(k, -1)
+    suffix = op.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(k, -1)
+    # Window i covers padded [i, i + pad]: the rest of i's block, then the head of the next one
+    out = op(suffix[:, :n], prefix[:, pad:pad + n])
+    if op is np.add:
+        # Windows starting on a block boundary are that whole block, counted twice above
+        out[:, ::window] = suffix[:, :n:window]
+    return out
+
+
+def _np_counts(valid, window):
+    """Observations per window: closed form without NaNs, otherwise one more reduction."""
+    if valid.all():
+        return np.minimum(np.arange(1, len(valid) + 1), window).astype('float64')
+    return window_reduce(valid.astype('float64')[None], window, np.add, 0.0)[0]
+
+
+def _np_sums(x, window, squares=False):
+    valid = ~np.isnan(x)
+    # Centre on the first observation so sums of squares do not carry the price level
+    center = x[valid][0] if valid.any() else 0.0
+    d = np.where(valid, x - center, 0.0)
+    sums = window_reduce(np.vstack([d, d * d]) if squares else d[None], window, np.add, 0.0)
+    return center, _np_counts(valid, window), sums
+
+
+def _np_mean_std(x, window, minp, ddof):
+    center, count, (s, ss) = _np_sums(x, window, squares=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s / count
+        var = np.maximum(ss - s * mean, 0.0) / (count - ddof)
+    mean = np.where(count >= minp, mean + center, np.nan)
+    std = np.where((count >= minp) & (count > ddof), np.sqrt(var), np.nan)
+    return mean, std
+
+
+def _np_sum(x, window, minp):
+    center, count, (s,) = _np_sums(x, window)
+    return np.where(count >= minp, s + count * center, np.nan)
+
+
+def _np_extreme(x, window, minp, is_max):
+    valid = ~np.isnan(x)
+    identity = -np.inf if is_max else np.inf
+    op = np.maximum if is_max else np.minimum
+    ext = window_reduce(np.where(valid, x, identity)[None], window, op, identity)[0]
+    return np.where(_np_counts(valid, window) >= minp, ext, np.nan)
+
+
+# ── numba: single-pass loops ──
+def _nb_sums(x, window, minp, ddof, with_std):
+    # Running sums about an anchor c, re-summed exactly (and re-anchored on the
+    # newest bar) every ``window`` bars, so rounding never builds up
+    n = len(x)
+    mean_out = np.full(n, np.nan)
+    std_out = np.full(n, np.nan)
+    count, s, ss, c = 0, 0.0, 0.0, 0.0
+    for i in range(n):
+        if i % window == 0:
+            if x[i] == x[i]:
+                c = x[i]
+            count, s, ss = 0, 0.0, 0.0
+            for j in range(max(i - window + 1, 0), i + 1):
+                if x[j] == x[j]:
+                    d = x[j] - c
+                    count += 1
+                    s += d
+                    ss += d * d
+        else:
+            v = x[i]
+            if v == v:
+                d = v - c
+                count += 1
+                s += d
+                ss += d * d
+            if i >= window:
+                old = x[i - window]
+                if old == old:
+                    d = old - c
+                    count -= 1
+                    s -= d
+                    ss -= d * d
+        if count >= minp:
+            if not with_std:
+                mean_out[i] = c * count + s  # the window sum
+            else:
+                mean_out[i] = c + s / count
+                if count > ddof:
+                    std_out[i] = np.sqrt(max(ss - s * s / count, 0.0) / (count - ddof))
+    return mean_out, std_out
+
+
+def _nb_mean_std(x, window, minp, ddof):
+    return _nb_sums(x, window, minp, ddof, True)
+
+
+def _nb_sum(x, window, minp):
+    return _nb_sums(x, window, minp, 1, False)[0]
+
+
+def _nb_extreme(x, window, minp, is_max):
+    n = len(x)
+    out = np.full(n, np.nan)
+    queue = np.empty(n, dtype=np.int64)  # indices with monotonic values, front = current extreme
+    head, tail, count = 0, 0, 0
+    for i in range(n):
+        v = x[i]
+        if v == v:
+            count += 1
+            while tail > head and ((x[queue[tail - 1]] <= v) if is_max else (x[queue[tail - 1]] >= v)):
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        if i >= window:
+            if x[i - window] == x[i - window]:
+                count -= 1
+            while tail > head and queue[head] <= i - window:
+                head += 1
+        if count >= minp and tail > head:
+            out[i] = x[queue[head]]
+    return out
+
+
+if HAVE_NUMBA:
+    _nb_sums, _nb_extreme = njit(cache=True)(_nb_sums), njit(cache=True)(_nb_extreme)
+    _nb_mean_std, _nb_sum = njit(cache=True)(_nb_mean_std), njit(cache=True)(_nb_sum)
+
+
+# ── public kernels ──
+def rolling_mean_std(x, window, min_periods=None, ddof=1):
+    """(mean, std) over the same windows, computed together."""
+    x, window, minp = _prepare(x, window, min_periods)
+    if HAVE_NUMBA:
+        return _nb_mean_std(x, window, minp, ddof)
+    return _np_mean_std(x, window, minp, ddof)
+
+
+def rolling_mean(x, window, min_periods=None):
+    return rolling_mean_std(x, window, min_periods)[0]
+
+
+def rolling_std(x, window, min_periods=None, ddof=1):
+    return rolling_mean_std(x, window, min_periods, ddof)[1]
+
+
+def rolling_sum(x, window, min_periods=None):
+    x, window, minp = _prepare(x, window, min_periods)
+    return _nb_sum(x, window, minp) if HAVE_NUMBA else _np_sum(x, window, minp)
+
+
+def rolling_min(x, window, min_periods=None):
+    x, window, minp = _prepare(x, window, min_periods)
+    return _nb_extreme(x, window, minp, False) if HAVE_NUMBA else _np_extreme(x, window, minp, False)
+
+
+def rolling_max(x, window, min_periods=None):
+    x, window, minp = _prepare(x, window, min_periods)
+    return _nb_extreme(x, window, minp, True) if HAVE_NUMBA else _np_extreme(x, window, minp, True)
+
+
+if __name__ == "__main__":
+    import time
+
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    x = 3000 * np.exp(np.cumsum(rng.normal(0, 0.002, 200_000)))
+    x[rng.integers(0, len(x), 500)] = np.nan
+    s = pd.Series(x)
+    print(f"numba: {HAVE_NUMBA}")
+    for w, minp in [(20, None), (60, None), (20, 1)]:
+        r = s.rolling(w, min_periods=minp or w)
+        mean, std = rolling_mean_std(x, w, minp)
+        checks = {'mean': (mean, r.mean()), 'std': (std, r.std()), 'sum': (rolling_sum(x, w, minp), r.sum()),
+                  'min': (rolling_min(x, w, minp), r.min()), 'max': (rolling_max(x, w, minp), r.max())}
+        for name, (got, exp) in checks.items():
+            exp = exp.to_numpy()
+            ok = np.allclose(got, exp, rtol=1e-7, atol=1e-9, equal_nan=True)
+            print(f"window {w:>3} min_periods {minp}: {name:<4} {'ok' if ok else 'MISMATCH'}")
+
+    t = time.perf_counter()
+    for w in [5, 10, 20, 60]:
+        s.rolling(w).mean(), s.rolling(w).std(), s.rolling(w).min(), s.rolling(w).max()
+    t_pd = time.perf_counter() - t
+    t = time.perf_counter()
+    for w in [5, 10, 20, 60]:
+        rolling_mean_std(x, w), rolling_min(x, w), rolling_max(x, w)
+    t_k = time.perf_counter() - t
+    print(f"pandas {t_pd * 1e3:.1f} ms, kernels {t_k * 1e3:.1f} ms")
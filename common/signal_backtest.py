@@ -0,0 +1,128 @@
+"""
+Threshold x cost sweep of the threshold-signal backtest in one pass.
+
+``backtest_lgbm_eth.py`` turns predictions into a signal (+1 above
+``threshold``, -1 below ``-threshold``, 0 otherwise), charges ``cost`` on
+every signal change and compounds ``signal * label - charge``. The Gen-7
+folders differ only by that threshold, so each was one full rerun. Here the
+same predictions are evaluated for a whole array of thresholds and costs at
+once: the signals are a (thresholds, bars) matrix, the net returns a
+(thresholds, costs, bars) broadcast over it, and every statistic a reduction
+along the bars axis:
+
+    table = threshold_sweep(pred, label, thresholds=np.linspace(0, 0.002, 2001), costs=[0.0005, 0.001])
+    table.sort_values('total_return', ascending=False).head()
+
+or straight from a saved ``ai_backtest_results.csv`` (``label`` / ``pred``):
+
+    python -m common.signal_backtest 0208_Gen7_1195pct/ai_backtest_results.csv --cost 0.0005
+
+``per_unit=False`` charges ``cost`` once per signal change (the Gen-4..7
+scripts), ``per_unit=True`` charges ``|change|`` units, so a flip from long
+to short pays twice (Gen10_15171x). ``backtest`` is the single-setting
+per-bar version, the columns ``backtest_lgbm_eth.py`` writes.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Elements of one (thresholds, costs, bars) block; thresholds are processed in chunks below it
+MAX_BLOCK = 1 << 24
+
+
+def signals(pred, thresholds):
+    """(len(thresholds), len(pred)) int8 signals: +1 above the threshold, -1 below its negative."""
+    pred = np.asarray(pred, dtype='float64').ravel()
+    t = np.asarray(thresholds, dtype='float64').reshape(-1, 1)
+    return ((pred > t).astype('int8') - (pred < -t).astype('int8'))
+
+
+def _changes(sig):
+    """|signal change| per bar; the first bar counts as no change (``diff().fillna(0)``)."""
+    d = np.zeros(sig.shape, dtype='int8')
+    d[:, 1:] = np.abs(np.diff(sig, axis=1))
+    return d
+
+
+def threshold_sweep(pred, label, thresholds, costs, per_unit=False):
+    """Backtest statistics for every (threshold, cost); one row per combination.
+
+    Columns: ``threshold``, ``cost``, ``total_return`` (compounded net),
+    ``win_rate`` (share of bars in a position with positive net return),
+    ``trades`` (signal change units / 2, as the scripts count them),
+    ``turnover`` (signal change units), ``exposure`` (share of bars in a
+    position) and ``mean_net`` (mean net return per bar).
+    """
+    pred = np.asarray(pred, dtype='float64').ravel()
+    label = np.asarray(label, dtype='float64').ravel()
+    thresholds = np.asarray(thresholds, dtype='float64').ravel()
+    costs = np.asarray(costs, dtype='float64').ravel()
+    n = len(pred)
+    chunk = max(1, MAX_BLOCK // max(1, n * len(costs)))
+
+    out = {k: np.empty((len(thresholds), len(costs))) for k in ['total_return', 'win_rate', 'mean_net']}
+    turnover = np.empty(len(thresholds))
+    exposure = np.empty(len(thresholds))
+    for lo in range(0, len(thresholds), chunk):
+        sl = slice(lo, lo + chunk)
+        sig = signals(pred, thresholds[sl])                         # (k, n)
+        change = _changes(sig)
+        charge = change if per_unit else (change > 0)
+        held = sig != 0
+        net = (sig * label)[:, None, :] - charge[:, None, :] * costs[None, :, None]  # (k, c, n)
+
+        out['total_return'][sl] = np.prod(1 + net, axis=2) - 1
+        out['mean_net'][sl] = net.mean(axis=2) if n else np.nan
+        n_held = held.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out['win_rate'][sl] = ((net > 0) & held[:, None, :]).sum(axis=2) / n_held[:, None]
+        turnover[sl] = change.sum(axis=1)
+        exposure[sl] = n_held / n if n else np.nan
+
+    grid_t = np.repeat(thresholds, len(costs))
+    return pd.DataFrame({
+        'threshold': grid_t,
+        'cost': np.tile(costs, len(thresholds)),
+        'total_return': out['total_return'].ravel(),
+        'win_rate': out['win_rate'].ravel(),
+        'trades': np.repeat(turnover / 2, len(costs)),
+        'turnover': np.repeat(turnover, len(costs)),
+        'exposure': np.repeat(exposure, len(costs)),
+        'mean_net': out['mean_net'].ravel(),
+    })
+
+
+def backtest(pred, label, threshold, cost, per_unit=False, index=None):
+    """Per-bar frame of one setting: signal, strategy_opt_return, net_return, cum_ret."""
+    label = np.asarray(label, dtype='float64').ravel()
+    sig = signals(pred, [threshold])
+    change = _changes(sig)[0]
+    gross = sig[0] * label
+    net = gross - (change if per_unit else (change > 0)) * cost
+    return pd.DataFrame({'label': label, 'pred': np.asarray(pred, dtype='float64').ravel(), 'signal': sig[0],
+                         'strategy_opt_return': gross, 'net_return': net, 'cum_ret': np.cumprod(1 + net)}, index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threshold x cost sweep over saved backtest predictions")
+    parser.add_argument('results', help="CSV with label and pred columns (ai_backtest_results.csv)")
+    parser.add_argument('--max-threshold', type=float, default=0.002)
+    parser.add_argument('--steps', type=int, default=2001)
+    parser.add_argument('--cost', type=float, nargs='+', default=[0.0005])
+    parser.add_argument('--per-unit', action='store_true', help="charge |signal change| units (flips pay twice)")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.results, usecols=['label', 'pred'])
+    thresholds = np.linspace(0, args.max_threshold, args.steps)
+    table = threshold_sweep(df['pred'], df['label'], thresholds, args.cost, per_unit=args.per_unit)
+    print(f"{len(df)} bars x {len(thresholds)} thresholds x {len(args.cost)} costs")
+    for cost, g in table.groupby('cost'):
+        print(f"\nCost {cost}: top {args.top} by total return")
+        print(g.nlargest(args.top, 'total_return').to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
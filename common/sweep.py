@@ -0,0 +1,178 @@
+"""
+Parallel hyperparameter / feature-set sweep over shared binary datasets.
+
+Every Gen-* folder is one hand-run point of the same sweep: the
+``train_lgbm_eth.py`` parameters (``num_leaves=31``, ``learning_rate=0.05``)
+with the feature set of its generation. The sweep runs the whole grid at
+once:
+
+    python -m common.sweep --out sweep_runs/eth_10m --trials 200
+
+1. The union of all features is loaded once (one DagDataLoader pass, shared
+   sub-expressions computed once) and each feature set's train / valid
+   matrices are constructed into LightGBM Datasets and saved in LightGBM's
+   binary format under ``<out>/datasets/``, keyed by the data fingerprint,
+   the expressions and the segments (a rerun reuses them).
+2. Trials go to a process pool; every worker loads the binary datasets
+   once (no feature parsing, no re-binning) and trains with
+   ``num_threads = cores // workers``, so the pool saturates the machine
+   without oversubscribing it.
+3. Every finished trial is appended to ``<out>/results.csv``: one row of
+   feature set, parameters, best iteration, valid l2 and seconds.
+
+Dataset parameters (``max_bin``, ...) are fixed by the binary files; the
+grid covers booster parameters only.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import lightgbm as lgb
+import pandas as pd
+
+from common.factors import FEATURE_SETS, factor_exprs
+from common.feature_cache import digest
+from common.lgb_data import lgb_dataset
+from common.walk_forward import LABEL, PARAMS
+
+SEGMENTS = {"train": ("2025-01-05", "2025-09-30"), "valid": ("2025-10-01", "2025-11-30")}
+SPACE = {
+    'num_leaves': [15, 31, 63, 127],
+    'learning_rate': [0.02, 0.05, 0.1],
+    'feature_fraction': [0.7, 0.9],
+    'min_data_in_leaf': [20, 100],
+    'lambda_l2': [0.0, 1.0],
+}
+ETH_SETS = ['qlib_ai', 'gen4', 'gen6', 'gen7', 'alpha158_opt', 'gen10']
+# Fixed when the binary files are built; no pre-filtering so min_data_in_leaf can vary per trial
+DATASET_PARAMS = {'verbose': -1, 'feature_pre_filter': False}
+
+
+def grid(space, feature_sets, trials=None, seed=0):
+    """Every (feature set, params) combination, or ``trials`` of them drawn at random."""
+    keys = list(space)
+    combos = [(fs, dict(zip(keys, values)))
+              for fs in feature_sets for values in itertools.product(*(space[k] for k in keys))]
+    if trials and trials < len(combos):
+        combos = random.Random(seed).sample(combos, trials)
+    return combos
+
+
+# ── datasets ──
+def build_datasets(out, feature_sets, instruments='all', segments=SEGMENTS):
+    """Binary train / valid Datasets per feature set under ``out/datasets``; {set: (train path, valid path)}."""
+    from qlib.data import D
+    from qlib.data.dataset.handler import DataHandlerLP
+
+    from common.qlib_loader import data_fingerprint
+
+    columns = {fs: {col: repr(e) for col, e in factor_exprs(fs).items()} for fs in feature_sets}
+    exprs = sorted({e for cols in columns.values() for e in cols.values()})
+    start, end = min(s for s, _ in segments.values()), max(e for _, e in segments.values())
+    insts = D.list_instruments(D.instruments(instruments), start, end, as_list=True)
+    key = digest(data_fingerprint(insts, 'day'), exprs, LABEL, segments)
+    root = Path(out) / 'datasets' / key
+    paths = {fs: (root / f"{fs}.train.bin", root / f"{fs}.valid.bin") for fs in feature_sets}
+    if all(t.exists() and v.exists() for t, v in paths.values()):
+        print(f"Reusing binary datasets in {root}")
+        return paths
+
+    print(f"Loading {len(exprs)} unique features for {len(feature_sets)} feature sets ...")
+    handler = DataHandlerLP(
+        instruments=instruments, start_time=start, end_time=end, drop_raw=True,
+        infer_processors=[{"class": "Fillna", "kwargs": {"fields_group": "feature"}}],
+        learn_processors=[{"class": "DropnaLabel"}],
+        data_loader={"class": "DagDataLoader", "module_path": "common.qlib_loader",
+                     "kwargs": {"config": {"feature": (exprs, exprs), "label": LABEL}, "float32": True}},
+    )
+    df = handler.fetch(col_set=["feature", "label"], data_key=DataHandlerLP.DK_L)
+    times = df.index.get_level_values('datetime')
+    split = {seg: (times >= pd.Timestamp(s)) & (times <= pd.Timestamp(e) + pd.Timedelta('1D') - pd.Timedelta('1ns'))
+             for seg, (s, e) in segments.items()}
+    root.mkdir(parents=True, exist_ok=True)
+    for fs, cols in columns.items():
+        X = df["feature"][list(cols.values())]
+        X.columns = list(cols)
+        train = lgb_dataset(X[split['train']], df["label"][split['train']], params=DATASET_PARAMS)
+        valid = lgb_dataset(X[split['valid']], df["label"][split['valid']], reference=train)
+        train.save_binary(str(paths[fs][0]))
+        valid.save_binary(str(paths[fs][1]))
+        print(f"  {fs}: {len(cols)} features, {split['train'].sum()} train / {split['valid'].sum()} valid rows")
+    return paths
+
+
+# ── pool workers ──
+_datasets = {}
+_paths = {}
+
+
+def _init_worker(paths):
+    _paths.update(paths)
+
+
+def _trial(trial_id, feature_set, params, threads, rounds, early_stopping):
+    if feature_set not in _datasets:
+        train_path, valid_path = _paths[feature_set]
+        train = lgb.Dataset(str(train_path), params=DATASET_PARAMS)
+        _datasets[feature_set] = (train, lgb.Dataset(str(valid_path), reference=train, params=DATASET_PARAMS))
+    train, valid = _datasets[feature_set]
+    t = time.perf_counter()
+    evals = {}
+    model = lgb.train({**PARAMS, 'metric': 'l2', **params, 'num_threads': threads}, train,
+                      num_boost_round=rounds, valid_sets=[valid], valid_names=['valid'],
+                      callbacks=[lgb.early_stopping(early_stopping, verbose=False), lgb.record_evaluation(evals)])
+    best = model.best_iteration or len(evals['valid']['l2'])
+    return {'trial': trial_id, 'feature_set': feature_set, **params, 'best_iteration': best,
+            'valid_l2': evals['valid']['l2'][best - 1], 'seconds': round(time.perf_counter() - t, 2)}
+
+
+def run_sweep(paths, trials, workers=None, threads=None, rounds=1000, early_stopping=50, results_path=None):
+    """Run ``trials`` [(feature set, params)] on a process pool; returns the results table (best first)."""
+    cores = os.cpu_count() or 1
+    workers = workers or max(1, cores // (threads or 1))
+    threads = threads or max(1, cores // workers)
+    print(f"{len(trials)} trials on {workers} workers x {threads} threads")
+    rows = []
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(paths,)) as pool:
+        futures = [pool.submit(_trial, i, fs, params, threads, rounds, early_stopping)
+                   for i, (fs, params) in enumerate(trials)]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            print(f"[{len(rows)}/{len(trials)}] {row['feature_set']:>12} l2={row['valid_l2']:.6g} "
+                  f"iter={row['best_iteration']} ({row['seconds']}s)")
+            if results_path:
+                pd.DataFrame([row]).to_csv(results_path, mode='a', index=False,
+                                           header=not Path(results_path).exists())
+    return pd.DataFrame(rows).sort_values('valid_l2').reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LightGBM hyperparameter / feature-set sweep")
+    parser.add_argument('--out', default='sweep_runs/eth_10m')
+    parser.add_argument('--provider-uri', default='~/.qlib/qlib_data/crypto_10m')
+    parser.add_argument('--feature-sets', nargs='+', default=ETH_SETS, choices=sorted(FEATURE_SETS))
+    parser.add_argument('--trials', type=int, help="random sample of the grid (default: the whole grid)")
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--threads', type=int, help="LightGBM threads per trial")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import qlib
+
+    qlib.init(provider_uri=str(Path(args.provider_uri).expanduser()), region='us')
+    out = Path(args.out)
+    paths = build_datasets(out, args.feature_sets)
+    trials = grid(SPACE, args.feature_sets, args.trials, args.seed)
+    results = run_sweep(paths, trials, args.workers, args.threads, results_path=out / 'results.csv')
+    print("\nTop 10 trials:")
+    print(results.head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
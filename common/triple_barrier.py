@@ -0,0 +1,177 @@
+"""
+Vectorized triple-barrier labeling.
+
+For every bar i the forward path ``prices[i+1 : i+1+t1] / prices[i] - 1`` is
+taken from one ``sliding_window_view`` of the longest horizon in the grid.
+Running max/min along the path turn "first bar at or beyond the barrier"
+into an ``argmax`` per barrier level, so a whole (pt, sl, t1) grid costs one
+pass over the windows plus O(n) per combination, instead of a Python loop
+over every bar per setting.
+
+    res = triple_barrier_grid(close, pts=[0.003, 0.005], sls=[0.002, 0.003], t1s=[4, 12])
+    res[(0.005, 0.003, 4)]['label']
+
+``path_barrier_grid`` is the high/low mode matching the live exits: the
+profit target is checked against the forward highs and the stop against the
+forward lows. A bar that crosses both is resolved from the 1m bars inside it
+(one gather of ``bar_minutes`` per ambiguous bar); ties that the 1m data
+cannot split go the way ``live_inference`` checks them, profit target first.
+"""
+
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+BARRIER_PT = 1
+BARRIER_SL = -1
+BARRIER_NONE = 0
+
+
+def forward_returns(prices, horizon, base=None):
+    """(n, horizon) matrix of returns from bar i to bars i+1 .. i+horizon (NaN past the end).
+
+    ``base`` is the entry price series when it differs from ``prices``
+    (e.g. forward highs relative to the entry close).
+    """
+    prices = np.asarray(prices, dtype='float64')
+    base = prices if base is None else np.asarray(base, dtype='float64')
+    padded = np.concatenate([prices[1:], np.full(horizon, np.nan)])
+    windows = sliding_window_view(padded, horizon)[:len(prices)]
+    return windows / base[:, None] - 1
+
+
+def first_touch(path_extreme, level, upper=True):
+    """Index of the first step where the running extreme reaches ``level``; horizon if never."""
+    hit = path_extreme >= level if upper else path_extreme <= level
+    return np.where(hit.any(axis=1), hit.argmax(axis=1), path_extreme.shape[1])
+
+
+def _resolve(first_pt, first_sl, t1, n, tie_pt=False):
+    """Label / barrier / bars-to-touch from first-touch indices within horizon ``t1``.
+
+    A tie (both barriers in the same bar) is a stop unless ``tie_pt`` says otherwise.
+    """
+    pt_in = first_pt < t1
+    sl_in = first_sl < t1
+    pt_first = pt_in & ((first_pt < first_sl) | ((first_pt == first_sl) & tie_pt))
+    sl_first = sl_in & ~pt_first
+
+    barrier = np.where(pt_first, BARRIER_PT, np.where(sl_first, BARRIER_SL, BARRIER_NONE)).astype('int8')
+    touch = np.where(pt_first, first_pt + 1, np.where(sl_first, first_sl + 1, t1)).astype('int16')
+
+    # The last t1 bars have no complete horizon
+    valid = np.arange(n) < n - t1
+    barrier[~valid] = BARRIER_NONE
+    touch[~valid] = 0
+    label = (barrier == BARRIER_PT).astype('int8')
+    return {'label': label, 'barrier': barrier, 'touch': touch, 'valid': valid}
+
+
+def triple_barrier_grid(prices, pts, sls, t1s):
+    """Labels for every (pt, sl, t1) combination.
+
+    Returns ``{(pt, sl, t1): {'label', 'barrier', 'touch', 'valid'}}``:
+    ``label`` is 1 when the profit target is hit strictly before the stop
+    loss within ``t1`` bars (0 for stop, time-out, or a tie); ``barrier`` is
+    +1 / -1 / 0 for profit target / stop loss / time-out; ``touch`` is the
+    number of bars until the barrier was hit (``t1`` on time-out).
+    """
+    rets = forward_returns(prices, max(t1s))
+    run_max = np.fmax.accumulate(rets, axis=1)
+    run_min = np.fmin.accumulate(rets, axis=1)
+    first_pt = {pt: first_touch(run_max, pt, upper=True) for pt in pts}
+    first_sl = {sl: first_touch(run_min, -sl, upper=False) for sl in sls}
+
+    n = len(rets)
+    return {(pt, sl, t1): _resolve(first_pt[pt], first_sl[sl], t1, n)
+            for pt, sl, t1 in product(pts, sls, t1s)}
+
+
+def triple_barrier_labels(prices, pt, sl, t1):
+    """Single-setting shortcut of ``triple_barrier_grid``."""
+    return triple_barrier_grid(prices, [pt], [sl], [t1])[(pt, sl, t1)]
+
+
+def intrabar_order(bar_start, bar_ms, up_level, dn_level, minutes, tie=BARRIER_PT):
+    """Which barrier the 1m bars inside each bar reach first: +1 / -1 per bar.
+
+    ``bar_start`` are the open times (ms) of the bars crossing both levels,
+    ``minutes`` the 1m bars as a DataFrame with ``open_time`` / ``high`` /
+    ``low``. Every bar gathers the same ``bar_ms / 1m`` slots, so missing
+    minutes are masked instead of looped over; bars where both levels fall in
+    the same minute, or whose minutes are not stored, get ``tie``.
+    """
+    step = 60_000
+    k = max(int(bar_ms // step), 1)
+    times = minutes['open_time'].to_numpy(dtype='int64')
+    if not len(bar_start) or not len(times):
+        return np.full(len(bar_start), tie, dtype='int8')
+
+    slots = np.asarray(bar_start, dtype='int64')[:, None] + np.arange(k) * step
+    idx = np.clip(np.searchsorted(times, slots), 0, len(times) - 1)
+    present = times[idx] == slots
+    high = np.where(present, minutes['high'].to_numpy(dtype='float64')[idx], np.nan)
+    low = np.where(present, minutes['low'].to_numpy(dtype='float64')[idx], np.nan)
+
+    first_up = first_touch(high, np.asarray(up_level)[:, None], upper=True)
+    first_dn = first_touch(low, np.asarray(dn_level)[:, None], upper=False)
+    order = np.where(first_up < first_dn, BARRIER_PT, np.where(first_dn < first_up, BARRIER_SL, tie))
+    return order.astype('int8')
+
+
+def path_barrier_grid(close, high, low, pts, sls, t1s, bar_times=None, minutes=None, tie=BARRIER_PT):
+    """``triple_barrier_grid`` with the barriers checked against ``high`` / ``low``.
+
+    Entry is the close of bar i; the profit target is hit on the first later
+    bar whose high reaches ``close * (1 + pt)``, the stop on the first whose
+    low reaches ``close * (1 - sl)``. When both happen in the same bar the
+    order comes from ``minutes`` (1m bars, see ``intrabar_order``) at
+    ``bar_times`` (bar open times in ms); without them such ties get ``tie``.
+    """
+    close = np.asarray(close, dtype='float64')
+    horizon = max(t1s)
+    run_max = np.fmax.accumulate(forward_returns(high, horizon, base=close), axis=1)
+    run_min = np.fmin.accumulate(forward_returns(low, horizon, base=close), axis=1)
+    first_pt = {pt: first_touch(run_max, pt, upper=True) for pt in pts}
+    first_sl = {sl: first_touch(run_min, -sl, upper=False) for sl in sls}
+
+    if bar_times is not None:
+        bar_times = np.asarray(bar_times, dtype='int64')
+        bar_ms = int(np.median(np.diff(bar_times))) if len(bar_times) > 1 else 60_000
+
+    n = len(close)
+    results = {}
+    for pt, sl in product(pts, sls):
+        tie_pt = np.full(n, tie == BARRIER_PT)
+        both = np.flatnonzero((first_pt[pt] == first_sl[sl]) & (first_pt[pt] < horizon))
+        if len(both) and bar_times is not None and minutes is not None:
+            # Bar in which both barriers were crossed, and the price levels of this entry
+            order = intrabar_order(bar_times[both + 1 + first_pt[pt][both]], bar_ms,
+                                   close[both] * (1 + pt), close[both] * (1 - sl), minutes, tie)
+            tie_pt[both] = order == BARRIER_PT
+        for t1 in t1s:
+            results[(pt, sl, t1)] = _resolve(first_pt[pt], first_sl[sl], t1, n, tie_pt)
+    return results
+
+
+def path_barrier_labels(close, high, low, pt, sl, t1, bar_times=None, minutes=None, tie=BARRIER_PT):
+    """Single-setting shortcut of ``path_barrier_grid``."""
+    return path_barrier_grid(close, high, low, [pt], [sl], [t1], bar_times, minutes, tie)[(pt, sl, t1)]
+
+
+def grid_summary(results):
+    """One row per setting: positive rate, stop/time-out rates and mean bars to touch."""
+    rows = []
+    for (pt, sl, t1), res in results.items():
+        barrier = res['barrier'][res['valid']]
+        touch = res['touch'][res['valid']]
+        rows.append({
+            'pt': pt, 'sl': sl, 't1': t1,
+            'pos_rate': (barrier == BARRIER_PT).mean(),
+            'sl_rate': (barrier == BARRIER_SL).mean(),
+            'timeout_rate': (barrier == BARRIER_NONE).mean(),
+            'mean_touch': touch.mean(),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,263 @@
+"""
+Walk-forward retraining with LightGBM warm start.
+
+``train_lgbm_eth.py`` trains once on fixed segments, so a live model goes
+stale until someone edits the dates and reruns everything. The walk-forward
+trainer keeps the published model current instead. Every step continues
+boosting the published booster (``init_model``) on only the bars that
+arrived since the last step, early-stops on the latest slice and publishes
+the result atomically, so retraining cost follows the new data, not the
+history:
+
+    python -m common.walk_forward 0208_Gen10_200x_target                 # one step
+    python -m common.walk_forward 0208_Gen10_200x_target --every 1D      # on a schedule
+
+With ``now`` the last bar that has a label, a step uses
+
+    train: (trained_through, now - valid]     the new bars only
+    valid: (now - valid, now]                 the latest slice
+
+and publishes only if the new booster's MSE on the valid slice is no worse
+than the current model's; otherwise nothing moves and the next step trains
+on the same bars plus the newer ones. The first step (no model yet, or
+``--full``) trains from ``--start`` like ``train_lgbm_eth.py``. A model
+trained by ``train_lgbm_eth.py`` has no state file yet: pass ``--since``
+with the last bar it was trained on.
+
+The state (``trained_through``, valid MSE, tree count) sits next to the model
+in ``<model>.walk_forward.json``. Live scripts hold the model as a
+``PublishedModel``, which reloads the file when a new one is published
+(the flat copy ``<model>.flat`` when there is one). Every published model
+is also registered as a new version in ``common.model_registry``.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import re
+import time
+from pathlib import Path
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from common.factors import qlib_fields
+from common.flat_trees import FlatModel, export, flat_path
+from common.lgb_data import lgb_dataset
+from common.model_registry import ModelRegistry, check_schema
+
+MODEL_NAME = 'lgbm_model_eth_10m.pkl'
+LABEL = (["Ref($close, -1) / $close - 1"], ["label"])
+# train_lgbm_eth.py's parameters, used for the first (full) training
+PARAMS = {
+    'boosting_type': 'gbdt',
+    'objective': 'regression',
+    'metric': ['mse', 'l2'],
+    'num_leaves': 31,
+    'learning_rate': 0.05,
+    'feature_fraction': 0.9,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'verbose': -1,
+}
+
+
+# ── publishing ──
+def publish(model, path):
+    """Pickle ``model`` to ``path`` atomically: readers see the old file or the new one, never a partial one.
+
+    The flat copy (``<model>.flat``) is swapped first, so a live reader never
+    pairs a new pickle with an old flat model.
+    """
+    path = Path(path)
+    export(model, path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'wb') as f:
+        pickle.dump(model, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PublishedModel:
+    """A model file that is reloaded whenever a new version is published over it.
+
+    When the model has a flat copy (``<model>.flat``, common/flat_trees.py)
+    that is loaded instead of the pickle: memory-mapped, no unpickling, and
+    microsecond single-row ``predict``. With ``feature_names`` every loaded
+    version must take exactly those features (``SchemaMismatch`` otherwise).
+    """
+
+    def __init__(self, path, feature_names=None):
+        self.path = Path(path)
+        self.feature_names = feature_names
+        self._stamp = None
+        self._model = None
+
+    def get(self):
+        flat = flat_path(self.path)
+        source = flat if flat.exists() else self.path
+        st = source.stat()  # follows the .flat symlink to the current copy
+        stamp = (source, st.st_ino, st.st_mtime_ns)  # os.replace gives the new file a new inode
+        if stamp != self._stamp:
+            if source == flat:
+                model = FlatModel.open(flat)
+            else:
+                with open(self.path, 'rb') as f:
+                    model = pickle.load(f)
+            if self.feature_names is not None:
+                names = model.feature_names if source == flat else model.feature_name()
+                check_schema(self.feature_names, names, str(source))
+            self._model = model
+            if self._stamp is not None:
+                print(f"Reloaded {self.path.name} ({self._model.num_trees()} trees)")
+            self._stamp = stamp
+        return self._model
+
+
+def _state_path(model_path):
+    return Path(model_path).with_name(Path(model_path).name + '.walk_forward.json')
+
+
+def _mse(model, X, y):
+    return float(np.mean((model.predict(X) - np.asarray(y, dtype='float64').ravel()) ** 2))
+
+
+# ── one step ──
+def step(model_path, load, now, valid=pd.Timedelta('30D'), start=None, since=None, full=False,
+         rounds=200, early_stopping=20, registry=None):
+    """One walk-forward step. ``load(start, end)`` -> (X, y) over the bars in (start, end].
+
+    Published models are also registered in ``registry`` (a ``ModelRegistry``)
+    under the model folder's name.
+    """
+    model_path = Path(model_path)
+    state_path = _state_path(model_path)
+    state = json.loads(state_path.read_text()) if state_path.exists() else {}
+    prev = None
+    if model_path.exists() and not full:
+        with open(model_path, 'rb') as f:
+            prev = pickle.load(f)
+        trained_through = state.get('trained_through') or since
+        if trained_through is None:
+            raise ValueError(f"{model_path} has no walk-forward state: pass since= (last bar it was trained on) or full=True")
+        trained_through = pd.Timestamp(trained_through)
+    else:
+        # load() ranges are (start, end]: include the --start bar itself
+        trained_through = pd.Timestamp(start) - pd.Timedelta(1, 'ns') if start else None
+
+    now = pd.Timestamp(now)
+    cut = now - valid
+    if trained_through is not None and trained_through >= cut:
+        print(f"Nothing new: trained through {trained_through}, valid slice starts {cut}")
+        return False
+    X_train, y_train = load(trained_through, cut)
+    X_valid, y_valid = load(cut, now)
+    print(f"Train ({trained_through}, {cut}]: {len(X_train)} rows | Valid ({cut}, {now}]: {len(X_valid)} rows")
+    if len(X_train) == 0 or len(X_valid) == 0:
+        print("Not enough bars for a step")
+        return False
+
+    t = time.perf_counter()
+    dtrain = lgb_dataset(X_train, y_train)
+    dvalid = lgb_dataset(X_valid, y_valid, reference=dtrain)
+    model = lgb.train(PARAMS, dtrain, num_boost_round=rounds if prev else 1000, init_model=prev,
+                      valid_sets=[dvalid], callbacks=[lgb.early_stopping(early_stopping if prev else 50, verbose=False)])
+    # Keep the trees up to the best iteration only (it counts the init_model's trees too)
+    model = lgb.Booster(model_str=model.model_to_string(num_iteration=model.best_iteration or -1))
+    added = model.num_trees() - (prev.num_trees() if prev else 0)
+    new_mse = _mse(model, X_valid, y_valid)
+    old_mse = _mse(prev, X_valid, y_valid) if prev else None
+    print(f"+{added} trees in {time.perf_counter() - t:.1f}s | valid MSE {new_mse:.6g}"
+          + (f" (current model {old_mse:.6g})" if prev else ""))
+
+    if prev is not None and (added <= 0 or new_mse > old_mse):
+        print("Not published: no improvement on the valid slice")
+        return False
+    publish(model, model_path)
+    if prev is None:
+        state['trained_from'] = str(trained_through + pd.Timedelta(1, 'ns')) if trained_through is not None else None
+    state.update({'trained_through': str(cut), 'valid_end': str(now), 'valid_mse': new_mse,
+                  'trees': model.num_trees(), 'published_at': str(pd.Timestamp.now())})
+    state_path.write_text(json.dumps(state, indent=2))
+    if registry is not None:
+        registry.register(model_path.parent.resolve().name, model, feature_names=list(X_train.columns),
+                          label=LABEL[0][0], train_window=(state.get('trained_from'), cut),
+                          metrics={'valid_mse': new_mse}, valid_window=[str(cut), str(now)])
+    print(f"Published {model_path} ({model.num_trees()} trees)")
+    return True
+
+
+# ── Qlib data ──
+def qlib_loader(feature_set, instruments='all'):
+    """``load(start, end)`` for ``step`` over the ETH Qlib data, as train_lgbm_eth.py builds it."""
+    from qlib.data.dataset.handler import DataHandlerLP
+
+    fields, names = qlib_fields(feature_set)
+
+    def load(start, end):
+        # Ranges are (start, end]: Qlib's are inclusive, so start one bar later
+        handler = DataHandlerLP(
+            instruments=instruments,
+            start_time=start + pd.Timedelta('1ns') if start is not None else None,
+            end_time=end,
+            drop_raw=True,
+            infer_processors=[{"class": "Fillna", "kwargs": {"fields_group": "feature"}}],
+            learn_processors=[{"class": "DropnaLabel"}],
+            data_loader={
+                "class": "DagDataLoader",
+                "module_path": "common.qlib_loader",
+                "kwargs": {"config": {"feature": (fields, names), "label": LABEL}, "float32": True},
+            },
+        )
+        df = handler.fetch(col_set=["feature", "label"], data_key=DataHandlerLP.DK_L)
+        return df["feature"], df["label"]
+
+    return load
+
+
+def folder_feature_set(folder):
+    """The FEATURE_SET a strategy folder's train_lgbm_eth.py trains on."""
+    text = (Path(folder) / 'train_lgbm_eth.py').read_text(encoding='utf-8')
+    match = re.search(r'^FEATURE_SET = "(\w+)"', text, re.M)
+    if not match:
+        raise ValueError(f"No FEATURE_SET in {folder}/train_lgbm_eth.py")
+    return match.group(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward retraining of a strategy folder's model")
+    parser.add_argument('folder', help="strategy folder, e.g. 0208_Gen10_200x_target")
+    parser.add_argument('--provider-uri', default='~/.qlib/qlib_data/crypto_10m')
+    parser.add_argument('--valid', default='30D', help="length of the latest slice used for validation")
+    parser.add_argument('--every', help="repeat on this schedule (e.g. 1D, 6h); default: one step")
+    parser.add_argument('--start', default='2025-01-05', help="first bar of a full training")
+    parser.add_argument('--since', help="last bar the existing model was trained on (models without state)")
+    parser.add_argument('--full', action='store_true', help="train from --start instead of warm starting")
+    parser.add_argument('--rounds', type=int, default=200, help="max new trees per step")
+    args = parser.parse_args()
+
+    import qlib
+    from qlib.data import D
+
+    qlib.init(provider_uri=str(Path(args.provider_uri).expanduser()), region='us')
+    folder = Path(args.folder)
+    feature_set = folder_feature_set(folder)
+    load = qlib_loader(feature_set)
+    print(f"Walk-forward for {folder} ({feature_set})")
+    full = args.full
+    registry = ModelRegistry()
+    while True:
+        now = D.calendar()[-2]  # the last bar has no next close, so no label yet
+        step(folder / MODEL_NAME, load, now, valid=pd.Timedelta(args.valid), start=args.start,
+             since=args.since, full=full, rounds=args.rounds, registry=registry)
+        if not args.every:
+            break
+        full = False
+        time.sleep(pd.Timedelta(args.every).total_seconds())
+
+
+if __name__ == "__main__":
+    main()